@@ -59,7 +59,8 @@ try:
         DiscreteData, ContinuousData,
         BDeu, BGe,
         DiscreteLL, DiscreteBIC, DiscreteAIC,
-        GaussianLL, GaussianBIC, GaussianAIC, GaussianL0)
+        GaussianLL, GaussianBIC, GaussianAIC, GaussianL0,
+        pruned_local_scores_for_child)
 except ImportError as e:
     print("Could not import score generating code!")
     print(e)
@@ -1441,104 +1442,17 @@ class Gobnilp(Model):
                 [frozenset((x,y)) for (a,b,s) in self.obligatory_conditional_independences if child in s for x in a for y in b])
 
             unfixed_parents = sorted(bn_variablesset - forbidden_parents - obligatory_parents)
-            thisvaridx = {v:i for i, v in enumerate(unfixed_parents)}
-            thispalim = palim - len(obligatory_parents)
-            obligatory_parents_tuple = tuple(obligatory_parents)
             
-            if thispalim < 0:
+            if palim - len(obligatory_parents) < 0:
                 raise Gobnilp.UserConstraintError("Variable {0} has {1} as obligatory parents but the parent set size limit is set to {2}".
                                                   format(child,','.join(sorted(obligatory_parents)),palim))
-            
-            if obligatory_parents:
-                msg = "( with implicit parents {0} )".format(','.join(sorted(obligatory_parents)))
-                def this_local_score(ch,pa):
-                    # just always add in the obligatory parents
-                    return local_score(ch,obligatory_parents_tuple + pa)
-            else:
-                this_local_score = local_score
-                msg = ''
-            
-            score, ub = this_local_score(child,())
-            scores_computed += 1
 
-            child_dkt = {frozenset().union(obligatory_parents):score}   # output
-            previous_layer = {():(score,ub)}  # frontier
-            search_nodes_expanded += 1
-            
-            for pasize in range(1,thispalim+1):
-                new_layer = {}
-                for old_parentset in previous_layer:
-                    last_idx = -1 if old_parentset == () else thisvaridx[old_parentset[-1]]
-                    for new_parent in unfixed_parents[last_idx+1:]:
-
-                        parents = old_parentset + (new_parent,)
-
-                        ok = True
-                        for pair in forbidden_pairs:
-                            if pair.issubset(parents):
-                                ok = False
-                                break
-                        if not ok:
-                            continue
-                        
-                        # check that all subsets smaller by one exist in previous layer,
-                        # and get best (i.e. highest) score and best (i.e. lowest) upper bound
-                        bss = None
-                        lub = None
-                        for i in range(pasize):
-                            try:
-                                old_score, old_ub = previous_layer[parents[:i]+parents[i+1:]]
-                            except KeyError:
-                                bss = None
-                                break
-                            bss = old_score if bss is None else max(bss,old_score)
-                            # An upper bound of None means no upper bound was computed
-                            if old_ub is not None:
-                                lub = old_ub if lub is None else min(lub,old_ub)
-
-
-                        if bss is None or (lub is not None and bss >= lub):
-                            # some subset is exponentially pruned, so don't score
-                            # or: best we can hope for for parents (i.e. lub) is no better than some existing subset
-                            # of parents (i.e. the one with score bss)
-                            if verbose > 2 and (bss is not None and lub is not None and bss >= lub):
-                                print('Pruning and not scoring {0}<-{2}{4}:\n\
-                                \tFor child variable {0}, {1} is an upper bound for\n\
-                                \t {2} and its supersets\n\tand some subset of {2} has score {3}'.format(child,lub,parents,bss,msg))
-                            continue
-
-                        # get local score and upper bound on any superset formed by adding
-                        # BN variables coming after parents in bn_variables
-                        score, ub = this_local_score(child,parents)
-                        scores_computed += 1
-                        
-                        # if this parent set has a score exceeding that of any subsets then (and only then)
-                        # is the score worth keeping
-                        if score > bss:
-                            child_dkt[frozenset(parents).union(obligatory_parents)] = score
-                        
-                        # the following line only needed to compensate for poor upper bounds
-                        # since ub should already be as low as possible
-                        if ub is not None and lub is not None:
-                            ub = min(ub,lub)
-
-                        best = max(score,bss)
-                        #print ('check', best, ub)
-                        if pasize < thispalim:
-                            # not the last layer yet
-                            if ub is not None and ub <= best:
-                                # none of the proper supersets worth keeping
-                                if verbose > 2:
-                                    print('Pruning:\n \tFor child variable {0} {4} a subset of {1} has score {2} \n\
-                                    \tand {3} is an upper bound on proper supersets of {1},'.format(child, parents, best,ub, msg))
-                            else:
-                                # expand frontier
-                                new_layer[parents] = (best,ub)
-                                search_nodes_expanded += 1
-                previous_layer = new_layer
+            child_dkt, expanded, computed = pruned_local_scores_for_child(
+                local_score,child,unfixed_parents,palim,
+                obligatory_parents=obligatory_parents,forbidden_pairs=forbidden_pairs,verbose=verbose)
             score_dkt[child] = child_dkt
-            if verbose > 1:
-                print('{0} local scores stored for child variable {1}'.format(len(child_dkt),child))
+            search_nodes_expanded += expanded
+            scores_computed += computed
 
         if verbose > 1:
             print('Search nodes expanded = {0}, scores computed = {1}, scores kept = {2}'.format(
@@ -0,0 +1,187 @@
+"""
+    AD-tree (all-dimensions tree) for discrete data, written with Numba
+
+    Used for count queries when the C implementation (https://bitbucket.org/jamescussens/pyadtree)
+    is not installed. Follows Moore and Lee (1998): the children for the most common value of
+    each variable are left out, and nodes with few datapoints are leaf-lists.
+"""
+
+from time import perf_counter
+
+import numpy as np
+
+from numba import jit
+from numba.typed import List
+
+@jit(nopython=True)
+def _build(data, counts, arities, leaf_list_threshold):
+    '''
+    Build the AD-tree as flat arrays, breadth-first.
+
+    A node stores its count, the first variable it may vary and either a leaf-list
+    (a range of `leaf_rows`) or a range of vary nodes, one for each variable from its first on.
+    A vary node stores the most common value of its variable and a range of `children`,
+    one per value, with -1 for the most common value and for values with a zero count.
+    '''
+    n, p = data.shape
+    node_count = List([np.int64(0)])
+    node_start = List([np.int64(0)])
+    node_leaf = List([np.int64(-1)])
+    node_leaf_len = List([np.int64(0)])
+    node_vary = List([np.int64(-1)])
+    vary_mcv = List([np.int64(0)])
+    vary_children = List([np.int64(0)])
+    children = List([np.int64(0)])
+    leaf_rows = List([np.int64(0)])
+    vary_mcv.pop()
+    vary_children.pop()
+    children.pop()
+    leaf_rows.pop()
+
+    pending = List([np.arange(n)])
+    node = 0
+    while node < len(pending):
+        rows = pending[node]
+        start = node_start[node]
+        total = 0
+        for r in rows:
+            total += counts[r]
+        node_count[node] = total
+
+        if len(rows) <= leaf_list_threshold or start == p:
+            node_leaf[node] = len(leaf_rows)
+            node_leaf_len[node] = len(rows)
+            for r in rows:
+                leaf_rows.append(r)
+        else:
+            node_vary[node] = len(vary_mcv)
+            for j in range(start, p):
+                arity = arities[j]
+                value_counts = np.zeros(arity, dtype=np.int64)
+                value_rows = np.zeros(arity, dtype=np.int64)
+                for r in rows:
+                    value_counts[data[r, j]] += counts[r]
+                    value_rows[data[r, j]] += 1
+                mcv = np.argmax(value_counts)
+                vary_mcv.append(mcv)
+                vary_children.append(len(children))
+                # rows of each value, grouped by value
+                order = np.argsort(data[rows, j], kind='mergesort')
+                sorted_rows = rows[order]
+                offset = 0
+                for v in range(arity):
+                    if v == mcv or value_rows[v] == 0:
+                        children.append(-1)
+                    else:
+                        children.append(len(pending))
+                        pending.append(sorted_rows[offset:offset+value_rows[v]])
+                        node_count.append(0)
+                        node_start.append(j+1)
+                        node_leaf.append(-1)
+                        node_leaf_len.append(0)
+                        node_vary.append(-1)
+                    offset += value_rows[v]
+        # the rows of a node are not needed once its children exist
+        pending[node] = rows[:0]
+        node += 1
+
+    return (np.array(list(node_count)), np.array(list(node_start)), np.array(list(node_leaf)),
+            np.array(list(node_leaf_len)), np.array(list(node_vary)), np.array(list(vary_mcv)),
+            np.array(list(vary_children)), np.array(list(children)), np.array(list(leaf_rows)))
+
+@jit(nopython=True)
+def _add_counts(tree, data, counts, arities, cols, strides, out, node, t, base, sign):
+    '''
+    Add `sign` times the contingency table for `cols[t:]` of the datapoints of `node`
+    to `out`, at offset `base`
+    '''
+    node_count, node_start, node_leaf, node_leaf_len, node_vary, vary_mcv, vary_children, children, leaf_rows = tree
+    if t == len(cols):
+        out[base] += sign * node_count[node]
+        return 0
+    if node_leaf[node] >= 0:
+        for i in range(node_leaf[node], node_leaf[node] + node_leaf_len[node]):
+            r = leaf_rows[i]
+            idx = base
+            for s in range(t, len(cols)):
+                idx += data[r, cols[s]] * strides[s]
+            out[idx] += sign * counts[r]
+        return 0
+    col = cols[t]
+    vary = node_vary[node] + col - node_start[node]
+    mcv = vary_mcv[vary]
+    first_child = vary_children[vary]
+    # the datapoints with the most common value are those of the node minus those with the other values
+    _add_counts(tree, data, counts, arities, cols, strides, out, node, t+1, base + mcv * strides[t], sign)
+    for v in range(arities[col]):
+        child = children[first_child + v]
+        if child >= 0:
+            _add_counts(tree, data, counts, arities, cols, strides, out, child, t+1, base + v * strides[t], sign)
+            _add_counts(tree, data, counts, arities, cols, strides, out, child, t+1, base + mcv * strides[t], -sign)
+    return 0
+
+@jit(nopython=True)
+def _contab(tree, data, counts, cols, arities, out, maxsize):
+    p = len(cols)
+    strides = np.empty(p, dtype=np.int64)
+    stride = 1
+    for i in range(p-1, -1, -1):
+        strides[i] = stride
+        stride *= arities[cols[i]]
+        if stride > maxsize:
+            return -1
+    work = np.zeros(stride, dtype=np.int64)
+    _add_counts(tree, data, counts, arities, cols, strides, work, 0, 0, 0, 1)
+    for i in range(stride):
+        out[i] = work[i]
+    return stride
+
+
+class ADTree:
+    '''
+    AD-tree over the unique datapoints of some discrete data and their counts
+    '''
+
+    def __init__(self, data, counts, arities, leaf_list_threshold=16):
+        '''Build the AD-tree.
+
+        Args:
+         data (numpy array): the unique datapoints as a 2-d array
+         counts (numpy array): the count of how often each unique datapoint occurs in the original data
+         arities (numpy array): the arities of the variables (=columns)
+         leaf_list_threshold (int): nodes with at most this many unique datapoints are not
+          expanded but store the datapoints (a leaf-list)
+        '''
+        self._data = data
+        self._counts = np.asarray(counts, dtype=np.int64)
+        self._arities = np.asarray(arities, dtype=np.int64)
+        self.leaf_list_threshold = leaf_list_threshold
+        t0 = perf_counter()
+        self._tree = _build(data, self._counts, self._arities, leaf_list_threshold)
+        self.build_time = perf_counter() - t0
+
+    @property
+    def nbytes(self):
+        '''int: The memory used by the tree (not including the data), in bytes'''
+        return sum(a.nbytes for a in self._tree)
+
+    @property
+    def nodes(self):
+        '''int: The number of nodes of the tree'''
+        return len(self._tree[0])
+
+    def contab(self, cols, out, maxsize):
+        '''
+        Compute a marginal contingency table, in the interface of the C implementation.
+
+        Args:
+         cols (numpy array): the columns (=variables) of the contingency table, ordered low to high
+         out (numpy array): array in whose first elements the contingency table is written,
+          in lexicographic order of the joint instantiations of the columns
+         maxsize (int): the maximum size (number of cells) allowed for the contingency table
+
+        Returns:
+         int: The size of the contingency table, or -1 if it would be bigger than `maxsize`
+        '''
+        return _contab(self._tree, self._data, self._counts, np.asarray(cols, dtype=np.int64),
+                       self._arities, out, maxsize)
@@ -0,0 +1,250 @@
+"""
+    Caches for the entropies and BDeu score components of sets of variables
+
+    The caches are dictionaries (keys are frozensets of variables, values are pairs of a float
+    and an int or None). A :py:class:`ScoreCache` can be backed by an SQLite database, so that
+    a later run on the same data starts with the values already computed, and an
+    :py:class:`LRUScoreCache` also keeps its size below a byte budget by evicting the least
+    recently used entries. Use :py:func:`make_score_cache` to get the right one.
+"""
+
+import itertools
+import os
+import sqlite3
+import sys
+
+# estimated bytes of an entry besides its key: the value tuple, its float and int
+# and the slot of the dictionary
+_VALUE_NBYTES = sys.getsizeof((0.0, 0)) + sys.getsizeof(0.0) + sys.getsizeof(2**40) + 100
+
+_SCHEMA = '''CREATE TABLE IF NOT EXISTS scores (
+    namespace TEXT NOT NULL,
+    varset BLOB NOT NULL,
+    value REAL NOT NULL,
+    size INTEGER,
+    PRIMARY KEY (namespace, varset)) WITHOUT ROWID'''
+
+def make_score_cache(max_bytes=None, path=None, namespace='', variables=()):
+    '''
+    Create a cache of entropies or BDeu score components.
+
+    Args:
+     max_bytes (int/None): Estimated size in bytes the entries held in memory may take,
+      None for no limit
+     path (str/None): SQLite database in which entries are stored, None to keep
+      entries in memory only
+     namespace (str): Identifies the data and statistic the values belong to, typically
+      a digest of the data and the name of the statistic, so one database can hold many caches
+     variables (iter): All variables, in order; a set of variables is stored in the
+      database as the bitmask of their positions
+
+    Returns:
+     ScoreCache: An :py:class:`LRUScoreCache` if `max_bytes` is given, else a :py:class:`ScoreCache`
+    '''
+    if max_bytes is None:
+        return ScoreCache(path, namespace, variables)
+    return LRUScoreCache(max_bytes, path, namespace, variables)
+
+def _restore(cls, state, entries):
+    cache = cls.__new__(cls)
+    cache.__dict__.update(state)
+    dict.update(cache, entries)
+    return cache
+
+class ScoreCache(dict):
+    '''
+    Dictionary mapping sets of variables to (value, size) pairs, optionally backed by an SQLite database.
+
+    Lookups of entries in memory are plain dictionary lookups. When backed by a database, the entries
+    of its namespace are read when the cache is created, and new entries are written in batches.
+    '''
+
+    max_bytes = None
+
+    def __init__(self, path=None, namespace='', variables=(), write_batch=10000):
+        '''Initialises a `ScoreCache` object.
+
+        Args:
+         path (str/None): SQLite database, see :py:func:`make_score_cache`
+         namespace (str): Namespace of the entries in the database, see :py:func:`make_score_cache`
+         variables (iter): All variables, in order, see :py:func:`make_score_cache`
+         write_batch (int): Number of new entries collected before they are written to the database
+        '''
+        dict.__init__(self)
+        self.path = path
+        self.namespace = namespace
+        self._varidx = {v: i for i, v in enumerate(variables)}
+        self._mask_bytes = (len(self._varidx) + 7) // 8
+        self.write_batch = write_batch
+        self._pending = []
+        self._conn = None
+        self._pid = None
+        # whether every entry of the database is also in memory
+        self._complete = True
+        if path is not None:
+            self.load()
+
+    def __reduce__(self):
+        # the entries must not go through __setitem__, and the connection is not picklable
+        state = self.__dict__.copy()
+        state['_conn'] = None
+        state['_pid'] = None
+        return _restore, (type(self), state, dict(self))
+
+    def _connection(self):
+        # a connection must not be used in a process forked from the one which opened it
+        if self._conn is None or self._pid != os.getpid():
+            self._conn = sqlite3.connect(self.path, timeout=60)
+            self._conn.execute('PRAGMA journal_mode=WAL')
+            self._conn.execute(_SCHEMA)
+            self._pid = os.getpid()
+        return self._conn
+
+    def _mask(self, key):
+        mask = 0
+        for v in key:
+            mask |= 1 << self._varidx[v]
+        return mask.to_bytes(self._mask_bytes, 'little')
+
+    def _key(self, mask):
+        mask = int.from_bytes(mask, 'little')
+        return frozenset(v for v, i in self._varidx.items() if mask >> i & 1)
+
+    @property
+    def nbytes(self):
+        '''int: Estimated size in bytes of the entries held in memory'''
+        return sum(sys.getsizeof(key) for key in self) + len(self) * _VALUE_NBYTES
+
+    def load(self):
+        '''
+        Read the entries of the database into memory, as far as the byte budget (if any) allows.
+
+        Returns:
+         int: The number of entries in the database
+        '''
+        rows = self._connection().execute(
+            'SELECT varset, value, size FROM scores WHERE namespace = ?', (self.namespace,)).fetchall()
+        for mask, value, size in rows:
+            key = self._key(mask)
+            if key not in self:
+                self._insert(key, (value, size))
+        self._complete = len(self) >= len(rows)
+        return len(rows)
+
+    def _insert(self, key, value):
+        dict.__setitem__(self, key, value)
+
+    def __missing__(self, key):
+        # only entries evicted from memory can be in the database but not in memory
+        if not self._complete:
+            row = self._connection().execute(
+                'SELECT value, size FROM scores WHERE namespace = ? AND varset = ?',
+                (self.namespace, self._mask(key))).fetchone()
+            if row is not None:
+                value = row[0], row[1]
+                self._insert(key, value)
+                return value
+        raise KeyError(key)
+
+    def __setitem__(self, key, value):
+        self._insert(key, value)
+        if self.path is not None:
+            self._pending.append((self.namespace, self._mask(key), value[0], value[1]))
+            if len(self._pending) >= self.write_batch:
+                self.flush()
+
+    def get(self, key, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def update(self, other):
+        for key, value in other.items():
+            self[key] = value
+
+    def flush(self):
+        '''Write the entries added since the last flush to the database'''
+        if self._pending:
+            with self._connection() as conn:
+                conn.executemany('INSERT OR REPLACE INTO scores VALUES (?, ?, ?, ?)', self._pending)
+            self._pending = []
+
+    def clear(self):
+        '''Remove all entries from memory, after writing new ones to the database'''
+        self.flush()
+        dict.clear(self)
+        self._complete = self.path is None
+
+    def close(self):
+        '''Write new entries to the database and close the connection to it'''
+        self.flush()
+        if self._conn is not None and self._pid == os.getpid():
+            self._conn.close()
+        self._conn = None
+
+class LRUScoreCache(ScoreCache):
+    '''
+    :py:class:`ScoreCache` whose entries in memory take at most (an estimated) `max_bytes` bytes.
+    Beyond that the least recently used entries are evicted from memory (not from the database),
+    down to 90% of the budget at a time.
+    '''
+
+    def __init__(self, max_bytes, path=None, namespace='', variables=(), write_batch=10000):
+        '''Initialises a `LRUScoreCache` object.
+
+        Args:
+         max_bytes (int): Estimated size in bytes the entries held in memory may take
+         path (str/None): SQLite database, see :py:func:`make_score_cache`
+         namespace (str): Namespace of the entries in the database, see :py:func:`make_score_cache`
+         variables (iter): All variables, in order, see :py:func:`make_score_cache`
+         write_batch (int): Number of new entries collected before they are written to the database
+        '''
+        self.max_bytes = max_bytes
+        self._nbytes = 0
+        ScoreCache.__init__(self, path, namespace, variables, write_batch)
+
+    @property
+    def nbytes(self):
+        '''int: Estimated size in bytes of the entries held in memory'''
+        return self._nbytes
+
+    def _insert(self, key, value):
+        if dict.__contains__(self, key):
+            dict.__delitem__(self, key)
+        else:
+            self._nbytes += sys.getsizeof(key) + _VALUE_NBYTES
+        # the most recently used entries are last
+        dict.__setitem__(self, key, value)
+        if self._nbytes > self.max_bytes:
+            self._evict()
+
+    def _evict(self):
+        # evict down to 90% of the budget in one pass, since finding the oldest entry of a
+        # dictionary means skipping the slots of the entries deleted before it
+        evicted = []
+        target = 0.9 * self.max_bytes
+        nbytes = self._nbytes
+        # never evict the entry just inserted
+        for key in itertools.islice(self, len(self) - 1):
+            if nbytes <= target:
+                break
+            evicted.append(key)
+            nbytes -= sys.getsizeof(key) + _VALUE_NBYTES
+        for key in evicted:
+            dict.__delitem__(self, key)
+        self._nbytes = nbytes
+        self._complete = self.path is None
+
+    def __getitem__(self, key):
+        try:
+            value = dict.pop(self, key)
+        except KeyError:
+            return self.__missing__(key)
+        dict.__setitem__(self, key, value)
+        return value
+
+    def clear(self):
+        '''Remove all entries from memory, after writing new ones to the database'''
+        ScoreCache.clear(self)
+        self._nbytes = 0
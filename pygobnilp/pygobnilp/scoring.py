@@ -21,24 +21,29 @@
 __author__ = "Josh Neil, James Cussens"
 __email__ = "james.cussens@bristol.ac.uk"
 
+import os
+import json
+import hashlib
 from math import lgamma, log, pi
 from itertools import combinations
 
 from scipy.special import digamma, gammaln
-from scipy.stats import norm, entropy
+from scipy.stats import norm
 
 import numpy as np
 import pandas as pd
 
 from numba import jit, njit
 
+from .nbadtree import ADTree
+from .scorecache import make_score_cache
+
 try:
     import adtree
     adtree_available = True
-except ImportError as e:
+except ImportError:
+    # counts are then computed with the compiled kernels, or with an AD-tree built by DiscreteData.build_adtree()
     adtree_available = False
-    print("C ADTree implementation unavailable, so learning with discrete data may be slow.\nADTree implementation is here: https://bitbucket.org/jamescussens/pyadtree")
-    print(e)
 
 # START functions for contabs
 
@@ -149,6 +154,617 @@ def compute_bdeu_component(data, counts, cols, arities, alpha, maxflatcontabsize
         score += non_zero_count*lgamma(alpha_div_arities)  
         return score, non_zero_count
 
+@jit(nopython=True)
+def entropy_of_contab(contab):
+    '''
+    The entropy of the empirical distribution given by a (flat) contingency table of counts
+    '''
+    n = 0.0
+    for count in contab:
+        n += count
+    h = 0.0
+    for count in contab:
+        if count > 0:
+            p = count / n
+            h -= p * log(p)
+    return h
+
+@jit(nopython=True)
+def bdeu_component_of_contab(contab, alpha):
+    '''
+    The BDeu score component and the number of non-zero cells of a (flat) contingency table
+    '''
+    return bdeu_component_of_counts(contab, alpha, len(contab))
+
+@jit(nopython=True)
+def bdeu_component_of_counts(counts, alpha, cells):
+    '''
+    The BDeu score component and the number of non-zero cells of a contingency table
+    with `cells` cells, given its counts (cells with a zero count may be left out)
+    '''
+    alpha_div_arities = alpha / cells
+    non_zero_count = 0
+    score = 0.0
+    for count in counts:
+        if count != 0:
+            non_zero_count += 1
+            score -= lgamma(alpha_div_arities+count)
+    return score + non_zero_count*lgamma(alpha_div_arities), non_zero_count
+
+@jit(nopython=True)
+def _dense_ranks(keys):
+    # replace keys by their rank among the distinct keys, which keeps their order
+    order = np.argsort(keys)
+    ranks = np.empty(len(keys), dtype=np.uint64)
+    rank = np.uint64(0)
+    for i in range(len(order)):
+        if i > 0 and keys[order[i]] != keys[order[i-1]]:
+            rank += np.uint64(1)
+        ranks[order[i]] = rank
+    return ranks, rank + np.uint64(1)
+
+def row_key_layout(arities):
+    '''
+    The layout of the keys into which the rows of discrete data are packed (see :py:func:`pack_rows`).
+    Each value takes as many bits as the values below its column's arity need, and the columns fill
+    64-bit words in order, from the most significant bit down, without a value crossing two words.
+    So keys (compared word by word) are in the lexicographic order of their rows.
+
+    Args:
+     arities (iter): The arities of the columns
+
+    Returns:
+     tuple: For each column the word holding its value, the shift of the value within the word and the
+      mask of its bits (once shifted back), and the number of words of a key
+    '''
+    words, shifts, masks = [], [], []
+    word, free = 0, 64
+    for arity in arities:
+        bits = int(arity - 1).bit_length()
+        if bits > free:
+            word, free = word + 1, 64
+        free -= bits
+        words.append(word)
+        shifts.append(free)
+        masks.append((1 << bits) - 1)
+    return (np.array(words,dtype=np.int64),np.array(shifts,dtype=np.uint64),
+            np.array(masks,dtype=np.uint64),word + 1)
+
+@jit(nopython=True)
+def _pack_rows(data, words, shifts, masks, nwords):
+    n, p = data.shape
+    keys = np.zeros((n, nwords), dtype=np.uint64)
+    # column by column, since data is often stored column-major
+    for j in range(p):
+        word, shift, mask = words[j], shifts[j], masks[j]
+        for i in range(n):
+            value = np.uint64(data[i, j])
+            if value > mask:
+                return keys, False
+            keys[i, word] |= value << shift
+    return keys, True
+
+def pack_rows(data, layout):
+    '''
+    Pack each row of discrete data into a key of one or more 64-bit words.
+
+    Args:
+     data (numpy array): 2-d array of values 0, 1, ..., each row is a datapoint
+     layout (tuple): The layout of the keys, see :py:func:`row_key_layout`
+
+    Returns:
+     numpy array: 2-d array with the key of each row as a row of words, or None if
+      a value does not fit into the bits the layout gives it
+    '''
+    keys, fits = _pack_rows(data, *layout)
+    return keys if fits else None
+
+@jit(nopython=True)
+def _unpack_keys(keys, words, shifts, masks):
+    n, p = keys.shape[0], len(words)
+    data = np.empty((n, p), dtype=np.int64)
+    for i in range(n):
+        for j in range(p):
+            data[i, j] = (keys[i, words[j]] >> shifts[j]) & masks[j]
+    return data
+
+def unique_rows(data, arities=None, counts=None):
+    '''
+    The unique rows of discrete data and their counts, equal to `numpy.unique(data, axis=0, return_counts=True)`.
+
+    Each row is packed into a key (see :py:func:`pack_rows`), usually a single 64-bit word, and the
+    keys are sorted, which is much faster than numpy's sort of rows as byte strings. The unique rows
+    are unpacked from the unique keys.
+
+    Args:
+     data (numpy array): 2-d array of values 0, 1, ..., each row is a datapoint
+     arities (iter/None): The arities of the columns, which give the number of bits of their values.
+      None, or if a value is not below its arity, for the largest value in each column plus one.
+     counts (numpy array/None): How often each row occurs, e.g. when merging the unique rows of
+      blocks of data, see :py:func:`merge_unique_counts`. None to count each row once.
+
+    Returns:
+     tuple: The unique rows (sorted) and their total counts
+    '''
+    n, p = data.shape
+    if arities is None:
+        arities = data.max(axis=0) + 1 if n > 0 else np.ones(p, dtype=np.int64)
+    layout = row_key_layout(arities)
+    keys = pack_rows(data, layout)
+    if keys is None:
+        return unique_rows(data, None, counts)
+    keys, counts = _unique_keys_counts(keys, counts)
+    return _unpack_keys(keys, *layout[:3]).astype(data.dtype), counts
+
+def _unique_keys_counts(keys, counts=None):
+    # the sorted unique keys (see pack_rows) and their total counts
+    n = len(keys)
+    if keys.shape[1] == 1:
+        order = np.argsort(keys[:,0])
+    else:
+        order = np.lexsort(keys.T[::-1])
+    keys = keys[order]
+    first = np.ones(n, dtype=bool)
+    first[1:] = (keys[1:] != keys[:-1]).any(axis=1)
+    starts = np.flatnonzero(first)
+    if counts is None:
+        counts = np.diff(np.append(starts, n))
+    elif n > 0:
+        counts = np.add.reduceat(np.asarray(counts)[order], starts)
+    return keys[starts], counts
+
+@jit(nopython=True)
+def sparse_contab(data, counts, cols, arities):
+    '''
+    Compute the non-zero counts of a marginal contingency table of any size.
+
+    The values of each datapoint in `cols` are packed into a single uint64 key, in mixed radix
+    with the arities as bases. Whenever the next column would overflow the key, the keys are
+    first replaced by their ranks among the distinct keys (which are fewer than the datapoints),
+    so there is no limit on the product of the arities. Equal keys are then summed in key order.
+
+    Args:
+     data (numpy array): the unique datapoints as a 2-d array, see :py:func:`make_contab`
+     counts (numpy array): the count of how often each unique datapoint occurs in the original data
+     cols (numpy array): the columns (=variables) for the marginal contingency table
+     arities (numpy array): the arities of the variables (=columns) for the contingency table,
+      order must match that of `cols`
+
+    Returns:
+     numpy array: the non-zero counts, in lexicographic order of the joint instantiations
+      of the columns (=variables), i.e. the flat contingency table with the zeros left out
+    '''
+    n = data.shape[0]
+    keys = np.zeros(n, dtype=np.uint64)
+    bound = np.uint64(1)  # all keys are smaller than bound
+    maxkey = np.uint64(0xFFFFFFFFFFFFFFFF)
+    for i in range(len(cols)):
+        arity = np.uint64(arities[i])
+        if bound > maxkey // arity:
+            keys, bound = _dense_ranks(keys)
+        col = cols[i]
+        for j in range(n):
+            keys[j] = keys[j] * arity + np.uint64(data[j,col])
+        bound *= arity
+
+    order = np.argsort(keys)
+    contab = np.zeros(n, dtype=counts.dtype)
+    size = 0
+    for i in range(n):
+        if i > 0 and keys[order[i]] != keys[order[i-1]]:
+            size += 1
+        contab[size] += counts[order[i]]
+    return contab[:size+1]
+
+@jit(nopython=True)
+def marginalise_flat_contab(contab, arities, keep):
+    '''
+    Sum a flat contingency table over all of its variables except some.
+
+    Args:
+     contab (numpy array): a flat contingency table, as returned by :py:func:`make_contab`
+     arities (numpy array): the arities of the variables of the contingency table, in its column order
+     keep (numpy array): the positions of the variables to keep, in increasing order
+
+    Returns:
+     numpy array: the flat contingency table of the kept variables, in the same order
+      as :py:func:`make_contab` would compute it from the data
+    '''
+    p = len(arities)
+    # stride of each variable in the marginal table, 0 for the variables summed out
+    strides = np.zeros(p,dtype=np.int64)
+    stride = 1
+    for i in range(len(keep)-1,-1,-1):
+        strides[keep[i]] = stride
+        stride *= arities[keep[i]]
+    marg = np.zeros(stride,dtype=contab.dtype)
+    digits = np.zeros(p,dtype=np.int64)
+    idx = 0
+    for cell in range(len(contab)):
+        marg[idx] += contab[cell]
+        # move to the next joint instantiation, last variable fastest
+        i = p-1
+        while i > -1:
+            digits[i] += 1
+            idx += strides[i]
+            if digits[i] < arities[i]:
+                break
+            idx -= strides[i]*digits[i]
+            digits[i] = 0
+            i -= 1
+    return marg
+
+@jit(nopython=True)
+def build_bitmaps(data, arities):
+    '''
+    Build a bitmap index of data: for each value of each variable a bitset over the datapoints,
+    packed into uint64 words (datapoint `r` is bit `r % 64` of word `r // 64`).
+
+    Args:
+     data (numpy array): the datapoints as a 2-d array, each row is a datapoint (not necessarily unique)
+     arities (numpy array): the arities of the variables (=columns)
+
+    Returns:
+     tuple: 1st element is the 2-d array of bitsets, with one row for each value of each variable,
+      2nd element the row of the bitset for value 0 of each variable
+    '''
+    n, p = data.shape
+    offsets = np.zeros(p, dtype=np.int64)
+    for j in range(1, p):
+        offsets[j] = offsets[j-1] + arities[j-1]
+    bitmaps = np.zeros((offsets[p-1] + arities[p-1], (n + 63) // 64), dtype=np.uint64)
+    for j in range(p):
+        for r in range(n):
+            bitmaps[offsets[j] + data[r, j], r >> 6] |= np.uint64(1) << np.uint64(r & 63)
+    return bitmaps, offsets
+
+@jit(nopython=True)
+def _popcount(x):
+    x = x - ((x >> np.uint64(1)) & np.uint64(0x5555555555555555))
+    x = (x & np.uint64(0x3333333333333333)) + ((x >> np.uint64(2)) & np.uint64(0x3333333333333333))
+    x = (x + (x >> np.uint64(4))) & np.uint64(0x0F0F0F0F0F0F0F0F)
+    return np.int64((x * np.uint64(0x0101010101010101)) >> np.uint64(56))
+
+@jit(nopython=True)
+def _bitmap_fill(bitmaps, offsets, cols, arities, strides, masks, level, total, base, contab):
+    # count the cells below the joint instantiation whose datapoints are in masks[level]
+    col = cols[level]
+    arity = arities[level]
+    parent = masks[level]
+    words = masks.shape[1]
+    if level == len(cols) - 1:
+        rest = total
+        for v in range(arity - 1):
+            bitmap = bitmaps[offsets[col] + v]
+            count = 0
+            for w in range(words):
+                count += _popcount(parent[w] & bitmap[w])
+            contab[base + v * strides[level]] = count
+            rest -= count
+        # the datapoints with the last value are all the others
+        contab[base + (arity - 1) * strides[level]] = rest
+        return 0
+    child = masks[level + 1]
+    for v in range(arity):
+        bitmap = bitmaps[offsets[col] + v]
+        count = 0
+        for w in range(words):
+            child[w] = parent[w] & bitmap[w]
+            count += _popcount(child[w])
+        if count > 0:
+            _bitmap_fill(bitmaps, offsets, cols, arities, strides, masks, level + 1, count,
+                         base + v * strides[level], contab)
+    return 0
+
+@jit(nopython=True)
+def bitmap_contab(bitmaps, offsets, n, cols, arities, maxsize):
+    '''
+    Compute a marginal contingency table from a bitmap index of the data (see :py:func:`build_bitmaps`),
+    by recursively AND-ing the bitsets of the values of the columns and counting the set bits.
+
+    Args:
+     bitmaps (numpy array): the bitsets, as returned by :py:func:`build_bitmaps`
+     offsets (numpy array): the row of the bitset for value 0 of each variable
+     n (int): the number of datapoints
+     cols (numpy array): the columns (=variables) for the marginal contingency table,
+      ordered low to high
+     arities (numpy array): the arities of the variables (=columns) for the contingency table,
+      order must match that of `cols`
+     maxsize (int): the maximum size (number of cells) allowed for a contingency table
+
+    Returns:
+     numpy array: the contingency table, as returned by :py:func:`make_contab`
+      (empty if it would have more than `maxsize` cells)
+    '''
+    p = len(cols)
+    strides = np.empty(p, dtype=np.int64)
+    stride = 1
+    for i in range(p-1, -1, -1):
+        strides[i] = stride
+        stride *= arities[i]
+        if stride > maxsize:
+            return np.empty(0, dtype=np.uint32)
+    contab = np.zeros(stride, dtype=np.uint32)
+    if p == 0:
+        contab[0] = n
+        return contab
+    masks = np.empty((p, bitmaps.shape[1]), dtype=np.uint64)
+    masks[0, :] = ~np.uint64(0)
+    _bitmap_fill(bitmaps, offsets, cols, arities, strides, masks, 0, n, 0, contab)
+    return contab
+
+@jit(nopython=True)
+def _bitmap_is_cheaper(n_unique, words, join_arities):
+    # a scan reads every unique datapoint once per column, the bitmaps AND one row of words
+    # per cell above the last column and one per cell (but the last value) of the last column
+    scan_cost = n_unique * len(join_arities)
+    bitmap_cost = 0
+    cells = 1
+    for i in range(len(join_arities)):
+        if i == len(join_arities) - 1:
+            bitmap_cost += cells * (join_arities[i] - 1) * words
+        else:
+            cells *= join_arities[i]
+            bitmap_cost += cells * words
+        if bitmap_cost >= scan_cost:
+            return False
+    return True
+
+@jit(nopython=True)
+def _join_contab(data, counts, cols, join_arities, maxsize, bitmaps, bitmap_offsets, n):
+    # the table of a join, from the bitmap index if there is one and it is cheaper than a scan
+    if len(bitmaps) > 0 and _bitmap_is_cheaper(len(data), bitmaps.shape[1], join_arities):
+        return bitmap_contab(bitmaps, bitmap_offsets, n, cols, join_arities, maxsize)
+    return make_contab(data, counts, cols, join_arities, maxsize)[0]
+
+@jit(nopython=True)
+def _contab_stat(contab, alpha, bdeu):
+    if bdeu:
+        return bdeu_component_of_contab(contab, alpha)
+    return entropy_of_contab(contab), len(contab)
+
+@jit(nopython=True)
+def lattice_contab_stats(data, counts, join_cols, join_ptr, arities, maxsize, derived_from, keep, keep_ptr, alpha, bdeu,
+                         bitmaps, bitmap_offsets, n):
+    '''
+    Compute statistics of the contingency tables of many sets of variables. Each set is
+    a subset of one of a number of larger sets (joins): the table of each join is counted
+    from the data once, and the tables of its subsets are obtained by marginalising it.
+
+    The statistic of a contingency table is its entropy and its number of cells, or if `bdeu`
+    is true its BDeu score component and its number of non-zero cells.
+
+    Args:
+     data (numpy array): the unique datapoints as a 2-d array, see :py:func:`make_contab`
+     counts (numpy array): the count of how often each unique datapoint occurs in the original data
+     join_cols (numpy array): the columns of all joins, each ordered low to high, concatenated
+     join_ptr (numpy array): the columns of join `i` are `join_cols[join_ptr[i]:join_ptr[i+1]]`
+     arities (numpy array): the arities of all variables (=columns)
+     maxsize (int): the maximum size (number of cells) allowed for a contingency table
+     derived_from (numpy array): for each set, the join it is a subset of, in increasing order
+     keep (numpy array): for each set, the positions in its join of its variables, in increasing order,
+      concatenated
+     keep_ptr (numpy array): the positions for set `j` are `keep[keep_ptr[j]:keep_ptr[j+1]]`
+     alpha (float): The *equivalent sample size*, only used if `bdeu` is true
+     bdeu (bool): Whether to compute BDeu score components rather than entropies
+     bitmaps (numpy array): a bitmap index of the data (see :py:func:`build_bitmaps`), or an empty array.
+      The table of a join is counted from the bitmaps if that is expected to be cheaper than a scan
+      of the unique datapoints.
+     bitmap_offsets (numpy array): the row of the bitset for value 0 of each variable
+     n (int): the number of datapoints
+
+    Returns:
+     tuple: the two statistics of each set, as two arrays. If the contingency table of a join would
+      have more than `maxsize` cells then the second statistic of its subsets is -1.
+    '''
+    d = len(derived_from)
+    values = np.zeros(d, dtype=np.float64)
+    sizes = np.full(d, -1, dtype=np.int64)
+    j = 0
+    for i in range(len(join_ptr)-1):
+        cols = join_cols[join_ptr[i]:join_ptr[i+1]]
+        join_arities = arities[cols]
+        contab = _join_contab(data, counts, cols, join_arities, maxsize, bitmaps, bitmap_offsets, n)
+        while j < d and derived_from[j] == i:
+            if len(contab) > 0:
+                these = keep[keep_ptr[j]:keep_ptr[j+1]]
+                if len(these) == len(cols):
+                    values[j], sizes[j] = _contab_stat(contab, alpha, bdeu)
+                else:
+                    values[j], sizes[j] = _contab_stat(
+                        marginalise_flat_contab(contab, join_arities, these), alpha, bdeu)
+            j += 1
+    return values, sizes
+
+@jit(nopython=True)
+def count_histogram(contab):
+    '''
+    The histogram of the non-zero counts of a contingency table: the distinct non-zero counts,
+    in increasing order, and the number of cells with each of them
+    '''
+    nonzero = np.sort(contab[contab > 0])
+    values = np.empty(len(nonzero), dtype=np.int64)
+    multiplicities = np.empty(len(nonzero), dtype=np.int64)
+    k = -1
+    for i in range(len(nonzero)):
+        if i == 0 or nonzero[i] != nonzero[i-1]:
+            k += 1
+            values[k] = nonzero[i]
+            multiplicities[k] = 0
+        multiplicities[k] += 1
+    return values[:k+1], multiplicities[:k+1]
+
+@jit(nopython=True)
+def lattice_count_histograms(data, counts, join_cols, join_ptr, arities, maxsize, derived_from, keep, keep_ptr,
+                             bitmaps, bitmap_offsets, n):
+    '''
+    Compute the histograms of the non-zero counts (see :py:func:`count_histogram`) of the contingency
+    tables of many sets of variables, each a subset of a join, as :py:func:`lattice_contab_stats` does
+    for other statistics (and with the same arguments).
+
+    Returns:
+     tuple: the values and multiplicities of all histograms, concatenated, and the position of each
+      set's histogram: that of set `j` is at `ptr[j]:ptr[j+1]`. If the contingency table of a join
+      would have more than `maxsize` cells then the histograms of its subsets are empty.
+    '''
+    d = len(derived_from)
+    ptr = np.zeros(d+1, dtype=np.int64)
+    values = np.empty(1024, dtype=np.int64)
+    multiplicities = np.empty(1024, dtype=np.int64)
+    j = 0
+    for i in range(len(join_ptr)-1):
+        cols = join_cols[join_ptr[i]:join_ptr[i+1]]
+        join_arities = arities[cols]
+        contab = _join_contab(data, counts, cols, join_arities, maxsize, bitmaps, bitmap_offsets, n)
+        while j < d and derived_from[j] == i:
+            ptr[j+1] = ptr[j]
+            if len(contab) > 0:
+                these = keep[keep_ptr[j]:keep_ptr[j+1]]
+                if len(these) == len(cols):
+                    vals, mults = count_histogram(contab)
+                else:
+                    vals, mults = count_histogram(marginalise_flat_contab(contab, join_arities, these))
+                end = ptr[j] + len(vals)
+                if end > len(values):
+                    # grow geometrically
+                    size = max(end, 2*len(values))
+                    values = np.concatenate((values, np.empty(size - len(values), dtype=np.int64)))
+                    multiplicities = np.concatenate((multiplicities, np.empty(size - len(multiplicities), dtype=np.int64)))
+                values[ptr[j]:end] = vals
+                multiplicities[ptr[j]:end] = mults
+                ptr[j+1] = end
+            j += 1
+    return values[:ptr[d]], multiplicities[:ptr[d]], ptr
+
+@jit(nopython=True)
+def lattice_contabs(data, counts, join_cols, join_ptr, arities, maxsize, derived_from, keep, keep_ptr,
+                    bitmaps, bitmap_offsets, n):
+    '''
+    Compute the contingency tables of many sets of variables, each a subset of a join,
+    as :py:func:`lattice_contab_stats` does for their statistics (and with the same arguments).
+
+    Returns:
+     tuple: the tables, concatenated, and the position of each set's table: that of set `j`
+      is at `ptr[j]:ptr[j+1]`. If the contingency table of a join would have more than `maxsize`
+      cells then the tables of its subsets are empty.
+    '''
+    d = len(derived_from)
+    ptr = np.zeros(d+1, dtype=np.int64)
+    tables = np.empty(1024, dtype=np.int64)
+    j = 0
+    for i in range(len(join_ptr)-1):
+        cols = join_cols[join_ptr[i]:join_ptr[i+1]]
+        join_arities = arities[cols]
+        contab = _join_contab(data, counts, cols, join_arities, maxsize, bitmaps, bitmap_offsets, n)
+        while j < d and derived_from[j] == i:
+            ptr[j+1] = ptr[j]
+            if len(contab) > 0:
+                these = keep[keep_ptr[j]:keep_ptr[j+1]]
+                if len(these) == len(cols):
+                    table = contab
+                else:
+                    table = marginalise_flat_contab(contab, join_arities, these)
+                end = ptr[j] + len(table)
+                if end > len(tables):
+                    # grow geometrically
+                    tables = np.concatenate((tables, np.empty(max(end, 2*len(tables)) - len(tables), dtype=np.int64)))
+                tables[ptr[j]:end] = table
+                ptr[j+1] = end
+            j += 1
+    return tables[:ptr[d]], ptr
+
+@jit(nopython=True)
+def contab_stats_of_tables(tables, ptr, alpha, bdeu):
+    '''
+    The statistics (see :py:func:`lattice_contab_stats`) of many contingency tables,
+    concatenated as returned by :py:func:`lattice_contabs`. The second statistic of an empty table is -1.
+    '''
+    d = len(ptr) - 1
+    values = np.zeros(d, dtype=np.float64)
+    sizes = np.full(d, -1, dtype=np.int64)
+    for j in range(d):
+        if ptr[j+1] > ptr[j]:
+            values[j], sizes[j] = _contab_stat(tables[ptr[j]:ptr[j+1]], alpha, bdeu)
+    return values, sizes
+
+@jit(nopython=True)
+def bdeu_components_of_histograms(values, multiplicities, ptr, cells, alpha):
+    '''
+    The BDeu score components and numbers of non-zero cells of many contingency tables, given
+    the histograms of their non-zero counts (see :py:func:`lattice_count_histograms`) and their
+    numbers of cells (as floats). Each distinct count of a table needs only one `lgamma`
+    evaluation, so components for many values of `alpha` are cheap to evaluate.
+    '''
+    d = len(cells)
+    scores = np.empty(d, dtype=np.float64)
+    non_zero_counts = np.empty(d, dtype=np.int64)
+    for j in range(d):
+        alpha_div_arities = alpha / cells[j]
+        score = 0.0
+        non_zero_count = 0
+        for i in range(ptr[j], ptr[j+1]):
+            non_zero_count += multiplicities[i]
+            score -= multiplicities[i] * lgamma(alpha_div_arities + values[i])
+        scores[j] = score + non_zero_count * lgamma(alpha_div_arities)
+        non_zero_counts[j] = non_zero_count
+    return scores, non_zero_counts
+
+@jit(nopython=True)
+def _lattice_contab_stats_unjoined(data, counts, cols, arities, maxsize, alpha, bdeu):
+    # every set of variables is its own join
+    m, p = cols.shape
+    ptr = np.arange(m+1) * p
+    keep = np.empty(m*p, dtype=np.int64)
+    for i in range(m*p):
+        keep[i] = i % p
+    return lattice_contab_stats(data, counts, np.ascontiguousarray(cols).ravel(), ptr, arities, maxsize,
+                                np.arange(m), keep, ptr, alpha, bdeu,
+                                np.empty((0, 0), dtype=np.uint64), np.empty(0, dtype=np.int64), 0)
+
+@jit(nopython=True)
+def batch_entropies(data, counts, cols, arities, maxsize):
+    '''
+    Compute the entropies of the empirical distributions of many sets of variables
+    of the same size in one call.
+
+    Args:
+     data (numpy array): the unique datapoints as a 2-d array, see :py:func:`make_contab`
+     counts (numpy array): the count of how often each unique datapoint occurs in the original data
+     cols (numpy array): 2-d array, each row holds the columns of one set of variables,
+      ordered low to high
+     arities (numpy array): the arities of all variables (=columns)
+     maxsize (int): the maximum size (number of cells) allowed for a contingency table
+
+    Returns:
+     tuple: 1st element is an array of entropies, 2nd element an array with the number of
+      joint instantiations of each set of variables. If the contingency table of a set of
+      variables would have more than `maxsize` cells then its number of joint
+      instantiations is -1 and its entropy is not computed.
+    '''
+    return _lattice_contab_stats_unjoined(data, counts, cols, arities, maxsize, 1.0, False)
+
+@jit(nopython=True)
+def batch_bdeu_components(data, counts, cols, arities, alpha, maxsize):
+    '''
+    Compute the BDeu score components of many sets of variables of the same size in one call.
+
+    Args:
+     data (numpy array): the unique datapoints as a 2-d array, see :py:func:`make_contab`
+     counts (numpy array): the count of how often each unique datapoint occurs in the original data
+     cols (numpy array): 2-d array, each row holds the columns of one set of variables,
+      ordered low to high
+     arities (numpy array): the arities of all variables (=columns)
+     alpha (float): The *equivalent sample size*
+     maxsize (int): the maximum size (number of cells) allowed for a contingency table
+
+    Returns:
+     tuple: 1st element is an array of BDeu score components, 2nd element an array with the
+      number of non-zero cells of each contingency table. If the contingency table of a set of
+      variables would have more than `maxsize` cells then its number of non-zero cells
+      is -1 and its score component is not computed.
+    '''
+    return _lattice_contab_stats_unjoined(data, counts, cols, arities, maxsize, alpha, True)
+
 
 # START functions for upper bounds
 
@@ -260,6 +876,101 @@ def upper_bound_james_fun(atoms_ints,atoms_floats,pasize,alpha,r,idxs):
     ub += min(local_ub+best_diff,lr)
     return ub
 
+@njit
+def james_diffs(atoms_ints,atoms_floats,alpha,r):
+    '''
+    For each atom (see :py:func:`get_atoms`) of a child, the amount by which its term in the bound of
+    :py:func:`upper_bound_james_fun` can be lowered, which is 0 unless the chi-squared condition is met.
+    Depends on the parents only through `alpha`, so can be reused for all parent sets with the same
+    number of joint instantiations.
+
+    Args:
+     atoms_ints (numpy array): The integer part of the atoms of the child, one row per atom
+     atoms_floats (numpy array): n * the entropy of the child counts of each atom
+     alpha (float): The *equivalent sample size* divided by the number of joint instantiations of the parents
+     r (int): The arity of the child
+
+    Returns:
+     numpy array: The (non-positive) difference for each atom
+    '''
+    n = len(atoms_floats)
+    p = atoms_ints.shape[1] - r - 2
+    diffs = np.zeros(n)
+    for i in range(n):
+        if atoms_ints[i,p+r+1]: # if chi-sq condition met
+            diff = fa(atoms_ints[i,p:p+r],atoms_ints[i,p+r],alpha/2.0,r) - atoms_floats[i]
+            if diff < 0.0:
+                diffs[i] = diff
+    return diffs
+
+@njit
+def upper_bound_james_atoms(atoms_ints,atoms_floats,diffs,pa_cols,arities,r):
+    '''
+    Compiled version of :py:func:`upper_bound_james_fun`, used by :py:meth:`BDeu.upper_bound_james`.
+
+    The atoms are grouped by their values for the parents, packed into a single integer: if there
+    are not many more joint instantiations of the parents than atoms, the terms of each instantiation
+    are accumulated in an array indexed by it, else the atoms are sorted by it. If the packed values
+    could overflow, the trivial bound 0 is returned.
+
+    Args:
+     atoms_ints (numpy array): The integer part of the atoms of the child, one row per atom
+     atoms_floats (numpy array): n * the entropy of the child counts of each atom
+     diffs (numpy array): The differences for the atoms computed by :py:func:`james_diffs`
+     pa_cols (numpy array): Columns (=variables) of the parents
+     arities (numpy array): The arities of all variables
+     r (int): The arity of the child
+
+    Returns:
+     float: An upper bound on the BDeu local score for the child with any proper superset of the parents
+    '''
+    n = len(atoms_floats)
+    if n == 0:
+        return 0.0
+    pasize = len(pa_cols)
+    lr = -log(r)
+    keys = np.zeros(n,dtype=np.int64)
+    stride = 1
+    for k in range(pasize):
+        col = pa_cols[k]
+        if stride > (2**62) // arities[col]:
+            # log-likelihoods are never positive
+            return 0.0
+        for i in range(n):
+            keys[i] += np.int64(atoms_ints[i,col]) * stride
+        stride *= arities[col]
+    if stride <= 8*n + 64:
+        local_ubs = np.zeros(stride)
+        best_diffs = np.zeros(stride)
+        seen = np.zeros(stride,dtype=np.bool_)
+        for i in range(n):
+            key = keys[i]
+            seen[key] = True
+            local_ubs[key] += atoms_floats[i]
+            if diffs[i] < best_diffs[key]:
+                best_diffs[key] = diffs[i]
+        ub = 0.0
+        for key in range(stride):
+            if seen[key]:
+                ub += min(local_ubs[key]+best_diffs[key],lr)
+        return ub
+    ub = 0.0
+    local_ub = 0.0
+    best_diff = 0.0
+    order = np.argsort(keys)
+    old = keys[order[0]]
+    for i in order:
+        if keys[i] != old:
+            ub += min(local_ub+best_diff,lr)
+            best_diff = 0.0
+            local_ub = 0.0
+            old = keys[i]
+        local_ub += atoms_floats[i]
+        if diffs[i] < best_diff:
+            best_diff = diffs[i]
+    ub += min(local_ub+best_diff,lr)
+    return ub
+
 
 #@jit(nopython=True)
 def ub(dists,alpha,r):
@@ -313,10 +1024,13 @@ def ub(dists,alpha,r):
 
 
 #@jit(nopython=True)
-def get_atoms(data,arities):
+def get_atoms(data,arities,counts=None):
     '''
     Args: 
         data(np.array): Discrete data as a 2d array of ints
+        arities(np.array): The arities of the variables (=columns)
+        counts(np.array/None): If not None, the number of times each row of `data` occurs
+         (e.g. `data` holds the unique datapoints), else each row occurs once
 
     Returns:
         list: a list `atoms`, where `atoms[i]` is a dictionary mapping instantations
@@ -338,11 +1052,13 @@ def get_atoms(data,arities):
     fullinsts = []
     for i in range(data.shape[1]):
         fullinsts.append({})
-    for row in data:
+    if counts is None:
+        counts = np.ones(len(data),dtype=np.int64)
+    for row, count in zip(data.tolist(),counts.tolist()):
         row = tuple(row)
         for i, val in enumerate(row):
             fullinsts[i].setdefault(row[:i]+(0,)+row[i+1:],  # add dummy value for ith val
-                                    [0]*arities[i])[val] += 1
+                                    [0]*arities[i])[val] += count
 
     # now, for each child i, delete full insts which are 'deterministic'
     # i.e. where only one child value is non-zero
@@ -392,6 +1108,272 @@ def prune_local_score(this_score, parent_set, child_dkt):
             return True
     return False
 
+def pruned_local_scores_for_child(local_score,child,unfixed_parents,palim,
+                                  obligatory_parents=frozenset(),forbidden_pairs=frozenset(),verbose=0,
+                                  prefetch=None):
+    '''
+    Compute the local scores for a single child using a layered search over parent sets
+    which prunes parent sets which cannot be optimal.
+
+    A parent set is only kept if its score exceeds that of all its proper subsets. 
+    Supersets of a parent set are not searched if the upper bound returned by `local_score`
+    shows that none of them can beat the best subset found so far.
+
+    Args:
+     local_score (fun): A local score function such that `local_score(child,parents)`
+      computes `(score,ub)` where `score` is the local score for `child` having parentset `parents`
+      and `ub` is either `None` or an upper bound on the local score for `child` with any proper superset of `parents`
+     child (str): The child variable
+     unfixed_parents (list): Sorted list of potential parents (not including obligatory parents)
+     palim (int): Limit on parent set size (including obligatory parents)
+     obligatory_parents (frozenset): Parents which are always added to the parent set
+     forbidden_pairs (frozenset): Pairs of variables (as frozensets) which may not both be parents
+     verbose (int): How much information to show
+     prefetch (fun): If not None, called as `prefetch(child,parent_sets)` with all parent sets
+      (tuples, including obligatory parents) of a layer which are about to be scored, so that their
+      contingency tables can be computed in one batch before `local_score` is called for each of them
+
+    Returns:
+     tuple: 1st element is a dictionary mapping parent sets (frozensets) to local scores,
+      2nd element is the number of search nodes expanded,
+      3rd element is the number of local scores computed
+    '''
+    search_nodes_expanded = 0
+    scores_computed = 0
+
+    thisvaridx = {v:i for i, v in enumerate(unfixed_parents)}
+    thispalim = palim - len(obligatory_parents)
+    obligatory_parents_tuple = tuple(obligatory_parents)
+
+    if obligatory_parents:
+        msg = "( with implicit parents {0} )".format(','.join(sorted(obligatory_parents)))
+        def this_local_score(ch,pa):
+            # just always add in the obligatory parents
+            return local_score(ch,obligatory_parents_tuple + pa)
+    else:
+        this_local_score = local_score
+        msg = ''
+
+    score, ub = this_local_score(child,())
+    scores_computed += 1
+
+    child_dkt = {frozenset().union(obligatory_parents):score}   # output
+    previous_layer = {():(score,ub)}  # frontier
+    search_nodes_expanded += 1
+
+    for pasize in range(1,thispalim+1):
+        new_layer = {}
+        to_score = []
+        for old_parentset in previous_layer:
+            last_idx = -1 if old_parentset == () else thisvaridx[old_parentset[-1]]
+            for new_parent in unfixed_parents[last_idx+1:]:
+
+                parents = old_parentset + (new_parent,)
+
+                ok = True
+                for pair in forbidden_pairs:
+                    if pair.issubset(parents):
+                        ok = False
+                        break
+                if not ok:
+                    continue
+
+                # check that all subsets smaller by one exist in previous layer,
+                # and get best (i.e. highest) score and best (i.e. lowest) upper bound
+                bss = None
+                lub = None
+                for i in range(pasize):
+                    try:
+                        old_score, old_ub = previous_layer[parents[:i]+parents[i+1:]]
+                    except KeyError:
+                        bss = None
+                        break
+                    bss = old_score if bss is None else max(bss,old_score)
+                    # An upper bound of None means no upper bound was computed
+                    if old_ub is not None:
+                        lub = old_ub if lub is None else min(lub,old_ub)
+
+
+                if bss is None or (lub is not None and bss >= lub):
+                    # some subset is exponentially pruned, so don't score
+                    # or: best we can hope for for parents (i.e. lub) is no better than some existing subset
+                    # of parents (i.e. the one with score bss)
+                    if verbose > 2 and (bss is not None and lub is not None and bss >= lub):
+                        print('Pruning and not scoring {0}<-{2}{4}:\n\
+                        \tFor child variable {0}, {1} is an upper bound for\n\
+                        \t {2} and its supersets\n\tand some subset of {2} has score {3}'.format(child,lub,parents,bss,msg))
+                    continue
+                to_score.append((parents,bss,lub))
+
+        # whether parents are scored only depends on the previous layer,
+        # so all local scores of this layer can be computed together
+        if prefetch is not None and to_score:
+            prefetch(child,[obligatory_parents_tuple + parents for parents, _, _ in to_score])
+
+        for parents, bss, lub in to_score:
+            # get local score and upper bound on any superset formed by adding
+            # BN variables coming after parents in bn_variables
+            score, ub = this_local_score(child,parents)
+            scores_computed += 1
+
+            # if this parent set has a score exceeding that of any subsets then (and only then)
+            # is the score worth keeping
+            if score > bss:
+                child_dkt[frozenset(parents).union(obligatory_parents)] = score
+
+            # the following line only needed to compensate for poor upper bounds
+            # since ub should already be as low as possible
+            if ub is not None and lub is not None:
+                ub = min(ub,lub)
+
+            best = max(score,bss)
+            #print ('check', best, ub)
+            if pasize < thispalim:
+                # not the last layer yet
+                if ub is not None and ub <= best:
+                    # none of the proper supersets worth keeping
+                    if verbose > 2:
+                        print('Pruning:\n \tFor child variable {0} {4} a subset of {1} has score {2} \n\
+                        \tand {3} is an upper bound on proper supersets of {1},'.format(child, parents, best,ub, msg))
+                else:
+                    # expand frontier
+                    new_layer[parents] = (best,ub)
+                    search_nodes_expanded += 1
+        previous_layer = new_layer
+
+    if verbose > 1:
+        print('{0} local scores stored for child variable {1}'.format(len(child_dkt),child))
+    return child_dkt, search_nodes_expanded, scores_computed
+
+def multi_pruned_local_scores_for_child(local_scores,child,unfixed_parents,palim,
+                                        obligatory_parents=frozenset(),forbidden_pairs=frozenset(),verbose=0,
+                                        prefetch=None):
+    '''
+    Compute the local scores for a single child for several local score functions in a single
+    layered search over parent sets.
+
+    A parent set is searched if it would be searched by :py:func:`pruned_local_scores_for_child`
+    for at least one of the local score functions (so pruning uses the loosest of their bounds),
+    and for each local score function exactly the parent sets which that function would keep are kept.
+    The scores are those of separate runs of :py:func:`pruned_local_scores_for_child`, but parent sets
+    needed by several functions are only prefetched (i.e. their contingency tables counted) once.
+
+    Args:
+     local_scores (list): Local score functions, see :py:func:`pruned_local_scores_for_child`
+     child (str): The child variable
+     unfixed_parents (list): Sorted list of potential parents (not including obligatory parents)
+     palim (int): Limit on parent set size (including obligatory parents)
+     obligatory_parents (frozenset): Parents which are always added to the parent set
+     forbidden_pairs (frozenset): Pairs of variables (as frozensets) which may not both be parents
+     verbose (int): How much information to show
+     prefetch (fun): If not None, called as `prefetch(child,parent_sets)` with all parent sets
+      of a layer which are about to be scored, see :py:func:`pruned_local_scores_for_child`
+
+    Returns:
+     tuple: 1st element is a list with, for each local score function, a dictionary mapping
+      parent sets (frozensets) to local scores, 2nd element is the number of search nodes expanded,
+      3rd element is the number of local scores computed (for all functions together)
+    '''
+    search_nodes_expanded = 0
+    scores_computed = 0
+    nscores = len(local_scores)
+
+    thisvaridx = {v:i for i, v in enumerate(unfixed_parents)}
+    thispalim = palim - len(obligatory_parents)
+    obligatory_parents_tuple = tuple(obligatory_parents)
+
+    child_dkts = []
+    first = []
+    for local_score in local_scores:
+        score, ub = local_score(child,obligatory_parents_tuple)
+        scores_computed += 1
+        child_dkts.append({frozenset().union(obligatory_parents):score})
+        first.append((score,ub))
+    # frontier: for each parent set, (best score of a subset, upper bound) for each function
+    # for which it is expanded, None for the others
+    previous_layer = {():tuple(first)}
+    search_nodes_expanded += 1
+
+    for pasize in range(1,thispalim+1):
+        new_layer = {}
+        to_score = []
+        for old_parentset in previous_layer:
+            last_idx = -1 if old_parentset == () else thisvaridx[old_parentset[-1]]
+            for new_parent in unfixed_parents[last_idx+1:]:
+
+                parents = old_parentset + (new_parent,)
+
+                ok = True
+                for pair in forbidden_pairs:
+                    if pair.issubset(parents):
+                        ok = False
+                        break
+                if not ok:
+                    continue
+
+                subsets = []
+                for i in range(pasize):
+                    try:
+                        subsets.append(previous_layer[parents[:i]+parents[i+1:]])
+                    except KeyError:
+                        break
+                if len(subsets) < pasize:
+                    continue
+
+                # for each function, the same test as in pruned_local_scores_for_child
+                bounds = []
+                for s in range(nscores):
+                    bss = None
+                    lub = None
+                    for entries in subsets:
+                        if entries[s] is None:
+                            bss = None
+                            break
+                        old_score, old_ub = entries[s]
+                        bss = old_score if bss is None else max(bss,old_score)
+                        if old_ub is not None:
+                            lub = old_ub if lub is None else min(lub,old_ub)
+                    if bss is None or (lub is not None and bss >= lub):
+                        bounds.append(None)
+                    else:
+                        bounds.append((bss,lub))
+                if any(b is not None for b in bounds):
+                    to_score.append((parents,bounds))
+
+        if prefetch is not None and to_score:
+            prefetch(child,[obligatory_parents_tuple + parents for parents, _ in to_score])
+
+        for parents, bounds in to_score:
+            entries = []
+            for s in range(nscores):
+                if bounds[s] is None:
+                    entries.append(None)
+                    continue
+                bss, lub = bounds[s]
+                score, ub = local_scores[s](child,obligatory_parents_tuple + parents)
+                scores_computed += 1
+
+                if score > bss:
+                    child_dkts[s][frozenset(parents).union(obligatory_parents)] = score
+
+                if ub is not None and lub is not None:
+                    ub = min(ub,lub)
+
+                best = max(score,bss)
+                if pasize < thispalim and (ub is None or ub > best):
+                    entries.append((best,ub))
+                else:
+                    entries.append(None)
+            if any(e is not None for e in entries):
+                new_layer[parents] = tuple(entries)
+                search_nodes_expanded += 1
+        previous_layer = new_layer
+
+    if verbose > 1:
+        print('{0} local scores stored for child variable {1}'.format(
+            ', '.join(str(len(d)) for d in child_dkts),child))
+    return child_dkts, search_nodes_expanded, scores_computed
+
 def fromdataframe(df):
     cols = []
     arities = []
@@ -402,6 +1384,130 @@ def fromdataframe(df):
         arities.append(len(vals.cat.categories))
     return np.transpose(np.array(cols,dtype=np.uint32)), arities, varnames
 
+def _read_dat_body(file,value_type):
+    '''
+    Read the data lines of a discrete data file in bulk.
+
+    Values are tokenised by pandas' C parser as categories (i.e. as strings), and in 
+    each column values are relabelled 0, 1, 2, ... in the order in which they are first seen. 
+    Comments (starting with '#') and empty lines are ignored.
+
+    Args:
+     file (file object): File positioned at the first data line
+     value_type (numpy.dtype): Type of the returned values
+
+    Returns:
+     numpy.ndarray: The relabelled data as a 2-d array, each row is a datapoint
+    '''
+    df = pd.read_csv(file, sep=r'\s+', header=None, comment='#', dtype='category',
+                     na_filter=False, skip_blank_lines=True, engine='c')
+    data = np.empty(df.shape,dtype=value_type)
+    for i, (name, col) in enumerate(df.items()):
+        codes = col.cat.codes.to_numpy()
+        # categories are sorted, so map each to its rank by first occurrence
+        first_seen = np.unique(codes,return_index=True)[1]
+        relabel = np.empty(len(first_seen),dtype=value_type)
+        relabel[np.argsort(first_seen)] = np.arange(len(first_seen))
+        data[:,i] = relabel[codes]
+    return data
+
+def _npy_header_filename(filename):
+    return filename[:-len('.npy')] + '.json'
+
+def save_discrete_npy(filename, data, variables, arities, unique_counts=True):
+    '''
+    Save discrete data in binary columnar format.
+
+    The data is stored as a column-major (Fortran order) array of unsigned 8-bit integers in
+    `filename` (which must end in '.npy') so that it can be memory-mapped. Variable names and arities are
+    stored in a small JSON header file with the same stem and extension '.json'. 
+    Optionally the unique datapoints and their counts are stored as well, so that they
+    do not need to be recomputed when the data is loaded.
+
+    Args:
+     filename (str): Name of the '.npy' file for the data
+     data (array_like): The data as a 2-d array of values 0, 1, ..., each row is a datapoint
+     variables (iter): The variable names
+     arities (iter): The arities of the variables
+     unique_counts (bool/tuple): Whether to store the unique datapoints and their counts.
+      Can also be a tuple (unique datapoints, counts) if these are already known.
+    '''
+    if not filename.endswith('.npy'):
+        raise ValueError("Binary data file name must end in '.npy' but is {0}".format(filename))
+    np.save(filename, np.asfortranarray(data, dtype=DiscreteData._value_type))
+    if unique_counts is True:
+        unique_counts = unique_rows(np.asarray(data, dtype=DiscreteData._value_type), arities)
+    elif unique_counts is False:
+        unique_counts = None
+    write_discrete_npy_header(filename, variables, arities, len(data), unique_counts)
+
+def write_discrete_npy_header(filename, variables, arities, data_length, unique_counts=None):
+    '''
+    Write the JSON header (and optionally the unique datapoints and counts) for discrete data
+    stored in binary columnar format, see :py:func:`save_discrete_npy`. This allows the '.npy'
+    file itself to be written in parts, e.g. with `numpy.lib.format.open_memmap`.
+
+    Args:
+     filename (str): Name of the '.npy' file for the data
+     variables (iter): The variable names
+     arities (iter): The arities of the variables
+     data_length (int): The number of datapoints
+     unique_counts (tuple/None): The unique datapoints and their counts, if they are to be stored
+    '''
+    stem = filename[:-len('.npy')]
+    header = {
+        'variables': list(variables),
+        'arities': [int(a) for a in arities],
+        'data_length': int(data_length)
+        }
+    if unique_counts is not None:
+        uniques, counts = unique_counts
+        np.save(stem + '.uniques.npy', np.asarray(uniques, dtype=DiscreteData._value_type))
+        np.save(stem + '.counts.npy', np.asarray(counts, dtype=DiscreteData._count_type))
+        header['unique_data'] = os.path.basename(stem + '.uniques.npy')
+        header['unique_data_counts'] = os.path.basename(stem + '.counts.npy')
+    with open(_npy_header_filename(filename), 'w') as f:
+        json.dump(header, f)
+
+def merge_unique_counts(*unique_counts):
+    '''
+    Merge the unique datapoints and counts of several blocks of data.
+
+    The result equals `numpy.unique(data, axis=0, return_counts=True)` for the
+    concatenated data, but only the (typically far fewer) unique datapoints are sorted.
+
+    Args:
+     unique_counts (tuple): Tuples (unique datapoints, counts), one for each block
+
+    Returns:
+     tuple: The unique datapoints of all blocks and their total counts
+    '''
+    uniques = np.concatenate([u for u, _ in unique_counts])
+    counts = np.concatenate([c for _, c in unique_counts])
+    merged, merged_counts = unique_rows(uniques, counts=counts)
+    return merged, merged_counts.astype(DiscreteData._count_type)
+
+def load_discrete_npy(filename):
+    '''
+    Load discrete data saved by :py:func:`save_discrete_npy`. The data itself is memory-mapped.
+
+    Args:
+     filename (str): Name of the '.npy' file for the data
+
+    Returns:
+     tuple: The data (a read-only memory-mapped array), the variable names, the arities and
+      either a tuple (unique datapoints, counts) or None if these were not stored
+    '''
+    with open(_npy_header_filename(filename)) as f:
+        header = json.load(f)
+    data = np.load(filename, mmap_mode='r')
+    unique_counts = None
+    if 'unique_data' in header:
+        dirname = os.path.dirname(filename)
+        unique_counts = (np.load(os.path.join(dirname, header['unique_data'])),
+                         np.load(os.path.join(dirname, header['unique_data_counts'])))
+    return data, header['variables'], header['arities'], unique_counts
+
 class Data:
     """
     Complete data (either discrete or continuous)
@@ -442,10 +1548,13 @@ class DiscreteData(Data):
     _arity_type = np.uint8
     _count_type = np.uint32
     
-    def __init__(self, data_source, varnames = None, arities = None):
+    def __init__(self, data_source, varnames = None, arities = None, unique_counts = None):
         '''Initialises a `DiscreteData` object.
 
-        If  `data_source` is a filename then it is assumed that:
+        If `data_source` is a filename ending in '.npy' then the data is assumed to have been
+        saved in binary columnar format by :py:func:`save_discrete_npy` and is memory-mapped.
+
+        If  `data_source` is any other filename then it is assumed that:
 
             #. All values are separated by whitespace
             #. Empty lines are ignored
@@ -472,9 +1581,17 @@ class DiscreteData(Data):
            will supply the arities). Otherwise if not supplied (`=None`)
            the arity for each variable will be set to the number of distinct values
            observed for that variable in the data.
+
+          unique_counts (tuple) :
+           The unique datapoints (sorted, as returned by `numpy.unique`) and their counts,
+           if already known, e.g. from :py:func:`merge_unique_counts`.
+           Ignored if `data_source` is a filename.
         '''
 
-        if type(data_source) == str:
+        if type(data_source) == str and data_source.endswith('.npy'):
+            data, varnames, arities, unique_counts = load_discrete_npy(data_source)
+        elif type(data_source) == str:
+            unique_counts = None
             with open(data_source, "r") as file:
                 line = file.readline().rstrip()
                 while len(line) == 0 or line[0] == '#':
@@ -489,29 +1606,7 @@ class DiscreteData(Data):
                     if arity < 2:
                         raise ValueError("This line: '{0}' is interpreted as giving variable arities but the value {1} is less than 2.".format(line,arity))
 
-                # class whose instances are callable functions 'with memory'
-                class Convert:
-                    def __init__(self):
-                        self._last = 0 
-                        self._dkt = {}
-
-                    def __call__(self,s):
-                        try:
-                            return self._dkt[s]
-                        except KeyError:
-                            self._dkt[s] = self._last
-                            self._last += 1
-                            return self._dkt[s]
-
-
-                converter_dkt = {}
-                for i in range(len(varnames)):
-                    # trick to create a function 'with memory'
-                    converter_dkt[i] = Convert()
-                data = np.loadtxt(file,
-                                  dtype=self._value_type,
-                                  converters=converter_dkt,
-                                  comments='#')
+                data = _read_dat_body(file,self._value_type)
 
         elif type(data_source) == pd.DataFrame:
             data, arities, varnames = fromdataframe(data_source)
@@ -530,8 +1625,12 @@ class DiscreteData(Data):
             # order of varnames determined by header line in file, if file used
             self._variables = tuple(varnames)
 
-        self._unique_data, counts = np.unique(self._data, axis=0, return_counts=True)
+        if unique_counts is None:
+            self._unique_data, counts = unique_rows(self._data, self._arities)
+        else:
+            self._unique_data, counts = unique_counts
         self._unique_data_counts = np.array(counts,self._count_type)
+        self._set_unique_keys()
             
         self._maxflatcontabsize = 1000000
         self._contab = np.empty(self._maxflatcontabsize,dtype=np.int32)
@@ -541,13 +1640,39 @@ class DiscreteData(Data):
             self._varidx[v] = i
         self._data_length = data.shape[0]
 
+        # bitmap index, built on first use
+        self._bitmaps = None
+
+        # contingency tables, if kept (see keep_contabs)
+        self._contabs = None
+
         # create AD tree, if possible
+        self._nbadtree = None
+        self._adtree = None
         if adtree_available:
             self._adtree = adtree.adtree(10,1000,1000,
                                          np.array(self._data.flatten('F'),dtype=np.int32),
                                          np.array(self._arities,dtype=np.int32),
                                          self._data_length)
         
+    def _set_unique_keys(self):
+        '''Pack the unique datapoints into keys (see :py:func:`pack_rows`), None if they do not fit the arities'''
+        self._key_layout = row_key_layout(self._arities)
+        self._unique_keys = pack_rows(self._unique_data,self._key_layout)
+
+    def rawdata(self):
+        '''
+        The data without any information about variable names. The datapoints of reweighted or appended data
+        (see :py:meth:`reweighted` and :py:meth:`append`) are not kept, so they are made from the unique
+        datapoints, in their order.
+
+        Returns:
+         numpy.ndarray: The data
+        '''
+        if self._data is None:
+            return np.repeat(self._unique_data,self._unique_data_counts,axis=0)
+        return self._data
+
     def data(self):
         '''
         The data with all values converted to unsigned integers.
@@ -556,7 +1681,7 @@ class DiscreteData(Data):
          pandas.DataFrame: The data
         '''
 
-        df = pd.DataFrame(self._data,columns=self._variables)
+        df = pd.DataFrame(self.rawdata(),columns=self._variables)
         arities = self._arities
         for i, (name, data) in enumerate(df.items()):
             # ensure correct categories are recorded even if not
@@ -588,17 +1713,375 @@ class DiscreteData(Data):
 
         return self._arities[self._varidx[v]]
 
+    def digest(self):
+        '''
+        A digest of the data, which does not depend on the order of the datapoints
+
+        Returns:
+         str : The SHA-256 hex digest of the variable names, the arities, the unique datapoints and their counts
+        '''
+        h = hashlib.sha256()
+        h.update(json.dumps(self._variables).encode('utf-8'))
+        h.update(np.ascontiguousarray(self._arities,dtype=np.int64).tobytes())
+        # unique datapoints with count 0 (see reweighted) are left out
+        observed = self._unique_data_counts > 0
+        h.update(np.ascontiguousarray(self._unique_data[observed],dtype=np.int64).tobytes())
+        h.update(np.ascontiguousarray(self._unique_data_counts[observed],dtype=np.int64).tobytes())
+        return h.hexdigest()
+
 
     def contab(self,variables):
         cols = np.array([self._varidx[v] for v in variables], dtype=np.uint32)
         cols.sort() 
         return make_contab(self._unique_data,self._unique_data_counts,cols,self._arities[cols],self._maxflatcontabsize)[0]
 
+    def contab_stats(self,variable_sets,alpha=None,known=()):
+        '''
+        Compute a statistic of the contingency table of each of many sets of variables:
+        its entropy and number of cells or, if `alpha` is given, its BDeu score component
+        and number of non-zero cells.
+
+        The sets are planned as a traversal of the lattice of variable sets: sets which
+        agree on all but their last variable are packed into joins (their unions), as long as the
+        table of a join has at most a quarter as many cells as there are unique datapoints.
+        Only the table of each join is counted from the data (from the unique datapoints or,
+        if cheaper, the bitmap index, see :py:meth:`bitmap_index`), in a single compiled call,
+        and the tables of its sets are obtained by marginalising it, which takes time
+        proportional to the size of the table rather than to the number of unique datapoints.
+
+        Args:
+         variable_sets (iter): Sets of variables, each a sequence (e.g. a parent set
+          extended by one more parent as its last variable)
+         alpha (float): The *equivalent sample size* if BDeu score components are wanted
+         known (dict/set): Sets of variables (frozensets) which are skipped, e.g. a cache
+
+        Returns:
+         dict: Maps each set of variables (as a frozenset) to its statistic, a pair. The second
+          element of the pair is -1 if the flat contingency table of the set would be too big.
+        '''
+        if self._contabs is not None:
+            tables = self.kept_contabs(variable_sets,known)
+            ptr = np.cumsum([0]+[0 if table is None else len(table) for table in tables.values()])
+            empty = np.empty(0,dtype=np.int64)
+            values, sizes = contab_stats_of_tables(
+                np.concatenate([empty]+[table for table in tables.values() if table is not None]),
+                ptr,1.0 if alpha is None else alpha,alpha is not None)
+            return dict(zip(tables,zip(values.tolist(),sizes.tolist())))
+        derived, join_cols, join_ptr, derived_from, keep, keep_ptr = self._lattice_arrays(variable_sets,known)
+        values, sizes = lattice_contab_stats(
+            self._unique_data,self._unique_data_counts,join_cols,join_ptr,
+            self._arities,self._maxflatcontabsize,derived_from,keep,keep_ptr,
+            1.0 if alpha is None else alpha,alpha is not None,
+            *self.bitmap_index(),self._data_length)
+        return dict(zip(derived,zip(values.tolist(),sizes.tolist())))
+
+    def contab_histograms(self,variable_sets,known=()):
+        '''
+        Compute the histogram of the non-zero counts of the contingency table of each of many sets
+        of variables (see :py:func:`count_histogram`), with the joins of :py:meth:`contab_stats`.
+        Tables too big to be flat are counted by :py:func:`sparse_contab`.
+
+        Args:
+         variable_sets (iter): Sets of variables, see :py:meth:`contab_stats`
+         known (dict/set): Sets of variables (frozensets) which are skipped, e.g. a cache
+
+        Returns:
+         dict: Maps each set of variables (as a frozenset) to a triple: the number of cells of its
+          contingency table (a float, since it may be huge), the distinct non-zero counts and the
+          number of cells with each of them
+        '''
+        if self._contabs is not None:
+            histograms = {}
+            for vset, table in self.kept_contabs(variable_sets,known).items():
+                cols = np.array(sorted([self._varidx[x] for x in vset]),dtype=np.uint32)
+                if table is None:
+                    table = sparse_contab(self._unique_data,self._unique_data_counts,cols,self._arities[cols])
+                histograms[vset] = (float(np.prod(self._arities[cols].astype(np.float64))),) + count_histogram(table)
+            return histograms
+        derived, join_cols, join_ptr, derived_from, keep, keep_ptr = self._lattice_arrays(variable_sets,known)
+        values, multiplicities, ptr = lattice_count_histograms(
+            self._unique_data,self._unique_data_counts,join_cols,join_ptr,
+            self._arities,self._maxflatcontabsize,derived_from,keep,keep_ptr,
+            *self.bitmap_index(),self._data_length)
+        histograms = {}
+        for j, vset in enumerate(derived):
+            cols = np.array(sorted([self._varidx[x] for x in vset]),dtype=np.uint32)
+            cells = float(np.prod(self._arities[cols].astype(np.float64)))
+            if ptr[j+1] > ptr[j] or self._data_length == 0:
+                histograms[vset] = cells, values[ptr[j]:ptr[j+1]], multiplicities[ptr[j]:ptr[j+1]]
+            else:
+                # flat contingency table too big
+                contab = sparse_contab(self._unique_data,self._unique_data_counts,cols,self._arities[cols])
+                histograms[vset] = (cells,) + count_histogram(contab)
+        return histograms
+
+    def _lattice_arrays(self,variable_sets,known):
+        '''
+        The arguments of :py:func:`lattice_contab_stats` which describe the joins of the sets of
+        variables (see :py:meth:`_plan_joins`), preceded by the list of the sets (as frozensets) in the
+        order of their statistics
+        '''
+        varidx = self._varidx
+        join_cols, join_ptr, keep, keep_ptr, derived_from, derived = [], [0], [], [0], [], []
+        for i, (cols, vsets) in enumerate(self._plan_joins(variable_sets,known)):
+            position = {col: pos for pos, col in enumerate(cols)}
+            join_cols.extend(cols)
+            join_ptr.append(len(join_cols))
+            for vset in vsets:
+                keep.extend(sorted([position[varidx[x]] for x in vset]))
+                keep_ptr.append(len(keep))
+                derived_from.append(i)
+                derived.append(vset)
+        return (derived,np.array(join_cols,dtype=np.uint32),np.array(join_ptr,dtype=np.int64),
+                np.array(derived_from,dtype=np.int64),np.array(keep,dtype=np.int64),np.array(keep_ptr,dtype=np.int64))
+
+    def reweighted(self,counts):
+        '''
+        The data whose datapoints are the unique datapoints of this data with other counts, e.g. a bootstrap
+        replicate, which is a multinomial sample of the counts. The reweighted data shares the unique datapoints
+        (and their keys) of this data, so no datapoints are made and the unique datapoints are not found again.
+        Unique datapoints with count 0 are kept, with count 0. The datapoints themselves are only made
+        if asked for (see :py:meth:`rawdata`), so the reweighted data has no bitmap index and no C AD-tree
+        (an AD-tree of the unique datapoints is built on first use instead, see :py:meth:`make_contab_adtree`).
+
+        Args:
+         counts (array_like): The count of each unique datapoint of this data, in the order of the unique datapoints
+
+        Raises:
+         ValueError: If there is not one count for each unique datapoint
+
+        Returns:
+         DiscreteData: The reweighted data
+        '''
+        counts = np.asarray(counts,dtype=self._count_type)
+        if counts.shape != self._unique_data_counts.shape:
+            raise ValueError('Expected {0} counts, one for each unique datapoint, but got {1}'.format(
+                len(self._unique_data_counts),counts.shape))
+        data = DiscreteData.__new__(DiscreteData)
+        data._data = None
+        data._arities = self._arities
+        data._variables = self._variables
+        data._varidx = self._varidx
+        data._unique_data = self._unique_data
+        data._unique_keys = self._unique_keys
+        data._key_layout = self._key_layout
+        data._unique_data_counts = counts
+        data._data_length = int(counts.sum())
+        data._maxflatcontabsize = self._maxflatcontabsize
+        data._contab = np.empty(self._maxflatcontabsize,dtype=np.int32)
+        data._bitmaps = None
+        data._contabs = None
+        data._nbadtree = None
+        data._adtree = None
+        return data
+
+    def keep_contabs(self):
+        '''
+        Keep the contingency table of every set of variables counted by :py:meth:`contab_stats` or
+        :py:meth:`contab_histograms` from now on. Their statistics are then computed from the kept tables
+        (so a statistic evicted from a cache, or one for another `alpha`, is not counted again), and
+        :py:meth:`append` updates the tables with the tables of the new datapoints only.
+        Flat tables are kept, which takes 8 bytes per cell.
+
+        Score objects created from this data share its kept tables.
+        '''
+        if self._contabs is None:
+            self._contabs = {}
+
+    def kept_contabs(self,variable_sets,known=()):
+        '''
+        The kept contingency tables of sets of variables (see :py:meth:`keep_contabs`), counting
+        those not yet kept with the joins of :py:meth:`contab_stats`.
+
+        Args:
+         variable_sets (iter): Sets of variables, see :py:meth:`contab_stats`
+         known (dict/set): Sets of variables (frozensets) which are skipped, e.g. a cache
+
+        Returns:
+         dict: Maps each set of variables (as a frozenset) to its flat contingency table (see
+          :py:func:`make_contab`), or to None if the flat table would be too big
+        '''
+        contabs = self._contabs
+        variable_sets = [tuple(variables) for variables in variable_sets]
+        vsets = [vset for vset in dict.fromkeys(frozenset(variables) for variables in variable_sets) if vset not in known]
+        missing = [variables for variables in variable_sets if frozenset(variables) not in contabs]
+        if missing:
+            derived, join_cols, join_ptr, derived_from, keep, keep_ptr = self._lattice_arrays(missing,known)
+            tables, ptr = lattice_contabs(
+                self._unique_data,self._unique_data_counts,join_cols,join_ptr,
+                self._arities,self._maxflatcontabsize,derived_from,keep,keep_ptr,
+                *self.bitmap_index(),self._data_length)
+            for j, vset in enumerate(derived):
+                contabs[vset] = tables[ptr[j]:ptr[j+1]] if ptr[j+1] > ptr[j] else None
+        return {vset: contabs[vset] for vset in vsets}
+
+    def append(self,data_source):
+        '''
+        Append datapoints to the data.
+
+        The unique datapoints and their counts are merged with those of the new datapoints (see
+        :py:func:`merge_unique_counts`), without counting the existing datapoints again. Contingency tables
+        kept by :py:meth:`keep_contabs` are updated by adding the tables of the new datapoints, so statistics
+        of the grown data are computed from them at a cost which does not depend on the size of the existing data.
+        The datapoints themselves are not kept (see :py:meth:`rawdata`), so the data no longer has a bitmap index
+        or a C AD-tree. An AD-tree built with :py:meth:`build_adtree` is rebuilt from the merged unique
+        datapoints, which costs time in proportion to their number, and otherwise one is built on first use
+        (see :py:meth:`make_contab_adtree`).
+
+        Args:
+         data_source (array_like/Pandas.DataFrame/DiscreteData/str): The new datapoints, or a file containing them
+          (see :py:class:`DiscreteData`). Their variables must be those of this data, in the same order.
+
+        Raises:
+         ValueError: If the new datapoints have other variables, or a value which is not below the arity
+          of its variable
+
+        Returns:
+         DiscreteData: The new datapoints
+        '''
+        if isinstance(data_source,DiscreteData):
+            new = data_source
+        else:
+            new = DiscreteData(data_source,varnames=self._variables,arities=self._arities)
+        if new._variables != self._variables:
+            raise ValueError('Variables of appended data {0} differ from {1}'.format(new._variables,self._variables))
+        if new._data_length > 0 and (new._unique_data >= self._arities).any():
+            raise ValueError('Appended data has values not below the arities {0}'.format(list(self._arities)))
+
+        self._data = None
+        self._data_length += new._data_length
+        if self._unique_keys is not None:
+            # merge the keys, so the existing unique datapoints are not packed again
+            keys, counts = _unique_keys_counts(
+                np.concatenate((self._unique_keys,pack_rows(new._unique_data,self._key_layout))),
+                np.concatenate((self._unique_data_counts,new._unique_data_counts)))
+            self._unique_keys = keys
+            self._unique_data = _unpack_keys(keys,*self._key_layout[:3]).astype(self._value_type)
+            self._unique_data_counts = counts.astype(self._count_type)
+        else:
+            self._unique_data, self._unique_data_counts = merge_unique_counts(
+                (self._unique_data,self._unique_data_counts),(new._unique_data,new._unique_data_counts))
+
+        if self._contabs is not None:
+            # the tables of the new datapoints, counted with joins as well
+            new = DiscreteData(new.rawdata(),varnames=self._variables,arities=self._arities,
+                               unique_counts=(new._unique_data,new._unique_data_counts))
+            new.keep_contabs()
+            new_contabs = new.kept_contabs([tuple(sorted(vset,key=self._varidx.get))
+                                            for vset, table in self._contabs.items() if table is not None])
+            # a new dictionary, since objects created before appending share the old one
+            self._contabs = {vset: None if table is None else table + new_contabs[vset]
+                             for vset, table in self._contabs.items()}
+
+        self._bitmaps = None
+        self._adtree = None
+        if self._nbadtree is not None:
+            self._nbadtree = ADTree(self._unique_data,self._unique_data_counts,self._arities,
+                                    self._nbadtree.leaf_list_threshold)
+        return new
+
+    def build_bitmaps(self):
+        '''
+        Build a bitmap index of the data (see :py:func:`build_bitmaps`). Once built,
+        :py:meth:`contab_stats` counts each contingency table from the bitmaps whenever that
+        is expected to be cheaper than a pass over the unique datapoints.
+
+        Returns:
+         tuple: The bitsets and the row of the bitset for value 0 of each variable
+        '''
+        self._bitmaps = build_bitmaps(self.rawdata(),self._arities)
+        return self._bitmaps
+
+    def bitmap_index(self):
+        '''
+        The bitmap index used by :py:meth:`contab_stats`, built on first use if worthwhile:
+        if the datapoints are kept (see :py:meth:`rawdata`), most variables are binary or ternary, there are
+        at least four unique datapoints for each 64-bit word of a bitset, and the index takes at most 256 MB.
+        Otherwise the index is empty.
+
+        Returns:
+         tuple: The bitsets and the row of the bitset for value 0 of each variable
+        '''
+        if self._bitmaps is None:
+            words = (self._data_length + 63) // 64
+            if (self._data is not None and np.median(self._arities) <= 3 and 4 * words <= len(self._unique_data)
+                and int(self._arities.sum()) * words * 8 <= 2**28):
+                self.build_bitmaps()
+            else:
+                self._bitmaps = np.empty((0,0),dtype=np.uint64), np.empty(0,dtype=np.int64)
+        return self._bitmaps
+
+
+    def _plan_joins(self,variable_sets,known=()):
+        '''
+        Pack sets of variables which agree on all but their last variable into joins,
+        see :py:meth:`contab_stats`
+
+        Returns:
+         list: The joins, each a pair of its columns (ordered low to high) and its sets of variables (as frozensets)
+        '''
+        varidx, arities = self._varidx, self._arities
+        maxjoincells = min(len(self._unique_data)//4,self._maxflatcontabsize)
+
+        groups = {}
+        seen = set()
+        for variables in variable_sets:
+            vset = frozenset(variables)
+            if vset in known or vset in seen:
+                continue
+            seen.add(vset)
+            if len(vset) == 0:
+                groups.setdefault(None,[]).append((vset,None))
+            else:
+                variables = tuple(variables)
+                groups.setdefault(frozenset(variables[:-1]),[]).append((vset,variables[-1]))
+
+        # each join is [columns, number of cells, sets of variables]
+        joins = []
+        for prefix, members in groups.items():
+            prefix_cols = [] if prefix is None else [varidx[x] for x in prefix]
+            prefix_cells = 1
+            for col in prefix_cols:
+                prefix_cells *= int(arities[col])
+            join = None
+            for vset, last in members:
+                arity = 1 if last is None else int(arities[varidx[last]])
+                if join is None or join[1] * arity > maxjoincells:
+                    join = [list(prefix_cols), prefix_cells, []]
+                    joins.append(join)
+                if last is not None:
+                    join[0].append(varidx[last])
+                join[1] *= arity
+                join[2].append(vset)
+
+        return [(sorted(cols), vsets) for cols, _, vsets in joins]
+
+    def build_adtree(self,leaf_list_threshold=256,verbose=0):
+        '''
+        Build an AD-tree for count queries with the Numba implementation in :py:mod:`pygobnilp.nbadtree`,
+        for use when the C implementation is unavailable. Once built it is used by
+        :py:meth:`make_contab_adtree` and so for computing entropies.
+
+        Args:
+         leaf_list_threshold (int): Nodes of the AD-tree with at most this many unique datapoints
+          store the datapoints instead of further nodes
+         verbose (int): How much information to show
+
+        Returns:
+         nbadtree.ADTree: The AD-tree, whose attributes `build_time` (in seconds, including any compilation),
+         `nbytes` and `nodes` report what it cost to build
+        '''
+        self._nbadtree = ADTree(self._unique_data,self._unique_data_counts,self._arities,leaf_list_threshold)
+        if verbose:
+            print('AD-tree with {0} nodes built in {1:.2f} seconds, using {2:.1f} MB'.format(
+                self._nbadtree.nodes,self._nbadtree.build_time,self._nbadtree.nbytes/1e6))
+        return self._nbadtree
+
     def make_contab_adtree(self,variables):
         '''
         Compute a marginal contingency table from data or report
-        that the desired contingency table would be too big. Only usable if the adtree module has been imported; if not, errors
-        will be raised.
+        that the desired contingency table would be too big. Uses the C AD-tree if the adtree module has been
+        imported, or else an AD-tree built with :py:meth:`build_adtree`, which is built here if there is neither.
         
         Args:
          variables (iter): The variables in the marginal contingency table.
@@ -609,7 +2092,12 @@ class DiscreteData(Data):
         '''
         cols = np.array([self._varidx[v] for v in variables], dtype=np.int32)
         cols.sort()
-        size = adtree.contab(self._adtree,cols,self._contab)
+        if self._nbadtree is None and self._adtree is None:
+            self.build_adtree()
+        if self._nbadtree is not None:
+            size = self._nbadtree.contab(cols,self._contab,self._maxflatcontabsize)
+        else:
+            size = adtree.contab(self._adtree,cols,self._contab)
         #print(flatcontab,flush=True)
         return self._contab, size
     
@@ -696,22 +2184,44 @@ class _AbsLLPenalised:
     '''Abstract class for discrete penalised log likelihood scores
     '''
 
-    def __init__(self,data):
+    def __init__(self,data,cache_bytes=None,cache_path=None):
         '''Initialises a `_AbsLLPenalised` object.
 
         Args:
-         data (DiscreteData/Continuous): data
+         data (DiscreteData/Continuous): data. If this is itself a discrete log-likelihood score
+          (e.g. a `DiscreteBIC` object) then its cache of entropies and its upper bounds on the
+          log-likelihood are shared, so that several penalised scores of the same data compute each
+          entropy only once. `cache_bytes` and `cache_path` are then ignored.
+         cache_bytes (int/None): For discrete data, the (estimated) number of bytes the cache of entropies
+          may take, least recently used entropies are evicted beyond it. None for no limit.
+         cache_path (str/None): For discrete data, an SQLite database in which entropies are also stored,
+          keyed by a digest of the data, so that they are reused by later scores of the same data
+          (entropies do not depend on the score). None to keep them in memory only.
         '''
         self.__dict__.update(data.__dict__)
-        self._maxllh = {}
+        if isinstance(data,AbsDiscreteLLScore):
+            # entropies and log-likelihoods do not depend on the penalty
+            self._entropy_cache = data._entropy_cache
+            self._maxllh = data._maxllh
+            return
         if type(data) == ContinuousData:
             # compute and store the sample covariance matrix (the version that gives the MLE)
             self._cov = np.cov(self._data,rowvar=False,bias=True)
             self._gaussianll_cache = {}
             self._log2pi1 = log(2*pi) + 1
         if type(data) == DiscreteData:
-            self._entropy_cache = {}
+            # for upper bounds: adding a parent multiplies the number of parent insts by its arity
+            self._variables_by_arity = sorted(self._variables,key=self.arity)
+            self._cache_path = cache_path
+            self._entropy_cache = make_score_cache(cache_bytes,cache_path,
+                                                   namespace='{0}:entropy'.format(data.digest()) if cache_path else '',
+                                                   variables=self._variables)
 
+        _AbsLLPenalised._set_maxllh(self)
+
+    def _set_maxllh(self):
+        '''Compute the log-likelihood of each variable with all others as parents, for upper bounds'''
+        self._maxllh = {}
         for i, v in enumerate(self._variables):
             self._maxllh[v] = self.ll_score(v,self._variables[:i]+self._variables[i+1:])[0]
 
@@ -744,8 +2254,15 @@ class AbsDiscreteLLScore(DiscreteData):
         if numinsts is None:
             raise ValueError('Too many joint instantiations of parents {0} to compute penalty'.format(parents))
         penalty = numinsts * self._child_penalties[child]
-        # number of parent insts will at least double if any added
-        return this_ll_score - penalty, self._maxllh[child] - (penalty*2)
+        # number of parent insts is multiplied by at least the smallest arity of a variable which can be added
+        return this_ll_score - penalty, self._maxllh[child] - penalty*self._min_added_arity(child,parents)
+
+    def _min_added_arity(self,child,parents):
+        '''The smallest arity of a variable which is neither `child` nor one of `parents` (2 if there is none)'''
+        for v in self._variables_by_arity:
+            if v != child and v not in parents:
+                return int(self.arity(v))
+        return 2
 
     def entropy(self,variables):
         '''
@@ -762,40 +2279,73 @@ class AbsDiscreteLLScore(DiscreteData):
         try:
             return self._entropy_cache[vset]
         except KeyError:
-            if adtree_available: # using global variable makes testing easier
+            if adtree_available or self._nbadtree is not None: # using global variable makes testing easier
                 contab, size = self.make_contab_adtree(variables)
                 if size > 0:
-                    h = entropy(contab[:size])
+                    h = entropy_of_contab(contab[:size])
                     self._entropy_cache[vset] = h, size
                     return h, size
-                else:
-                    # indicate too big
-                    cols = np.array(sorted([self._varidx[x] for x in variables]), dtype=np.uint32)
-                    contab = ()
             else:
-                cols = np.array(sorted([self._varidx[x] for x in variables]), dtype=np.uint32)
-                contab, strides = make_contab(self._unique_data, self._unique_data_counts, cols,
-                                          self._arities[cols], self._maxflatcontabsize)
-            # do it anyway!
-            #contab, strides = make_contab(self._unique_data, self._unique_data_counts, cols,
-            #                              self._arities[cols], self._maxflatcontabsize)
-            #print(contab)
-            
-            numinsts = len(contab)
-            if numinsts == 0:
-                numinsts = None
-                # need to resort to slower method, will move this to numba at some point
-                uniqs, uniq_idxs = np.unique(self._unique_data[:,cols],axis=0,return_inverse=True)
-                contab = np.zeros(len(uniqs),dtype=self._count_type)
-                unique_data_counts = self._unique_data_counts
-                for i in range(len(self._unique_data)):
-                    contab[uniq_idxs[i]] += unique_data_counts[i]
-
-            h = entropy(contab)
-            self._entropy_cache[vset] = h, numinsts
-            return h, numinsts
+                self.entropies([variables])
+                return self._entropy_cache[vset]
+            return self._entropy_too_big(vset)
+
+    def entropies(self,variable_sets):
+        '''
+        Compute the entropies for the empirical distributions of many sets of variables
+        and store them in the entropy cache.
+
+        The contingency tables are computed with :py:meth:`contab_stats`, one compiled call for all
+        sets of the same size, which avoids the per-call overhead of :py:meth:`entropy`. Sets whose flat
+        contingency table would be too big (and all sets, if the ADTree is used) are computed one at a time.
+
+        Args:
+         variable_sets (iter): Sets of variables, see :py:meth:`contab_stats`
+        '''
+        cache = self._entropy_cache
+        if adtree_available or self._nbadtree is not None:
+            for variables in variable_sets:
+                self.entropy(variables)
+            return
+        for vset, (h, numinsts) in self.contab_stats(variable_sets,known=cache).items():
+            cache[vset] = (h, numinsts) if numinsts > 0 else self._entropy_too_big(vset)
+
+    def _entropy_too_big(self,vset):
+        '''
+        Compute the entropy of a set of variables whose flat contingency table would be too big,
+        from its non-zero counts only
+        '''
+        cols = np.array(sorted([self._varidx[x] for x in vset]), dtype=np.uint32)
+        contab = sparse_contab(self._unique_data, self._unique_data_counts, cols, self._arities[cols])
+        h = entropy_of_contab(contab)
+        self._entropy_cache[vset] = h, None
+        return h, None
+
+    def append(self,data_source):
+        '''
+        Append datapoints to the data (see :py:meth:`DiscreteData.append`) and update the entropies:
+        entropies of sets of variables whose contingency table is kept (see :py:meth:`DiscreteData.keep_contabs`)
+        are recomputed from the updated tables, other entropies are dropped. The cache of entropies is
+        replaced by a new one (in the database, if any, under the digest of the grown data), so scores
+        sharing the old cache are not affected.
+
+        Args:
+         data_source (array_like/Pandas.DataFrame/DiscreteData/str): The new datapoints, see :py:meth:`DiscreteData.append`
+
+        Returns:
+         DiscreteData: The new datapoints
+        '''
+        new = DiscreteData.append(self,data_source)
+        old = self._entropy_cache
+        old.close()
+        self._entropy_cache = make_score_cache(old.max_bytes,self._cache_path,
+                                               namespace='{0}:entropy'.format(self.digest()) if self._cache_path else '',
+                                               variables=self._variables)
+        if self._contabs is not None:
+            self.entropies([tuple(vset) for vset in old if self._contabs.get(vset) is not None])
+        _AbsLLPenalised._set_maxllh(self)
+        return new
 
-        
     def ll_score(self,child,parents):
         '''
         The fitted log-likelihood score for `child` having `parents`
@@ -817,13 +2367,15 @@ class AbsDiscreteLLScore(DiscreteData):
 
 class DiscreteLL(AbsDiscreteLLScore):
 
-    def __init__(self,data):
+    def __init__(self,data,cache_bytes=None,cache_path=None):
         '''Initialises a `DiscreteLL` object.
 
         Args:
-         data (DiscreteData): data
+         data (DiscreteData): data, or a discrete log-likelihood score whose entropies are shared, see :py:class:`_AbsLLPenalised`
+         cache_bytes (int/None): Size limit of the entropy cache, see :py:class:`_AbsLLPenalised`
+         cache_path (str/None): Database persisting the entropy cache, see :py:class:`_AbsLLPenalised`
         '''
-        _AbsLLPenalised.__init__(self,data)
+        _AbsLLPenalised.__init__(self,data,cache_bytes,cache_path)
 
 
 
@@ -844,29 +2396,47 @@ class DiscreteLL(AbsDiscreteLLScore):
 
 class DiscreteBIC(AbsDiscreteLLScore):
 
-    def __init__(self,data,k=1):
+    def __init__(self,data,k=1,cache_bytes=None,cache_path=None):
         '''Initialises a `DiscreteBIC` object.
 
         Args:
-         data (DiscreteData): data
+         data (DiscreteData): data, or a discrete log-likelihood score whose entropies are shared, see :py:class:`_AbsLLPenalised`
          k (float): Multiply standard BIC penalty by this amount, so increase for sparser networks
+         cache_bytes (int/None): Size limit of the entropy cache, see :py:class:`_AbsLLPenalised`
+         cache_path (str/None): Database persisting the entropy cache, see :py:class:`_AbsLLPenalised`
         '''
-        _AbsLLPenalised.__init__(self,data)
+        _AbsLLPenalised.__init__(self,data,cache_bytes,cache_path)
+        self._k = k
+        self._set_child_penalties()
+
+    def _set_child_penalties(self):
         fn = 0.5 * log(self._data_length)  # Carvalho notation
-        self._child_penalties = {v:k*fn*(self.arity(v)-1) for v in self._variables}
+        self._child_penalties = {v:self._k*fn*(self.arity(v)-1) for v in self._variables}
+
+    def append(self,data_source):
+        '''
+        Append datapoints and update the entropies, see :py:meth:`AbsDiscreteLLScore.append`.
+        The penalties, which depend on the number of datapoints, are updated too.
+        '''
+        new = AbsDiscreteLLScore.append(self,data_source)
+        self._set_child_penalties()
+        return new
 
 
 class DiscreteAIC(AbsDiscreteLLScore):
 
-    def __init__(self,data,k=1):
+    def __init__(self,data,k=1,cache_bytes=None,cache_path=None):
         '''Initialises an `DiscreteAIC` object.
 
         Args:
-         data (DiscreteData): data
+         data (DiscreteData): data, or a discrete log-likelihood score whose entropies are shared, see :py:class:`_AbsLLPenalised`
          k (float): Multiply standard AIC penalty by this amount, so increase for sparser networks
+         cache_bytes (int/None): Size limit of the entropy cache, see :py:class:`_AbsLLPenalised`
+         cache_path (str/None): Database persisting the entropy cache, see :py:class:`_AbsLLPenalised`
         '''
-        _AbsLLPenalised.__init__(self,data)
-        self._child_penalties = {v:k*(self.arity(v)-1) for v in self._variables}
+        _AbsLLPenalised.__init__(self,data,cache_bytes,cache_path)
+        # arities are uint8, so convert before multiplying
+        self._child_penalties = {v:k*(int(self.arity(v))-1) for v in self._variables}
 
 class AbsGaussianLLScore(ContinuousData):
     """
@@ -1040,20 +2610,43 @@ class BDeu(DiscreteData):
     Discrete data with attributes and methods for BDeu scoring
     """
 
-    def __init__(self,data,alpha=1.0):
+    def __init__(self,data,alpha=1.0,cache_bytes=None,cache_path=None,count_histograms=False):
         '''Initialises a `BDeu` object.
 
         Args:
-         data (DiscreteData): data
+         data (DiscreteData): data. If this is itself a `BDeu` object which keeps count histograms
+          then its histograms (and the atoms for upper bounds) are shared, see `count_histograms`.
          
          alpha (float): The *equivalent sample size*
+         cache_bytes (int/None): The (estimated) number of bytes the cache of BDeu score components
+          may take, least recently used components are evicted beyond it. None for no limit.
+         cache_path (str/None): An SQLite database in which BDeu score components are also stored,
+          keyed by a digest of the data and `alpha`, so that they are reused by later BDeu scores
+          of the same data. None to keep them in memory only.
+         count_histograms (bool): Whether to keep, for each set of variables, the histogram of the
+          non-zero counts of its contingency table and to compute score components from these
+          histograms. Since histograms do not depend on `alpha`, BDeu objects for other values of
+          `alpha` created from this one (`BDeu(this,alpha)`) then never count the data again.
+          Components computed from histograms may differ from the others by rounding.
         '''
         self.__dict__.update(data.__dict__)
+        # the cache of data (if a BDeu object) is for its alpha, so is not shared
+        self._cache = None
         self.alpha = alpha
-        self._cache = {}
+        self._cache_bytes = cache_bytes
+        self._cache_path = cache_path
+        self._cache = self._new_cache()
 
-        # for upper bounds
-        self._atoms = get_atoms(self._data,self._arities)
+        if isinstance(data,BDeu) and data._histograms is not None:
+            self._histograms = data._histograms
+            self._atoms = data._atoms
+        else:
+            self._histograms = {} if count_histograms else None
+            # for upper bounds, computed on first use (see upper_bound_james)
+            self._atoms = None
+        # for upper bounds, keyed by child and alpha divided by the number of parent insts
+        self._james_diffs = {}
+        self._james_arities = self._arities.astype(np.int64)
 
         
     @property
@@ -1073,16 +2666,52 @@ class BDeu(DiscreteData):
         '''
         if not alpha > 0:
             raise ValueError('alpha (equivalent sample size) must be positive but was give {0}'.format(alpha))
+        changed = getattr(self,'_cache',None) is not None and alpha != self._alpha
         self._alpha = alpha
+        if changed:
+            # the cached components are for the old alpha
+            self.clear_cache()
+
+    def _new_cache(self):
+        '''A cache for the BDeu score components of the current alpha'''
+        return make_score_cache(self._cache_bytes,self._cache_path,
+                                namespace='{0}:bdeu:{1!r}'.format(self.digest(),float(self._alpha)) if self._cache_path else '',
+                                variables=self._variables)
 
-    def clear_cache():
+    def clear_cache(self):
         '''Empty the cache of stored BDeu component scores
 
-        This should be called, for example, if new scores are being computed
-        with a different alpha value
+        This is done automatically when `alpha` is changed. Count histograms
+        (see `count_histograms` of :py:class:`BDeu`), which do not depend on alpha, are kept.
         '''
-        self._cache = {}
+        self._cache.close()
+        self._cache = self._new_cache()
         
+    def append(self,data_source):
+        '''
+        Append datapoints to the data (see :py:meth:`DiscreteData.append`) and update the BDeu score components:
+        components (and count histograms) of sets of variables whose contingency table is kept (see
+        :py:meth:`DiscreteData.keep_contabs`) are recomputed from the updated tables, others are dropped.
+        The cache is replaced by a new one (in the database, if any, under the digest of the grown data).
+        The atoms for :py:meth:`upper_bound_james` are recomputed on first use.
+
+        Args:
+         data_source (array_like/Pandas.DataFrame/DiscreteData/str): The new datapoints, see :py:meth:`DiscreteData.append`
+
+        Returns:
+         DiscreteData: The new datapoints
+        '''
+        new = DiscreteData.append(self,data_source)
+        old = self._cache
+        old.close()
+        self._cache = self._new_cache()
+        if self._histograms is not None:
+            self._histograms = {}
+        self._atoms = None
+        if self._contabs is not None:
+            self.bdeu_score_components([tuple(vset) for vset in old if self._contabs.get(vset) is not None])
+        return new
+
     def upper_bound_james(self,child,parents,alpha=None):
         """
         Compute an upper bound on proper supersets of parents
@@ -1103,29 +2732,29 @@ class BDeu(DiscreteData):
         child_idx = self._varidx[child]
         pa_idxs = sorted([self._varidx[v] for v in parents])
         for pa_idx in pa_idxs:
-            alpha /= self._arities[pa_idx]
-        r = self._arities[child_idx]
+            alpha /= int(self._arities[pa_idx])
+        pa_idxs = np.array(pa_idxs,dtype=np.int64)
+        r = int(self._arities[child_idx])
 
         # each element of atoms_ints is a tuple of ints:
         # (fullinst,childvalcounts,sum(childvalcounts),ok_first)
         # each element of atoms_floats is:
         # sum_n n*log(n/tot), where sum is over childvalcounts
         # and tot = sum(childvalcounts)
+        if self._atoms is None:
+            self._atoms = get_atoms(self._unique_data,self._arities,self._unique_data_counts)
+            self._james_diffs = {}
         atoms_ints, atoms_floats = self._atoms[0][child_idx], self._atoms[1][child_idx]
 
         if len(atoms_floats) == 0:
             return 0.0
 
-        # remove cols corresponding to non-parents and order
-        p = len(self._arities)
-        end_idxs = list(range(p,p+r+2))
-        atoms_ints_redux = atoms_ints[:,pa_idxs+end_idxs]
-        if len(pa_idxs) > 0:
-            idxs = np.lexsort([atoms_ints_redux[:,col] for col in range(len(pa_idxs))])
-        else:
-            idxs = list(range(len(atoms_floats)))
-
-        return upper_bound_james_fun(atoms_ints_redux,atoms_floats,len(pa_idxs),alpha,r,idxs)
+        try:
+            diffs = self._james_diffs[child_idx,alpha]
+        except KeyError:
+            diffs = james_diffs(atoms_ints,atoms_floats,alpha,r)
+            self._james_diffs[child_idx,alpha] = diffs
+        return upper_bound_james_atoms(atoms_ints,atoms_floats,diffs,pa_idxs,self._james_arities,r)
         
     def bdeu_score_component(self,variables,alpha=None):
         '''Compute the BDeu score component for a set of variables
@@ -1149,21 +2778,78 @@ class BDeu(DiscreteData):
         if len(variables) == 0:
             return lgamma(alpha) - lgamma(alpha + self._data_length), 1
         else:
+            if self._contabs is not None:
+                table = self.kept_contabs([tuple(variables)])[frozenset(variables)]
+                if table is not None:
+                    return bdeu_component_of_contab(table,alpha)
             cols = np.array(sorted([self._varidx[x] for x in list(variables)]), dtype=np.uint32)
-            return compute_bdeu_component(
-                self._unique_data,self._unique_data_counts,cols,
-                np.array([self._arities[i] for i in cols], dtype=self._arity_type),
-                alpha,self._maxflatcontabsize)
+            arities = np.array([self._arities[i] for i in cols], dtype=self._arity_type)
+            score_non_zero_count = compute_bdeu_component(
+                self._unique_data,self._unique_data_counts,cols,arities,alpha,self._maxflatcontabsize)
+            if score_non_zero_count is None:
+                # flat contingency table too big, so only compute its non-zero counts
+                contab = sparse_contab(self._unique_data,self._unique_data_counts,cols,arities)
+                cells = 1.0
+                for arity in arities:
+                    cells *= float(arity)
+                score_non_zero_count = bdeu_component_of_counts(contab,alpha,cells)
+            return score_non_zero_count
 
     def _bdeu_score_component_cache(self,s):
         s_set = frozenset(s)
         try:
             score_non_zero_count = self._cache[s_set]
         except KeyError:
+            if self._histograms is not None:
+                return self._components_from_histograms([s])[s_set]
             score_non_zero_count = self.bdeu_score_component(s_set)
             self._cache[s_set] = score_non_zero_count
         return score_non_zero_count
 
+    def _components_from_histograms(self,variable_sets):
+        '''
+        Compute the BDeu score components of sets of variables from the histograms of their
+        counts, counting the histograms which are not yet known, and store them in the cache
+        '''
+        variable_sets = [tuple(variables) for variables in variable_sets]
+        histograms = self._histograms
+        histograms.update(self.contab_histograms(variable_sets,known=histograms))
+        vsets = list(dict.fromkeys(frozenset(variables) for variables in variable_sets))
+        ptr = np.zeros(len(vsets)+1,dtype=np.int64)
+        for j, vset in enumerate(vsets):
+            ptr[j+1] = ptr[j] + len(histograms[vset][1])
+        cells = np.array([histograms[vset][0] for vset in vsets],dtype=np.float64)
+        empty = np.empty(0,dtype=np.int64)
+        values = np.concatenate([empty]+[histograms[vset][1] for vset in vsets])
+        multiplicities = np.concatenate([empty]+[histograms[vset][2] for vset in vsets])
+        scores, non_zero_counts = bdeu_components_of_histograms(values,multiplicities,ptr,cells,self._alpha)
+        components = dict(zip(vsets,zip(scores.tolist(),non_zero_counts.tolist())))
+        self._cache.update(components)
+        return components
+
+    def bdeu_score_components(self,variable_sets):
+        '''Compute the BDeu score components for many sets of variables
+        and store them in the cache.
+
+        The contingency tables are computed with :py:meth:`contab_stats`, one compiled call for all
+        sets of the same size. Sets whose flat contingency table would be too big are computed one at a time.
+        If count histograms are kept, components are computed from the histograms, see :py:class:`BDeu`.
+
+        Args:
+         variable_sets (iter) : Sets of variables, see :py:meth:`contab_stats`
+        '''
+        cache = self._cache
+        if self._histograms is not None:
+            self._components_from_histograms([s for s in variable_sets if frozenset(s) not in cache])
+            return
+        if frozenset() not in cache:
+            self._bdeu_score_component_cache(())
+        for s_set, (score, non_zero_count) in self.contab_stats(variable_sets,self._alpha,known=cache).items():
+            if non_zero_count >= 0:
+                cache[s_set] = score, non_zero_count
+            else:
+                self._bdeu_score_component_cache(s_set)
+
     def bdeu_score(self, child, parents):
 
         parent_score, _ = self._bdeu_score_component_cache(parents)
@@ -1171,10 +2857,9 @@ class BDeu(DiscreteData):
 
         simple_ub = -log(self.arity(child)) * non_zero_count
 
-        #james_ub = self.upper_bound_james(child,parents)
+        james_ub = self.upper_bound_james(child,parents)
         
-        #return parent_score - family_score, min(simple_ub,james_ub)
-        return parent_score - family_score, simple_ub
+        return parent_score - family_score, min(simple_ub,james_ub)
 
         
     def bdeu_scores(self,palim=None,pruning=True,alpha=None):
@@ -5,7 +5,7 @@ Proceedings of Machine Learning Research (PMLR). 2024, 246, 486-497.
 """
 
 from typing import Iterable, List, FrozenSet, Set
-from pygobnilp.gobnilp import read_local_scores
+from bnsl.scoring import load_local_scores
 from itertools import combinations
 from bnsl.types import Edge, RunResult
 from bnsl.transforms.downwards_close import downwards_close
@@ -62,13 +62,13 @@ def run(local_scores_path: str, l:int, k:int):
     """ Main function to run the moderately exponential time algorithm (Section 3) 
     for Bayesian network structure learning.
 
-    local_scores_path: Path to the local scores file in JAA format.
+    local_scores_path: Path to the local scores file in JAA format, or the local scores dict.
     l: Number of sets to combine in the last bucket of the partial order.
     k: Total number of sets to partition the variables into.
     returns: A parent map representing the optimal Bayesian network structure found.
     """
 
-    LS_raw= read_local_scores(local_scores_path)
+    LS_raw= load_local_scores(local_scores_path)
     LS = downwards_close(LS_raw)
 
     V: List[str] = list(LS.keys())
@@ -7,7 +7,7 @@ The Journal of Machine Learning Research, 14(1), pp.1387-1415
 from itertools import combinations, product
 from math import ceil, comb
 from typing import List, Dict, Tuple, FrozenSet, Iterable, Set
-from pygobnilp.gobnilp import read_local_scores
+from bnsl.scoring import load_local_scores
 from bnsl.types import Edge, RunResult
 from bnsl.transforms.downwards_close import downwards_close
 
@@ -194,13 +194,13 @@ def run(local_scores_path: str, m: int = 3, p: int = 2):
     """ Main function to run the partial order approach for Bayesian network structure learning.
     Implements the two-bucket partial order scheme.
 
-    local_scores_path: Path to the local scores file in JAA format.
+    local_scores_path: Path to the local scores file in JAA format, or the local scores dict.
     m: Size of each bucket order.
     p: Number of disjoint bucket orders. 
     returns: A parent map representing the optimal Bayesian network structure found.
     """
 
-    LS_raw= read_local_scores(local_scores_path)
+    LS_raw= load_local_scores(local_scores_path)
     LS = downwards_close(LS_raw)
 
     V: List[str] = list(LS.keys())
@@ -6,7 +6,7 @@ arXiv preprint arXiv:1206.6875.
 
 from itertools import combinations
 from typing import List, Dict, FrozenSet, Iterable, Optional, Set
-from pygobnilp.gobnilp import read_local_scores
+from bnsl.scoring import load_local_scores
 from bnsl.types import RunResult
 
 def get_best_parents(
@@ -155,11 +155,13 @@ def ord_2_net(
 
 
 
-def run(path:str) -> Dict[str, Set[str]]:
-    """Compute the optimal network using the Silander-Myllymaki algorithm."""
+def run(path:str | Dict[str, Dict[FrozenSet[str], float]]) -> RunResult:
+    """Compute the optimal network using the Silander-Myllymaki algorithm.
+    path: Path to the local scores file in JAA format, or the local scores dict.
+    """
     
     # Step 1: Compute local scores for all (variable, parent set)-pairs
-    LS = read_local_scores(path)
+    LS = load_local_scores(path)
     V = list(LS.keys())
 
     #  Step 2: For each variable, find the best parent set and its score
@@ -0,0 +1,143 @@
+"""
+Fast reader for discrete Bayesian networks in BIF format.
+
+The networks are parsed with regular expressions straight into the DAG and dense CPT arrays.
+Parsed networks are kept for the rest of the process, and, if an artifact cache is given, in the
+cache (keyed by the hash of the BIF file), so that every network is parsed only once per machine.
+"""
+
+import json
+import re
+from dataclasses import dataclass
+from typing import Dict, List, Tuple
+import numpy as np
+from bnsl.cache import ArtifactCache, file_digest
+
+PARSER_VERSION = 1  # part of the cache key, bump when the parsed representation changes
+
+_COMMENT = re.compile(r"//[^\n]*|/\*.*?\*/", re.DOTALL)
+_VARIABLE = re.compile(r"variable\s+([^\s{]+)\s*\{\s*type\s+discrete\s*\[\s*(\d+)\s*\]\s*\{([^}]*)\}\s*;")
+_PROBABILITY = re.compile(r"probability\s*\(\s*([^|)]+?)\s*(?:\|\s*([^)]*?))?\s*\)\s*\{([^}]*)\}")
+_ROW = re.compile(r"\(([^)]*)\)\s*([^;]*);")
+_TABLE = re.compile(r"\b(table|default)\s+([^;]*);")
+
+
+@dataclass
+class BIFNetwork:
+    """A discrete Bayesian network.
+    variables: Variable names, in the order in which they are declared.
+    states: For each variable, its state names in declaration order.
+    parents: For each variable, its parents, in the order used by its CPT.
+    cpts: For each variable, the CPT of shape (*parent arities, arity); the last axis sums to 1.
+    """
+    variables: List[str]
+    states: Dict[str, List[str]]
+    parents: Dict[str, List[str]]
+    cpts: Dict[str, np.ndarray]
+
+    def arities(self) -> List[int]:
+        """Number of states of each variable, in declaration order."""
+        return [len(self.states[var]) for var in self.variables]
+
+    def edges(self) -> List[Tuple[str, str]]:
+        """Edges (parent, child) of the DAG."""
+        return [(parent, child) for child in self.variables for parent in self.parents[child]]
+
+    def parent_map(self) -> Dict[str, frozenset]:
+        """The DAG as a parent map, child -> set of parents."""
+        return {child: frozenset(self.parents[child]) for child in self.variables}
+
+
+def parse_bif(text: str) -> BIFNetwork:
+    """Parse the contents of a BIF file.
+    text: The contents of the BIF file.
+    returns: The parsed network.
+    """
+    text = _COMMENT.sub("", text)
+
+    variables, states = [], {}
+    for match in _VARIABLE.finditer(text):
+        var = match.group(1)
+        var_states = [state.strip() for state in match.group(3).split(",")]
+        if len(var_states) != int(match.group(2)):
+            raise ValueError(f"Variable {var} declares {match.group(2)} states but lists {len(var_states)}")
+        variables.append(var)
+        states[var] = var_states
+
+    parents, cpts = {}, {}
+    for match in _PROBABILITY.finditer(text):
+        var = match.group(1)
+        var_parents = [parent.strip() for parent in match.group(2).split(",")] if match.group(2) else []
+        parent_cards = [len(states[parent]) for parent in var_parents]
+        arity = len(states[var])
+        body = match.group(3)
+
+        cpt = np.full((*parent_cards, arity), np.nan)
+        for keyword, values in _TABLE.findall(body):
+            values = _parse_values(values)
+            if keyword == "default":
+                cpt[np.isnan(cpt[..., 0])] = values
+            else:
+                # the full table lists the child states slowest, as in pgmpy
+                cpt[...] = np.moveaxis(values.reshape(arity, *parent_cards), 0, -1)
+        for config, values in _ROW.findall(body):
+            index = tuple(states[parent].index(state.strip())
+                          for parent, state in zip(var_parents, config.split(",")))
+            cpt[index] = _parse_values(values)
+        if np.isnan(cpt).any():
+            raise ValueError(f"Incomplete CPT for variable {var}")
+
+        parents[var] = var_parents
+        cpts[var] = cpt
+
+    missing = set(variables) - set(cpts)
+    if missing:
+        raise ValueError(f"No probability block for variables {sorted(missing)}")
+    return BIFNetwork(variables, states, parents, cpts)
+
+
+def _parse_values(values: str) -> np.ndarray:
+    return np.array([float(v) for v in values.replace(",", " ").split()])
+
+
+# networks already loaded by this process, by digest of the BIF file
+_loaded: Dict[str, BIFNetwork] = {}
+
+
+def load_bif(network_path: str, cache: ArtifactCache | None = None) -> BIFNetwork:
+    """Load a BIF network, parsing the file only if this process has not loaded it yet and it is not
+    in the artifact cache.
+    network_path: Path to the BIF file.
+    cache: Artifact cache in which the parsed network is stored, None to keep it in memory only.
+    returns: The parsed network.
+    """
+    digest = file_digest(str(network_path))
+    if digest in _loaded:
+        return _loaded[digest]
+    if cache is None:
+        with open(network_path, "r", encoding="utf-8") as f:
+            _loaded[digest] = parse_bif(f.read())
+        return _loaded[digest]
+
+    def write(write_path: str) -> None:
+        with open(network_path, "r", encoding="utf-8") as f:
+            _save_network(parse_bif(f.read()), write_path)
+
+    path = cache.get_or_create("networks", {"network": digest, "parser": PARSER_VERSION}, "network.npz", write)
+    _loaded[digest] = _load_network(path)
+    return _loaded[digest]
+
+
+def _save_network(network: BIFNetwork, write_path: str) -> None:
+    """Store a parsed network as an .npz archive, with the structure as a JSON string."""
+    structure = {"variables": network.variables, "states": network.states, "parents": network.parents}
+    arrays = {f"cpt_{i}": network.cpts[var] for i, var in enumerate(network.variables)}
+    with open(write_path, "wb") as f:
+        np.savez(f, structure=np.array(json.dumps(structure)), **arrays)
+
+
+def _load_network(path: str) -> BIFNetwork:
+    with np.load(path) as archive:
+        structure = json.loads(str(archive["structure"]))
+        cpts = {var: archive[f"cpt_{i}"] for i, var in enumerate(structure["variables"])}
+    return BIFNetwork(structure["variables"], structure["states"], structure["parents"], cpts)
@@ -0,0 +1,167 @@
+import hashlib
+import json
+import logging
+import os
+import shutil
+import tempfile
+from pathlib import Path
+from typing import Callable, Dict, Iterable, Optional, Tuple
+
+DEFAULT_CACHE_DIR = "data/cache"
+DEFAULT_MAX_BYTES = 10 * 1024**3  # 10 GB
+
+logger = logging.getLogger(__name__)
+
+
+# digests of the files already read, keyed by path, size and modification time
+_file_digests: Dict[Tuple[str, int, int], str] = {}
+
+def file_digest(path: str, chunk_size: int = 1 << 20) -> str:
+    """Compute the SHA-256 digest of the contents of a file.
+    The digest is remembered for the path, size and modification time of the file,
+    so an unchanged file is only read once per process.
+    path: Path to the file.
+    returns: Hex digest of the file contents.
+    """
+    stat = os.stat(path)
+    key = (os.path.abspath(path), stat.st_size, stat.st_mtime_ns)
+    digest = _file_digests.get(key)
+    if digest is None:
+        h = hashlib.sha256()
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(chunk_size), b""):
+                h.update(chunk)
+        digest = _file_digests[key] = h.hexdigest()
+    return digest
+
+
+def artifact_key(**fields) -> str:
+    """Compute the content address of an artifact from the fields that determine it.
+    fields: JSON-serialisable values, e.g. network digest, sample size, seed, score name.
+    returns: Hex digest identifying the artifact.
+    """
+    payload = json.dumps(fields, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class ArtifactCache:
+    """
+    Content-addressed store for generated artifacts (sampled datasets, local scores).
+
+    Every artifact lives in its own entry directory root/<kind>/<key>/, where key is the
+    hash of everything that determines the artifact. Entries are written to a temporary
+    directory and renamed into place, so readers never see partially written files.
+    The total size of the cache is kept below max_bytes by evicting the least recently
+    used entries. The total is counted once and then kept up to date as entries are stored,
+    so the entries are only listed again when it goes over max_bytes (entries stored by other
+    processes are counted from then on).
+    """
+
+    def __init__(self, root: str = DEFAULT_CACHE_DIR, max_bytes: Optional[int] = DEFAULT_MAX_BYTES):
+        self.root = Path(root)
+        self.max_bytes = max_bytes
+        self._total: Optional[int] = None  # bytes of all entries, None until first counted
+
+    def entry_dir(self, kind: str, key: str) -> Path:
+        """Directory holding the artifact of the given kind and key."""
+        return self.root / kind / key
+
+    def get(self, kind: str, key: str, file_name: str) -> Optional[str]:
+        """Look up an artifact, marking it as recently used.
+        returns: Path to the artifact file, or None on a cache miss.
+        """
+        entry = self.entry_dir(kind, key)
+        path = entry / file_name
+        if not path.exists():
+            return None
+        os.utime(entry)
+        return str(path)
+
+    def put(self, kind: str, key: str, file_name: str, write: Callable[[str], None], meta: Optional[dict] = None, keep: Iterable[Path] = ()) -> str:
+        """Atomically store an artifact.
+        write: Callable that writes the artifact to the path it is given.
+        meta: Optional fields describing the artifact, stored next to it as meta.json.
+        keep: Other entries that must not be evicted to make room for it, e.g. artifacts still in use.
+        returns: Path to the stored artifact file.
+        """
+        entry = self.entry_dir(kind, key)
+        entry.parent.mkdir(parents=True, exist_ok=True)
+
+        tmp_dir = Path(tempfile.mkdtemp(prefix=f".{key[:16]}-", dir=entry.parent))
+        try:
+            write(str(tmp_dir / file_name))
+            if meta is not None:
+                with open(tmp_dir / "meta.json", "w", encoding="utf-8") as f:
+                    json.dump(meta, f, indent=2, sort_keys=True)
+            try:
+                os.rename(tmp_dir, entry)
+            except OSError:
+                # another process stored the same artifact first, keep theirs
+                if not (entry / file_name).exists():
+                    raise
+        finally:
+            if tmp_dir.exists():
+                shutil.rmtree(tmp_dir, ignore_errors=True)
+
+        os.utime(entry)
+        if self._total is not None:
+            self._total += self._entry_size(entry)
+        self.evict(keep=[entry, *keep])
+        return str(entry / file_name)
+
+    def get_or_create(self, kind: str, fields: dict, file_name: str, write: Callable[[str], None]) -> str:
+        """Return the cached artifact determined by fields, creating it with write on a miss."""
+        key = artifact_key(kind=kind, **fields)
+        path = self.get(kind, key, file_name)
+        if path is not None:
+            logger.info("Cache hit: %s. Skipped creating %s.", path, kind)
+            return path
+        return self.put(kind, key, file_name, write, meta=fields)
+
+    def _entries(self):
+        """List (last_used, size, path) for every entry in the cache."""
+        entries = []
+        if not self.root.exists():
+            return entries
+        for kind_dir in self.root.iterdir():
+            if not kind_dir.is_dir():
+                continue
+            for entry in kind_dir.iterdir():
+                if not entry.is_dir() or entry.name.startswith("."):
+                    continue
+                entries.append((entry.stat().st_mtime, self._entry_size(entry), entry))
+        return entries
+
+    @staticmethod
+    def _entry_size(entry: Path) -> int:
+        return sum(f.stat().st_size for f in entry.rglob("*") if f.is_file())
+
+    def size(self) -> int:
+        """Total size in bytes of all cached artifacts."""
+        self._total = sum(size for _, size, _ in self._entries())
+        return self._total
+
+    def evict(self, keep: Iterable[Path] = ()) -> None:
+        """Remove least recently used entries until the cache fits in max_bytes.
+        Does nothing while the tracked total size is within max_bytes.
+        keep: Entries that must not be evicted (e.g. the one just written).
+        """
+        if self.max_bytes is None or (self._total is not None and self._total <= self.max_bytes):
+            return
+        keep = set(keep)
+        entries = sorted(self._entries(), key=lambda e: e[0])
+        total = sum(size for _, size, _ in entries)
+        for _, size, entry in entries:
+            if total <= self.max_bytes:
+                break
+            if entry in keep:
+                continue
+            shutil.rmtree(entry, ignore_errors=True)
+            total -= size
+        self._total = total
+
+    def clear(self) -> None:
+        """Remove every cached artifact."""
+        if self.root.exists():
+            shutil.rmtree(self.root)
+        self._total = 0
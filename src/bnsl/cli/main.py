@@ -1,9 +1,11 @@
 from __future__ import annotations
 import argparse, sys
 from bnsl.utils.timer import Timer
-from bnsl.sampling import sample_data
+from bnsl.sampling import sample_data, sample_sweep
 from bnsl.transforms.shifts import get_shift, get_upper_bound
 from bnsl.scoring import write_local_scores, read_local_scores
+from bnsl.cache import ArtifactCache, DEFAULT_CACHE_DIR
+from bnsl.pipeline import sample_and_score, run_algorithm
 from pathlib import Path
 import yaml
 import json
@@ -65,33 +67,34 @@ def _write_results_summary(
 
     print(f"[{algorithm}] Results written to {output_path}")
 
-def _single_run(algorithm: str, network: str, num_samples: int,  write_path: str, seed: int, jaa_path: str=None, **algo_kwargs) -> None:
-    """Run a single experiment with the specified parameters."""
-    # Generate data 
-    if not jaa_path:
-        dat_path = sample_data(network, num_samples, seed=seed)
-        jaa_path = write_local_scores(dat_path)
-
+def _local_scores(network: str, num_samples: int, seed: int, cache: ArtifactCache=None, data_format: str="dat", sampler: str="pgmpy", n_jobs: int=1, score_cache_bytes: int=None, score_cache_path: str=None, in_memory: bool=False, artifacts_dir: str=None) -> dict:
+    """Sample data from a network and compute its local scores, once for all parameter sets of an algorithm.
+    With in_memory the data and local scores never go through the artifact cache (see bnsl.pipeline.sample_and_score).
+    returns: Local scores dict.
+    """
+    if in_memory:
+        # sampled data and local scores never go through text files
+        return sample_and_score(network, num_samples, seed, write_dir=artifacts_dir, format=data_format, sampler=sampler,
+                                n_jobs=n_jobs, score_cache_bytes=score_cache_bytes, score_cache_path=score_cache_path)
+    dat_path = sample_data(network, num_samples, seed=seed, cache=cache, format=data_format, sampler=sampler)
+    jaa_path = write_local_scores(dat_path, cache=cache, n_jobs=n_jobs,
+                                  score_cache_bytes=score_cache_bytes, score_cache_path=score_cache_path)
+    return read_local_scores(jaa_path)
+
+def _single_run(algorithm: str, network: str, num_samples: int,  write_path: str, seed: int, LS: dict, **algo_kwargs) -> None:
+    """Run a single experiment with the specified parameters on local scores LS."""
     kwargs = {}
 
-    LS = read_local_scores(jaa_path)
-
     bounds = {}
     naive_ub = sum(max(scores.values()) for scores in LS.values())
     bounds["naive_upper_bound"] = round(naive_ub, 3)
 
     timer = Timer()
     timer.start()
-    if algorithm == "silander_myllymaki":
-        from bnsl.algorithms.silander_myllymaki import run
-        result = run(jaa_path)
-    elif algorithm == "partial_order_approach": 
-        from bnsl.algorithms.partial_order_approach import run
-        result = run(jaa_path, m=algo_kwargs.get("m"), p=algo_kwargs.get("p"))
+    result = run_algorithm(algorithm, LS, **algo_kwargs)
+    if algorithm == "partial_order_approach": 
         kwargs.update({"m": algo_kwargs.get("m"), "p": algo_kwargs.get("p")})
-    else:
-        from bnsl.algorithms.approximation_algorithm import run
-        result = run(jaa_path, l=algo_kwargs.get("l"), k=algo_kwargs.get("k"))
+    elif algorithm == "approximation_algorithm":
         kwargs.update({"l": algo_kwargs.get("l"), "k": algo_kwargs.get("k")})
         
     if algorithm == "approximation_algorithm":
@@ -130,6 +133,8 @@ def main(argv: list[str] | None = None) -> int:
     ap.add_argument("config", type=str, help="Path to the configuration file (YAML)")
     ap.add_argument("--write_path",type=str,default=None, help="Directory where result summaries should be written (optional)",)
     ap.add_argument("--verbose", action="store_true", help="Whether to print current experiment configuration")
+    ap.add_argument("--in_memory", action="store_true", help="Pass sampled data and local scores between stages in memory instead of through .dat/.jaa files in the artifact cache")
+    ap.add_argument("--artifacts_dir", type=str, default=None, help="With --in_memory, also write the .dat and .jaa files to this directory (optional)")
     
     args = ap.parse_args(argv)
 
@@ -139,6 +144,12 @@ def main(argv: list[str] | None = None) -> int:
     assert "algorithm" in cfg, "Configuration file must specify 'algorithm'"
     assert "networks" in cfg or "networks_dir" in cfg or "local_scores" in cfg or "local_scores_dir" in cfg, "Configuration file must specify some networks or local_scores"
 
+    max_gb = cfg.get("cache_max_gb", 10)
+    cache = ArtifactCache(
+        root=cfg.get("cache_dir", DEFAULT_CACHE_DIR),
+        max_bytes=None if max_gb is None else int(max_gb * 1024**3),
+    )
+
     seed_cfg = cfg.get("seed", 42)
     if isinstance(seed_cfg, int):
         seeds = [seed_cfg]
@@ -154,22 +165,23 @@ def main(argv: list[str] | None = None) -> int:
         p = Path(local_scores_dir)
         local_scores.extend([str(f) for f in p.glob("*.jaa")])
 
-    if len(local_scores) > 0:
-        algo = cfg["algorithm"]
-
-        if algo == "approximation_algorithm":
-            param_grid = cfg.get("k_l_grid", [{"k": 4, "l": 2}])
-        elif algo == "partial_order_approach":
-            param_grid = cfg.get("m_p_grid", [{"m": 3, "p": 2}])
-        elif algo == "silander_myllymaki":
-            # no extra params
-            param_grid = [dict()]
-        else:
-            raise ValueError(f"Unknown algorithm: {algo}")
+    algo = cfg["algorithm"]
+    if algo == "approximation_algorithm":
+        param_grid = cfg.get("k_l_grid", [{"k": 4, "l": 2}])
+    elif algo == "partial_order_approach":
+        param_grid = cfg.get("m_p_grid", [{"m": 3, "p": 2}])
+    elif algo == "silander_myllymaki":
+        # no extra params
+        param_grid = [dict()]
+    else:
+        raise ValueError(f"Unknown algorithm: {algo}")
 
+    if len(local_scores) > 0:
         for jaa_path in local_scores:
             network, num_samples = _get_cfg_from_jaa(jaa_path)
 
+            LS = read_local_scores(jaa_path)
+
             for seed in seeds:
                 for param_set in param_grid:
                     if args.verbose:
@@ -186,7 +198,7 @@ def main(argv: list[str] | None = None) -> int:
                         num_samples=num_samples,
                         write_path=args.write_path,
                         seed=seed,
-                        jaa_path=jaa_path, 
+                        LS=LS,
                         **param_set,
                     )
 
@@ -200,59 +212,42 @@ def main(argv: list[str] | None = None) -> int:
         p = Path(networks_dir)
         networks.extend([str(f) for f in p.glob("*.bif")])
     
+    sample_sizes = cfg.get("sample_sizes", [10000])
+    common = dict(
+        cache=cache,
+        data_format=cfg.get("data_format", "dat"),
+        sampler=cfg.get("sampler", "pgmpy"),
+        n_jobs=cfg.get("n_jobs", 1),
+        score_cache_bytes=cfg.get("score_cache_bytes"),
+        score_cache_path=cfg.get("score_cache_path"),
+        in_memory=args.in_memory,
+        artifacts_dir=args.artifacts_dir,
+    )
     for seed in seeds:
         for network in networks:
-            for num_samples in cfg.get("sample_sizes", [10000]):
-                if cfg["algorithm"] == "approximation_algorithm":
-                    for param_set in cfg.get("k_l_grid", [{"k":4, "l":2}]):
-                        if args.verbose:
-                            _print_current(
-                                algorithm=cfg["algorithm"],
-                                network=network,
-                                num_samples=num_samples,
-                                **param_set
-                            )
-                        _single_run(
-                            algorithm=cfg["algorithm"],
-                            network=network,
-                            num_samples=num_samples,
-                            write_path=args.write_path,
-                            seed=seed,
-                            **param_set
-                        )
-                elif cfg["algorithm"] == "partial_order_approach":
-                    for param_set in cfg.get("m_p_grid", [{"m":3, "p":2}]):
-                        if args.verbose:
-                            _print_current(
-                                algorithm=cfg["algorithm"],
-                                network=network,
-                                num_samples=num_samples,
-                                **param_set
-                            )
-                        _single_run(
-                            algorithm=cfg["algorithm"],
-                            network=network,
-                            num_samples=num_samples,
-                            write_path=args.write_path,
-                            seed=seed,
-                            **param_set
-                        )
-                elif cfg["algorithm"] == "silander_myllymaki":
+            if common["sampler"] == "native" and not args.in_memory:
+                # sample the largest size once, the smaller datasets are its prefixes
+                sample_sweep(network, sample_sizes, seed, cache=cache, format=common["data_format"])
+            for num_samples in sample_sizes:
+                # the local scores do not depend on the parameters of the algorithm
+                LS = _local_scores(network, num_samples, seed, **common)
+                for param_set in param_grid:
                     if args.verbose:
                         _print_current(
-                            algorithm=cfg["algorithm"],
+                            algorithm=algo,
                             network=network,
-                            num_samples=num_samples
+                            num_samples=num_samples,
+                            **param_set
                         )
                     _single_run(
-                        algorithm=cfg["algorithm"],
+                        algorithm=algo,
                         network=network,
                         num_samples=num_samples,
+                        write_path=args.write_path,
                         seed=seed,
-                        write_path=args.write_path
+                        LS=LS,
+                        **param_set
                     )
-                else:
-                    raise ValueError(f"Unknown algorithm: {cfg['algorithm']}")
 
 if __name__ == "__main__":
     sys.exit(main())
\ No newline at end of file
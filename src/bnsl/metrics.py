@@ -1,11 +1,14 @@
-from typing import Dict, Set
-from pgmpy.readwrite import BIFReader
-import rpy2.robjects as ro
-import rpy2.robjects.packages as rpackages
+from typing import Dict, FrozenSet, Iterable, List, Set, Tuple
+import numpy as np
+from pygobnilp.scoring import DiscreteData
+from bnsl.bif import load_bif
+from bnsl.cache import file_digest
+from bnsl.scoring import as_discrete_data, local_score_function
+from bnsl.types import Dataset, Edge, RunResult
 
 def compute_shd(network_path: str, pm_learned: Dict[str, Set[str]]) -> int:
     """
-    Compute SHD between CPDAGs of true and learned networks using bnlearn in R.
+    Compute SHD between CPDAGs of true and learned networks, as bnlearn's shd does.
     Args:
         network_path: Path to the BIF file of the true Bayesian network.
         pm_learned: Learned parent mapping, given as a dict
@@ -14,35 +17,166 @@ def compute_shd(network_path: str, pm_learned: Dict[str, Set[str]]) -> int:
     Returns:
         int: SHD
     """
-    reader = BIFReader(network_path)
-    true_model = reader.get_model()
-    true_edges = list(true_model.edges()) 
+    return compute_shd_batch(network_path, [pm_learned])[0]
 
-    learned_edges = [(p, c) for c, parents in pm_learned.items() for p in parents]
+def compute_shd_batch(network_path: str, pms_learned: Iterable[Dict[str, Set[str]]]) -> List[int]:
+    """
+    Compute the SHD of many learned networks against the same true network.
+    The CPDAG of the true network is computed only once.
+    Args:
+        network_path: Path to the BIF file of the true Bayesian network.
+        pms_learned: Learned parent mappings, each a dict child -> set of parents.
+
+    Returns:
+        List[int]: SHD of each learned network
+    """
+    variables, true = true_cpdag(network_path)
+    learned = [dag_to_cpdag(parent_map_to_adjacency(pm, variables)) for pm in pms_learned]
+    if not learned:
+        return []
+    return [int(shd) for shd in cpdag_shd(true, np.stack(learned))]
+
+def edge_frequencies(results: Iterable[RunResult]) -> Dict[Edge, float]:
+    """
+    Fraction of learned networks having each directed edge, e.g. of networks learned from bootstrap replicates.
+    Args:
+        results: Learned networks.
+
+    Returns:
+        Dict[Edge, float]: (parent, child) -> fraction of networks with that edge, for edges
+            in at least one network, sorted by edge
+    """
+    counts, n = {}, 0
+    for result in results:
+        n += 1
+        for child, parents in result.pm.items():
+            for parent in parents:
+                counts[parent, child] = counts.get((parent, child), 0) + 1
+    return {edge: counts[edge] / n for edge in sorted(counts)}
+
+def parent_map_to_adjacency(pm: Dict[str, Set[str]], variables: List[str]) -> np.ndarray:
+    """
+    Adjacency matrix of a DAG given as a parent map, A[i, j] is True iff there is an edge i -> j.
+    Variables missing from the parent map have no parents.
+    """
+    index = {var: i for i, var in enumerate(variables)}
+    unknown = ({child for child in pm} | {p for parents in pm.values() for p in parents}) - set(index)
+    if unknown:
+        raise ValueError(f"Variables not in the true network: {sorted(unknown)}")
+    A = np.zeros((len(variables), len(variables)), dtype=bool)
+    for child, parents in pm.items():
+        for parent in parents:
+            A[index[parent], index[child]] = True
+    return A
+
+def dag_to_cpdag(A: np.ndarray) -> np.ndarray:
+    """
+    CPDAG (essential graph) of a DAG: the edges of v-structures are compelled, and further
+    edges are oriented with Meek's rules 1-3, which gives the CPDAG when starting from a DAG.
+    Args:
+        A: Adjacency matrix of the DAG, A[i, j] is True iff there is an edge i -> j.
 
-    bnlearn = rpackages.importr("bnlearn")
-    base = rpackages.importr("base")
+    Returns:
+        np.ndarray: Adjacency matrix G of the CPDAG, with G[i, j] and not G[j, i] for a directed
+            edge i -> j, and both G[i, j] and G[j, i] for an undirected edge i - j.
+    """
+    A = np.asarray(A, dtype=bool)
+    n = len(A)
+    adjacent = A | A.T
+    nonadjacent = ~adjacent & ~np.eye(n, dtype=bool)
+
+    # v-structures i -> k <- j with i and j not adjacent
+    directed = np.zeros_like(A)
+    for k in range(n):
+        parents = A[:, k]
+        in_v_structure = (nonadjacent & parents[None, :]).any(axis=1) & parents
+        directed[in_v_structure, k] = True
+    undirected = adjacent & ~(directed | directed.T)
 
-    nodes = sorted({u for (u, _) in true_edges} | {v for (_, v) in true_edges})
+    changed = True
+    while changed:
+        D, N = directed.astype(np.int64), nonadjacent.astype(np.int64)
+        # rule 1: a -> b - c with a and c not adjacent gives b -> c
+        orient = undirected & ((D.T @ N) > 0)
+        # rule 2: a -> b -> c with a - c gives a -> c
+        orient |= undirected & ((D @ D) > 0)
+        # rule 3: a - c -> b and a - d -> b with c and d not adjacent gives a -> b
+        for a, b in zip(*np.nonzero(undirected & ~orient)):
+            middle = undirected[a] & directed[:, b]
+            if middle.sum() > 1 and (nonadjacent[np.ix_(middle, middle)]).any():
+                orient[a, b] = True
+        orient &= ~orient.T  # both directions can only be implied by an inconsistent graph
+        changed = orient.any()
+        directed |= orient
+        undirected &= ~(orient | orient.T)
 
-    ro.globalenv["true_nodes"] = ro.StrVector(nodes)
-    ro.globalenv["true_from"] = ro.StrVector([u for u, v in true_edges])
-    ro.globalenv["true_to"]   = ro.StrVector([v for u, v in true_edges])
+    return directed | undirected
 
-    ro.globalenv["learn_from"] = ro.StrVector([u for u, v in learned_edges])
-    ro.globalenv["learn_to"]   = ro.StrVector([v for u, v in learned_edges])
+def cpdag_shd(G: np.ndarray, H: np.ndarray) -> np.ndarray:
+    """
+    Structural Hamming distance between CPDAGs: the number of pairs of variables whose edge
+    differs (missing, extra, or with a different orientation, including directed vs. undirected).
+    H may be a stack of CPDAGs, each of which is compared with G.
+    """
+    differs = (G != H) | (np.swapaxes(G, -1, -2) != np.swapaxes(H, -1, -2))
+    return np.triu(differs, k=1).sum(axis=(-2, -1))
+
+# CPDAGs of the true networks, by digest of the BIF file
+_true_cpdags: Dict[str, tuple] = {}
+
+def true_cpdag(network_path: str) -> tuple:
+    """
+    CPDAG of the network in a BIF file, computed once per network and process.
+    Returns:
+        tuple: The variables (in BIF declaration order) and the adjacency matrix of the CPDAG.
+    """
+    digest = file_digest(str(network_path))
+    if digest not in _true_cpdags:
+        network = load_bif(network_path)
+        variables = network.variables
+        _true_cpdags[digest] = (variables, dag_to_cpdag(parent_map_to_adjacency(network.parent_map(), variables)))
+    return _true_cpdags[digest]
 
-    # R code 
-    shd_value = ro.r("""
-        true_dag <- empty.graph(true_nodes)
-        arcs(true_dag) <- data.frame(from=true_from, to=true_to)
+def score_parent_map(data: str | Dataset | DiscreteData, pm: Dict[str, Set[str]], score: str = "DiscreteBIC", **score_params) -> float:
+    """
+    Score a DAG against a dataset, as the sum of its local scores.
+    Args:
+        data: Path to a .dat (or .npy) file, an in-memory dataset or the discrete data.
+        pm: Parent mapping, child -> set of parents.
+        score: Name of the pygobnilp score, e.g. DiscreteBIC or BDeu.
+        score_params: Extra parameters for the score, e.g. k for DiscreteBIC or alpha for BDeu.
 
-        learned_dag <- empty.graph(true_nodes)
-        arcs(learned_dag) <- data.frame(from=learn_from, to=learn_to)
+    Returns:
+        float: The score of the DAG
+    """
+    return score_parent_maps(data, [pm], score=score, **score_params)[0]
 
-        # CPDAG-based SHD (default behaviour)
-        shd(true_dag, learned_dag)
-    """)
+def score_parent_maps(data: str | Dataset | DiscreteData, pms: Iterable[Dict[str, Set[str]]], score: str = "DiscreteBIC", **score_params) -> List[float]:
+    """
+    Score many DAGs against the same dataset.
+    The data is counted with pygobnilp's kernels, and a family (child and parent set) that occurs
+    in several DAGs is scored only once. The entropies of the parent sets are cached as well,
+    so families that share variables also share contingency tables.
+    Args:
+        data: Path to a .dat (or .npy) file, an in-memory dataset or the discrete data.
+        pms: Parent mappings, each a dict child -> set of parents.
+        score: Name of the pygobnilp score, e.g. DiscreteBIC or BDeu.
+        score_params: Extra parameters for the score, e.g. k for DiscreteBIC or alpha for BDeu.
 
-    return int(shd_value[0])
+    Returns:
+        List[float]: The score of each DAG
+    """
+    data = as_discrete_data(data)
+    local_score = local_score_function(data, score, **score_params)
+    families: Dict[Tuple[str, FrozenSet[str]], float] = {}
 
+    scores = []
+    for pm in pms:
+        total = 0.0
+        for child in data.variables():
+            family = (child, frozenset(pm.get(child, ())))
+            if family not in families:
+                families[family] = local_score(child, sorted(family[1]))[0]
+            total += families[family]
+        scores.append(total)
+    return scores
@@ -0,0 +1,202 @@
+"""
+In-memory sampling -> scoring -> structure learning pipeline.
+
+The sampled integer matrix and the local scores are passed between the stages as Python
+objects, so no .dat or .jaa text files are written and re-parsed. Writing them is an
+optional side effect (write_dir) for reproducibility.
+"""
+
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Dict, Iterable, List
+import numpy as np
+from pygobnilp.scoring import DiscreteData, merge_unique_counts, unique_rows
+from bnsl.metrics import edge_frequencies
+from bnsl.sampling import WRITERS, simulate
+from bnsl.scoring import LocalScores, as_discrete_data, compute_local_scores, save_local_scores
+from bnsl.types import Dataset, Edge, RunResult
+
+ALGORITHMS = ("silander_myllymaki", "partial_order_approach", "approximation_algorithm")
+
+def sample_and_score(
+    network_path: str,
+    n_samples: int,
+    seed: int,
+    score: str = "DiscreteBIC",
+    palim: int = 3,
+    write_dir: str | None = None,
+    format: str = "dat",
+    sampler: str = "pgmpy",
+    n_jobs: int = 1,
+    score_cache_bytes: int | None = None,
+    score_cache_path: str | None = None,
+    **score_params) -> LocalScores:
+    """Sample data from a network and compute its local scores without text round-trips.
+    network_path: Path to the BIF file of the Bayesian network.
+    n_samples: Number of samples to generate.
+    seed: Random seed for sampling.
+    score: Name of the pygobnilp score, e.g. DiscreteBIC or BDeu.
+    palim: Maximum size of parent sets.
+    write_dir: If given, also write the data and .jaa files to write_dir/seed_{seed}/.
+    format: Format of the data file written to write_dir, "dat" or "npy" (see bnsl.sampling.sample_data).
+    sampler: "pgmpy" for pgmpy's simulate (the default), or "native" for the vectorised forward sampler.
+    n_jobs: Number of worker processes for scoring, -1 for one per CPU.
+    score_cache_bytes: Size limit in bytes of the score cache, see bnsl.scoring.iter_local_scores.
+    score_cache_path: SQLite database persisting the score cache, see bnsl.scoring.iter_local_scores.
+    score_params: Extra parameters for the score, e.g. k for DiscreteBIC or alpha for BDeu.
+    returns: Local scores dict.
+    """
+    if format not in WRITERS:
+        raise ValueError(f"Unknown data format: {format}. Must be one of {sorted(WRITERS)}")
+    dataset = simulate(network_path, n_samples, seed, sampler=sampler)
+    LS = compute_local_scores(dataset, score=score, palim=palim, n_jobs=n_jobs,
+                              score_cache_bytes=score_cache_bytes, score_cache_path=score_cache_path, **score_params)
+
+    if write_dir is not None:
+        network_name = os.path.splitext(os.path.basename(network_path))[0]
+        out_dir = Path(write_dir) / f"seed_{seed}"
+        out_dir.mkdir(parents=True, exist_ok=True)
+        WRITERS[format](dataset, str(out_dir / f"{network_name}_{n_samples}.{format}"))
+        save_local_scores(LS, str(out_dir / f"{network_name}_{n_samples}.jaa"))
+
+    return LS
+
+def sweep_local_scores(
+    network_path: str,
+    sample_sizes: Iterable[int],
+    seed: int,
+    score: str = "DiscreteBIC",
+    palim: int = 3,
+    **score_params) -> Dict[int, LocalScores]:
+    """Local scores for several sample sizes of one network and seed, sampling only the largest size.
+    The smaller datasets are prefixes of the largest one (see bnsl.sampling.forward_sample), and the
+    unique rows and counts of each prefix are reused for the next larger one.
+    sample_sizes: Numbers of samples. See sample_and_score for the other arguments.
+    returns: Dict from sample size to local scores dict.
+    """
+    sizes = sorted(set(int(n) for n in sample_sizes))
+    dataset = simulate(network_path, sizes[-1], seed, sampler="native")
+
+    LS_per_size = {}
+    unique_counts, done = None, 0
+    for n in sizes:
+        block = unique_rows(dataset.data[done:n], dataset.arities)
+        unique_counts = block if unique_counts is None else merge_unique_counts(unique_counts, block)
+        done = n
+        data = DiscreteData(dataset.data[:n], varnames=dataset.variables, arities=dataset.arities,
+                            unique_counts=unique_counts)
+        LS_per_size[n] = compute_local_scores(data, score=score, palim=palim, **score_params)
+    return LS_per_size
+
+def run_algorithm(algorithm: str, LS: LocalScores, **algo_kwargs) -> RunResult:
+    """Run a structure learning algorithm on local scores held in memory.
+    algorithm: One of silander_myllymaki, partial_order_approach or approximation_algorithm.
+    LS: Local scores dict.
+    algo_kwargs: m, p for partial_order_approach and k, l for approximation_algorithm.
+    returns: The learned network and its score.
+    """
+    if algorithm == "silander_myllymaki":
+        from bnsl.algorithms.silander_myllymaki import run
+        return run(LS)
+    elif algorithm == "partial_order_approach":
+        from bnsl.algorithms.partial_order_approach import run
+        return run(LS, m=algo_kwargs.get("m"), p=algo_kwargs.get("p"))
+    elif algorithm == "approximation_algorithm":
+        from bnsl.algorithms.approximation_algorithm import run
+        return run(LS, l=algo_kwargs.get("l"), k=algo_kwargs.get("k"))
+    raise ValueError(f"Unknown algorithm: {algorithm}")
+
+def run_pipeline(
+    network_path: str,
+    n_samples: int,
+    seed: int,
+    algorithm: str,
+    score: str = "DiscreteBIC",
+    palim: int = 3,
+    score_params: dict | None = None,
+    write_dir: str | None = None,
+    format: str = "dat",
+    sampler: str = "pgmpy",
+    n_jobs: int = 1,
+    score_cache_bytes: int | None = None,
+    score_cache_path: str | None = None,
+    **algo_kwargs) -> RunResult:
+    """Sample, score and learn a structure in one process, keeping all data in memory.
+    See sample_and_score and run_algorithm for the arguments.
+    returns: The learned network and its score.
+    """
+    LS = sample_and_score(network_path, n_samples, seed, score=score, palim=palim, write_dir=write_dir,
+                          format=format, sampler=sampler, n_jobs=n_jobs, score_cache_bytes=score_cache_bytes,
+                          score_cache_path=score_cache_path, **(score_params or {}))
+    return run_algorithm(algorithm, LS, **algo_kwargs)
+
+def bootstrap_replicate(data: DiscreteData, seed: int | np.random.SeedSequence) -> DiscreteData:
+    """A bootstrap replicate of the data: the counts of its unique rows are resampled from a multinomial
+    distribution. The replicate shares the unique rows of the data, so no rows are made or resampled.
+    data: The discrete data.
+    seed: Random seed of the replicate.
+    returns: The replicate, with as many rows as the data.
+    """
+    n = data.data_length()
+    counts = np.random.default_rng(seed).multinomial(n, data._unique_data_counts / n)
+    return data.reweighted(counts)
+
+# data of a bootstrap worker process, set by _init_bootstrap_worker
+_worker_data = None
+
+def _init_bootstrap_worker(data: DiscreteData) -> None:
+    global _worker_data
+    _worker_data = data
+
+def _bootstrap_run(seed: np.random.SeedSequence, algorithm: str, score: str, palim: int,
+                   score_params: dict, algo_kwargs: dict) -> RunResult:
+    LS = compute_local_scores(bootstrap_replicate(_worker_data, seed), score=score, palim=palim, **score_params)
+    return run_algorithm(algorithm, LS, **algo_kwargs)
+
+def run_bootstrap(
+    data: str | Dataset | DiscreteData,
+    algorithm: str,
+    n_replicates: int,
+    seed: int = 0,
+    score: str = "DiscreteBIC",
+    palim: int = 3,
+    score_params: dict | None = None,
+    n_jobs: int = 1,
+    **algo_kwargs) -> List[RunResult]:
+    """Learn a structure from each of n_replicates bootstrap replicates of the data (see bootstrap_replicate).
+    The replicates are scored and learned in a pool of worker processes which share the unique rows of
+    the data (copy-on-write under the fork start method); each task only draws a vector of counts.
+    data: Path to a .dat file, an in-memory dataset or the discrete data.
+    algorithm: One of silander_myllymaki, partial_order_approach or approximation_algorithm.
+    n_replicates: Number of bootstrap replicates.
+    seed: Random seed; replicate i uses the i-th seed spawned from it, so the results do not depend on n_jobs.
+    n_jobs: Number of worker processes, -1 for one per CPU.
+    See run_pipeline for the other arguments.
+    returns: The learned network of each replicate, in order.
+    """
+    data = as_discrete_data(data)
+    seeds = np.random.SeedSequence(seed).spawn(n_replicates)
+    args = (algorithm, score, palim, score_params or {}, algo_kwargs)
+    n_jobs = (os.cpu_count() or 1) if n_jobs == -1 else n_jobs
+    if n_jobs == 1:
+        _init_bootstrap_worker(data)
+        return [_bootstrap_run(s, *args) for s in seeds]
+
+    methods = multiprocessing.get_all_start_methods()
+    context = multiprocessing.get_context("fork" if "fork" in methods else None)
+    with ProcessPoolExecutor(max_workers=n_jobs, mp_context=context,
+                             initializer=_init_bootstrap_worker, initargs=(data,)) as pool:
+        return list(pool.map(_bootstrap_run, seeds, *([arg] * n_replicates for arg in args)))
+
+def bootstrap_edge_frequencies(
+    data: str | Dataset | DiscreteData,
+    algorithm: str,
+    n_replicates: int,
+    **kwargs) -> Dict[Edge, float]:
+    """Bootstrap confidence of the edges of the learned network: the fraction of bootstrap replicates
+    whose learned network has each edge (see run_bootstrap for the arguments and metrics.edge_frequencies).
+    returns: Dict from (parent, child) to frequency, for the edges learned from at least one replicate.
+    """
+    return edge_frequencies(run_bootstrap(data, algorithm, n_replicates, **kwargs))
@@ -1,25 +1,137 @@
-from pgmpy.readwrite import BIFReader
+from dataclasses import dataclass
+from itertools import islice
+import logging
+from typing import Dict, Iterable, Iterator, List
+import numpy as np
 import pandas as pd
+from numpy.lib.format import open_memmap
 import os
+from bnsl.bif import load_bif
+from bnsl.cache import ArtifactCache, artifact_key, file_digest
+from bnsl.types import Dataset
+from pygobnilp.scoring import (
+    load_discrete_npy, merge_unique_counts, save_discrete_npy, unique_rows, write_discrete_npy_header,
+)
 
-def sample_data(network_path:str, n_samples:int, seed:int)-> str:
+SAMPLERS = ("native", "pgmpy")
+SEARCHSORTED_MIN_ARITY = 8  # above this arity, one binary search beats a comparison per state
+DEFAULT_CHUNK_SIZE = 100_000  # rows sampled and written at a time by the streaming sampler
+
+logger = logging.getLogger(__name__)
+
+def sample_data(network_path:str, n_samples:int, seed:int, cache: ArtifactCache | None = None, format: str = "dat", sampler: str = "pgmpy", chunk_size: int = DEFAULT_CHUNK_SIZE)-> str:
     """Samples data from a Bayesian network in BIF format and writes it to a .dat file.
-    Saves the data as data/datasets/{network_name}_{n_samples}.dat
+    The file is stored in the artifact cache, keyed by the contents of the network file,
+    the sample size and the seed, so it is only sampled once.
     network_path: Path to the BIF file of the Bayesian network.
     n_samples: Number of samples to generate.
-    returns: Path to the generated .dat file.
+    seed: Random seed for sampling.
+    cache: Artifact cache to use, defaults to ArtifactCache().
+    format: "dat" for the whitespace separated text format, or "npy" for the binary columnar
+        format (uint8 .npy plus JSON header, with unique rows and counts precomputed).
+    sampler: "pgmpy" for pgmpy's simulate (the default), or "native" for the vectorised forward sampler.
+    chunk_size: The native sampler streams the samples to the file in chunks of this many rows,
+        so the full sample is never held in memory. The result does not depend on chunk_size.
+    returns: Path to the generated .dat (or .npy) file.
     """
-    reader = BIFReader(network_path)
-    model = reader.get_model()
+    if format not in WRITERS:
+        raise ValueError(f"Unknown data format: {format}. Must be one of {sorted(WRITERS)}")
+    if cache is None:
+        cache = ArtifactCache()
 
     network_name = os.path.splitext(os.path.basename(network_path))[0]
-    write_path = f"data/datasets/{network_name}_{n_samples}.dat"
+    fields = _dataset_fields(network_path, n_samples, seed, sampler, format)
+    if sampler == "native":
+        def write(write_path: str) -> None:
+            stream_sample(network_path, n_samples, seed, write_path, format=format, chunk_size=chunk_size, cache=cache)
+    else:
+        def write(write_path: str) -> None:
+            WRITERS[format](simulate(network_path, n_samples, seed, sampler=sampler, cache=cache), write_path)
+    return cache.get_or_create("datasets", fields, f"{network_name}_{n_samples}.{format}", write)
 
-    if os.path.exists(write_path):
-        print(f"File already exists: {write_path}. Skipped sampling.")
-        return write_path
-    
-    os.makedirs(os.path.dirname(write_path), exist_ok=True)
+def sample_sweep(network_path: str, sample_sizes: Iterable[int], seed: int, cache: ArtifactCache | None = None, format: str = "dat", chunk_size: int = DEFAULT_CHUNK_SIZE) -> Dict[int, str]:
+    """Samples datasets of several sizes from one network and seed, sampling only the largest size.
+    The native sampler is prefix consistent, so the dataset of each smaller size is the prefix of
+    the largest one, and is stored under the same cache key as sample_data with sampler="native" would use.
+    For the "npy" format the unique rows and counts of every prefix are recorded while the largest
+    dataset is streamed, instead of being recomputed from the rows of each prefix.
+    network_path: Path to the BIF file of the Bayesian network.
+    sample_sizes: Numbers of samples to generate.
+    seed: Random seed for sampling.
+    cache: Artifact cache to use, defaults to ArtifactCache(). No dataset of the sweep is evicted
+        to make room for another one, so all returned paths exist.
+    format: "dat" or "npy", see sample_data.
+    chunk_size: Number of rows sampled and written at a time.
+    returns: Dict from sample size to the path of the dataset file.
+    """
+    if format not in WRITERS:
+        raise ValueError(f"Unknown data format: {format}. Must be one of {sorted(WRITERS)}")
+    if cache is None:
+        cache = ArtifactCache()
+
+    network_name = os.path.splitext(os.path.basename(network_path))[0]
+    sizes = sorted(set(int(n) for n in sample_sizes))
+    entries, paths = {}, {}
+    for n in sizes:
+        fields = _dataset_fields(network_path, n, seed, "native", format)
+        entries[n] = (artifact_key(kind="datasets", **fields), f"{network_name}_{n}.{format}", fields)
+        paths[n] = cache.get("datasets", *entries[n][:2])
+        if paths[n] is not None:
+            logger.info("Cache hit: %s. Skipped creating datasets.", paths[n])
+    sweep_entries = [cache.entry_dir("datasets", key) for key, _, _ in entries.values()]
+
+    largest = sizes[-1]
+    prefix_unique_counts = {}
+    if paths[largest] is None:
+        key, file_name, fields = entries[largest]
+        paths[largest] = cache.put("datasets", key, file_name, lambda write_path: prefix_unique_counts.update(
+            stream_sample(network_path, largest, seed, write_path, format=format, chunk_size=chunk_size,
+                          prefixes=sizes[:-1], cache=cache)), meta=fields, keep=sweep_entries)
+
+    for n in sizes[:-1]:
+        if paths[n] is None:
+            key, file_name, fields = entries[n]
+            paths[n] = cache.put("datasets", key, file_name, lambda write_path: _write_prefix(
+                paths[largest], write_path, n, format, prefix_unique_counts.get(n, True), chunk_size), meta=fields,
+                keep=sweep_entries)
+    return paths
+
+def _dataset_fields(network_path: str, n_samples: int, seed: int, sampler: str, format: str) -> dict:
+    """The fields that determine a sampled dataset, i.e. its cache key."""
+    return {
+        "network": file_digest(network_path),
+        "n_samples": int(n_samples),
+        "seed": int(seed),
+        "sampler": sampler,
+        "format": format,
+    }
+
+def simulate(network_path: str, n_samples: int, seed: int, sampler: str = "pgmpy", cache: ArtifactCache | None = None) -> Dataset:
+    """Samples data from a Bayesian network in BIF format and keeps it in memory.
+    network_path: Path to the BIF file of the Bayesian network.
+    n_samples: Number of samples to generate.
+    seed: Random seed for sampling.
+    sampler: "pgmpy" for pgmpy's simulate (the default), or "native" for the vectorised forward sampler.
+    cache: Artifact cache for the parsed network (native sampler), see bnsl.bif.load_bif.
+    returns: The integer coded samples, with variable names and arities.
+    """
+    if sampler == "native":
+        network = compile_network(network_path, cache)
+        return Dataset(
+            data=forward_sample(network, n_samples, random_streams(seed, len(network.variables))),
+            variables=network.variables,
+            arities=network.arities,
+        )
+    if sampler != "pgmpy":
+        raise ValueError(f"Unknown sampler: {sampler}. Must be one of {SAMPLERS}")
+    return _simulate_pgmpy(network_path, n_samples, seed)
+
+def _simulate_pgmpy(network_path: str, n_samples: int, seed: int) -> Dataset:
+    """Samples data with pgmpy's simulate and re-encodes the state names as integer codes."""
+    from pgmpy.readwrite import BIFReader
+
+    reader = BIFReader(network_path)
+    model = reader.get_model()
 
     state_names: dict[str, list[str]] = {}
     for cpd in model.get_cpds():
@@ -46,9 +158,241 @@ def sample_data(network_path:str, n_samples:int, seed:int)-> str:
     card = model.get_cardinality()
     arities = [int(card[var]) for var in variables]
 
-    with open(write_path, "w", encoding="utf-8") as f:
-        f.write(" ".join(encoded.columns) + "\n")
-        f.write(" ".join(map(str, arities)) + "\n")
-    encoded.to_csv(write_path, sep=" ", index=False, header=False, mode="a")
+    return Dataset(data=encoded.to_numpy(), variables=variables, arities=arities)
+
+@dataclass
+class CompiledNetwork:
+    """A discrete Bayesian network with its CPDs compiled to integer indexed arrays.
+    variables: Variable names, in the order in which they are declared in the BIF file.
+    arities: Number of states of each variable.
+    order: Indices of the variables in topological order.
+    parents: For each variable, the indices of its parents.
+    strides: For each variable, the multipliers that turn the parent codes into a row index of its CPT.
+    cdfs: For each variable, the cumulative CPT, shape (number of parent configurations, arity).
+    """
+    variables: List[str]
+    arities: List[int]
+    order: List[int]
+    parents: List[np.ndarray]
+    strides: List[np.ndarray]
+    cdfs: List[np.ndarray]
+
+def compile_network(network_path: str, cache: ArtifactCache | None = None) -> CompiledNetwork:
+    """Compile the CPDs of a BIF network into cumulative CPT arrays, for forward sampling.
+    network_path: Path to the BIF file of the Bayesian network.
+    cache: Artifact cache for the parsed network, see bnsl.bif.load_bif.
+    returns: The compiled network.
+    """
+    network = load_bif(network_path, cache)
+    variables = network.variables
+    index = {var: i for i, var in enumerate(variables)}
+
+    parents, strides, cdfs = [], [], []
+    for var in variables:
+        evidence = network.parents[var]
+        cpt = network.cpts[var]
+        # rows are the parent configurations, first parent varying slowest
+        cdf = np.cumsum(cpt.reshape(-1, cpt.shape[-1]), axis=1)
+        cdf[:, -1] = 1.0  # guard against rounding in the BIF probabilities
+        cards = cpt.shape[:-1]
+        stride = np.ones(len(evidence), dtype=np.int64)
+        for i in range(len(evidence) - 2, -1, -1):
+            stride[i] = stride[i + 1] * cards[i + 1]
+        parents.append(np.array([index[parent] for parent in evidence], dtype=np.int64))
+        strides.append(stride)
+        cdfs.append(cdf)
+
+    order = [index[var] for var in _topological_order(variables, [network.parents[var] for var in variables])]
+    arities = network.arities()
+    if max(arities) > 255:
+        raise ValueError(f"Variables with more than 255 states are not supported: {max(arities)}")
+    return CompiledNetwork(variables, arities, order, parents, strides, cdfs)
+
+def _topological_order(variables: List[str], parents: List[List[str]]) -> List[str]:
+    """Order the variables so that every variable comes after its parents."""
+    remaining = {var: set(pa) for var, pa in zip(variables, parents)}
+    order = []
+    while remaining:
+        ready = [var for var in variables if var in remaining and not remaining[var]]
+        if not ready:
+            raise ValueError(f"Network has a directed cycle among {sorted(remaining)}")
+        for var in ready:
+            del remaining[var]
+        for pa in remaining.values():
+            pa.difference_update(ready)
+        order.extend(ready)
+    return order
+
+def random_streams(seed: int, n_variables: int) -> List[np.random.Generator]:
+    """One independent random number generator per variable, all derived from seed."""
+    return [np.random.default_rng(child) for child in np.random.SeedSequence(seed).spawn(n_variables)]
+
+def forward_sample(network: CompiledNetwork, n_samples: int, streams: List[np.random.Generator]) -> np.ndarray:
+    """Draw samples from a compiled network with vectorised inverse-CDF lookups.
+    Every variable draws its uniform numbers from its own stream, so the first n rows of a sample
+    of size N >= n equal a sample of size n drawn with the same seed, and a sample drawn in
+    several calls with the same streams equals one drawn in a single call.
+    network: The compiled network.
+    n_samples: Number of samples to generate.
+    streams: Random number generators, one per variable, see random_streams.
+    returns: Array of shape (n_samples, number of variables) with the uint8 state codes.
+    """
+    # column-major, so that the per-variable columns below are contiguous
+    data = np.empty((n_samples, len(network.variables)), dtype=np.uint8, order="F")
+    for j in network.order:
+        cdf = network.cdfs[j]
+        arity = cdf.shape[1]
+        rows = np.zeros(n_samples, dtype=np.int64)
+        for parent, stride in zip(network.parents[j], network.strides[j]):
+            rows += data[:, parent] * stride
+        uj = streams[j].random(n_samples)
+        if arity <= SEARCHSORTED_MIN_ARITY:
+            # the state is the number of cumulative probabilities not above u
+            codes = np.zeros(n_samples, dtype=np.uint8)
+            for k in range(arity - 1):
+                codes += uj >= cdf[rows, k]
+        else:
+            # shifting row r of the cdf by r makes the flattened table sorted, so a single
+            # searchsorted does the same for variables with many states
+            shifted = (cdf + np.arange(cdf.shape[0])[:, None]).ravel()
+            codes = np.searchsorted(shifted, rows + uj, side="right") - rows * arity
+            codes = np.minimum(codes, arity - 1)
+        data[:, j] = codes
+    return data
+
+def iter_sample_chunks(network: CompiledNetwork, n_samples: int, seed: int, chunk_size: int = DEFAULT_CHUNK_SIZE, boundaries: Iterable[int] = ()) -> Iterator[np.ndarray]:
+    """Draw a sample from a compiled network in consecutive chunks of at most chunk_size rows.
+    The chunks concatenated equal forward_sample(network, n_samples, random_streams(seed, ...)).
+    boundaries: Row counts at which a chunk must end, e.g. the sizes of prefixes of interest.
+    returns: Iterator over the chunks, arrays of uint8 state codes.
+    """
+    streams = random_streams(seed, len(network.variables))
+    stops = set(range(chunk_size, n_samples, chunk_size))
+    stops.update(b for b in boundaries if 0 < b < n_samples)
+    stops.add(n_samples)
+    start = 0
+    for stop in sorted(stops):
+        yield forward_sample(network, stop - start, streams)
+        start = stop
+
+def stream_sample(network_path: str, n_samples: int, seed: int, write_path: str, format: str = "dat", chunk_size: int = DEFAULT_CHUNK_SIZE, unique_counts: bool = True, prefixes: Iterable[int] = (), cache: ArtifactCache | None = None) -> Dict[int, tuple]:
+    """Sample with the native sampler and write the sample to a file chunk by chunk.
+    Only one chunk is held in memory at a time; for the "npy" format the unique rows and counts are
+    accumulated chunk by chunk as well, so the scorer does not have to compute them from the rows.
+    network_path: Path to the BIF file of the Bayesian network.
+    n_samples: Number of samples to generate.
+    seed: Random seed for sampling.
+    write_path: Path of the .dat or .npy file to write.
+    format: "dat" or "npy".
+    chunk_size: Number of rows sampled and written at a time.
+    unique_counts: Whether to accumulate and store the unique rows and counts ("npy" only).
+    prefixes: Sizes of prefixes for which to also return the unique rows and counts ("npy" only).
+    cache: Artifact cache for the parsed network, see bnsl.bif.load_bif.
+    returns: Dict from prefix size to the unique rows and counts of that prefix.
+    """
+    network = compile_network(network_path, cache)
+    prefixes = sorted(set(prefixes))
+    writer_type = _NpyWriter if format == "npy" else _DatWriter
+    prefix_unique_counts = {}
+    with writer_type(write_path, network.variables, network.arities, n_samples, unique_counts) as writer:
+        for chunk in iter_sample_chunks(network, n_samples, seed, chunk_size, boundaries=prefixes):
+            writer.write(chunk)
+            if writer.n_written in prefixes and writer.unique_counts is not None:
+                prefix_unique_counts[writer.n_written] = writer.unique_counts
+    return prefix_unique_counts
+
+def _write_prefix(source_path: str, write_path: str, n_samples: int, format: str, unique_counts=True, chunk_size: int = DEFAULT_CHUNK_SIZE) -> None:
+    """Write the first n_samples rows of an existing dataset file to write_path, chunk by chunk.
+    unique_counts: The unique rows and counts of the prefix if known, else True to accumulate them.
+    """
+    if format == "dat":
+        with open(source_path, "r", encoding="utf-8") as src, open(write_path, "w", encoding="utf-8") as dst:
+            dst.writelines(islice(src, n_samples + 2))  # header and arities lines, then the rows
+        return
+    data, variables, arities, _ = load_discrete_npy(source_path)
+    with _NpyWriter(write_path, variables, arities, n_samples, unique_counts) as writer:
+        for start in range(0, n_samples, chunk_size):
+            writer.write(data[start:min(start + chunk_size, n_samples)])
+
+class _DatWriter:
+    """Writes a .dat file (header line, arities line, one sample per line) chunk by chunk."""
+
+    def __init__(self, write_path: str, variables: List[str], arities: List[int], n_samples: int = None, unique_counts: bool = False):
+        self.f = open(write_path, "w", encoding="utf-8")
+        self.f.write(" ".join(variables) + "\n")
+        self.f.write(" ".join(map(str, arities)) + "\n")
+        self.n_written = 0
+        self.unique_counts = None
+
+    def write(self, chunk: np.ndarray) -> None:
+        pd.DataFrame(chunk).to_csv(self.f, sep=" ", index=False, header=False)
+        self.n_written += len(chunk)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.f.close()
+
+class _NpyWriter:
+    """Writes discrete data in binary columnar format chunk by chunk, into a memory-mapped .npy file.
+    unique_counts: True to accumulate the unique rows and counts of the chunks, False to store none,
+        or the unique rows and counts of all the data if already known.
+    """
+
+    def __init__(self, write_path: str, variables: List[str], arities: List[int], n_samples: int, unique_counts=True):
+        self.write_path = write_path
+        self.variables = variables
+        self.arities = arities
+        self.n_samples = n_samples
+        self.data = open_memmap(write_path, mode="w+", dtype=np.uint8, shape=(n_samples, len(variables)), fortran_order=True)
+        self.n_written = 0
+        self.accumulate = unique_counts is True
+        self._unique_counts = unique_counts if isinstance(unique_counts, tuple) else None
+        self._pending = []
+
+    @property
+    def unique_counts(self):
+        """The unique rows and counts of the chunks written so far (None if not accumulated)."""
+        if self._pending:
+            blocks = self._pending if self._unique_counts is None else [self._unique_counts] + self._pending
+            self._unique_counts = merge_unique_counts(*blocks)
+            self._pending = []
+        return self._unique_counts
+
+    def write(self, chunk: np.ndarray) -> None:
+        self.data[self.n_written:self.n_written + len(chunk)] = chunk
+        self.n_written += len(chunk)
+        if self.accumulate:
+            self._pending.append(unique_rows(chunk, self.arities))
+            # merge only once the pending unique rows outnumber the merged ones, so that every
+            # unique row is re-sorted a logarithmic number of times
+            merged = 0 if self._unique_counts is None else len(self._unique_counts[0])
+            if sum(len(u) for u, _ in self._pending) >= merged:
+                self.unique_counts
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, *exc):
+        self.data.flush()
+        del self.data
+        if exc_type is None:
+            if self.n_written != self.n_samples:
+                raise ValueError(f"Wrote {self.n_written} of {self.n_samples} rows to {self.write_path}")
+            write_discrete_npy_header(self.write_path, self.variables, self.arities, self.n_samples, self.unique_counts)
+
+def write_dat(dataset: Dataset, write_path: str) -> None:
+    """Write a dataset to write_path in .dat format (header line, arities line, one sample per line)."""
+    with _DatWriter(write_path, dataset.variables, dataset.arities) as writer:
+        writer.write(dataset.data)
+
+def write_npy(dataset: Dataset, write_path: str, unique_counts=True) -> None:
+    """Write a dataset to write_path (ending in .npy) in binary columnar format.
+    The uint8 data is stored column-major so it can be memory-mapped, with the variable names and
+    arities in a JSON header next to it, and the unique rows and their counts precomputed.
+    unique_counts: The unique rows and their counts, if already known, else True to compute them.
+    """
+    save_discrete_npy(write_path, dataset.data, dataset.variables, dataset.arities, unique_counts=unique_counts)
 
-    return write_path
\ No newline at end of file
+WRITERS = {"dat": write_dat, "npy": write_npy}
@@ -1,39 +1,487 @@
+import multiprocessing
 import os
-from pygobnilp.gobnilp import read_local_scores as gob_read_local_scores, Gobnilp
-from pgmpy.readwrite import BIFReader
-from typing import Dict, Set
+from concurrent.futures import ProcessPoolExecutor
+from itertools import combinations
+from typing import Dict, FrozenSet, Iterable, Iterator, List, Sequence, Tuple
+from pygobnilp.scoring import (
+    DiscreteData, DiscreteLL, DiscreteBIC, DiscreteAIC, BDeu,
+    multi_pruned_local_scores_for_child, pruned_local_scores_for_child,
+)
+from bnsl.cache import ArtifactCache, file_digest
+from bnsl.transforms.derive import derive_local_scores
+from bnsl.types import Dataset
 
-def write_local_scores(dat_path: str) -> str:
+LocalScores = Dict[str, Dict[FrozenSet[str], float]]
+
+DISCRETE_SCORES = {
+    "DiscreteLL": DiscreteLL,
+    "DiscreteBIC": DiscreteBIC,
+    "DiscreteAIC": DiscreteAIC,
+    "BDeu": BDeu,
+}
+
+# scores which only differ in the penalty they subtract from the same log-likelihood
+PENALISED_LL_SCORES = ("DiscreteLL", "DiscreteBIC", "DiscreteAIC")
+
+def write_local_scores(
+    dat_path: str,
+    score: str = "DiscreteBIC",
+    palim: int = 3,
+    cache: ArtifactCache | None = None,
+    n_jobs: int = 1,
+    score_cache_bytes: int | None = None,
+    score_cache_path: str | None = None,
+    **score_params) -> str:
     """Write local scores to a file using pygobnilp.
-    dat_path: Path to the .dat file containing the data.
+    The file is stored in the artifact cache, keyed by the contents of the data file,
+    the score and its parameters, so identical scores are only computed once.
+    dat_path: Path to the .dat (or binary .npy) file containing the data.
+    score: Name of the pygobnilp score, e.g. DiscreteBIC or BDeu.
+    palim: Maximum size of parent sets.
+    cache: Artifact cache to use, defaults to ArtifactCache().
+    n_jobs: Number of worker processes for scoring, -1 for one per CPU.
+    score_cache_bytes: Size limit in bytes of the cache of entropies (or BDeu score components), see iter_local_scores.
+    score_cache_path: SQLite database persisting that cache across runs, see iter_local_scores.
+    score_params: Extra parameters for the score, e.g. k for DiscreteBIC or alpha for BDeu.
     returns: Path to the generated .jaa local scores file.
     """
+    if cache is None:
+        cache = ArtifactCache()
 
     file_name = os.path.splitext(os.path.basename(dat_path))[0]
-    write_path = f"data/local_scores/{file_name}.jaa"
+    fields = {
+        "data": _data_digest(str(dat_path)),
+        "score": score,
+        "palim": palim,
+        "params": score_params,
+    }
+
+    def write(write_path: str) -> None:
+        data = DiscreteData(str(dat_path))
+        stream_local_scores(data, write_path, score=score, palim=palim, n_jobs=n_jobs,
+                            score_cache_bytes=score_cache_bytes, score_cache_path=score_cache_path, **score_params)
+
+    return cache.get_or_create("local_scores", fields, f"{file_name}.jaa", write)
+
+
+def _data_digest(dat_path: str) -> str:
+    """Digest of a data file, for binary data including its JSON header."""
+    digest = file_digest(dat_path)
+    if dat_path.endswith(".npy"):
+        digest += file_digest(dat_path[:-len(".npy")] + ".json")
+    return digest
+
+
+def make_scorer(
+    data: DiscreteData,
+    score: str = "DiscreteBIC",
+    score_cache_bytes: int | None = None,
+    score_cache_path: str | None = None,
+    **score_params):
+    """Create the pygobnilp score object for the data.
+    data: The discrete data.
+    score: Name of the score, one of DiscreteLL, DiscreteBIC, DiscreteAIC or BDeu.
+    score_cache_bytes: Size limit in bytes of the cache of entropies (or BDeu score components), None for no limit.
+    score_cache_path: SQLite database persisting that cache, None to keep it in memory only.
+    score_params: Extra parameters for the score, e.g. k for DiscreteBIC or alpha for BDeu.
+    returns: The score object.
+    """
+    if score not in DISCRETE_SCORES:
+        raise ValueError(f"Unknown score: {score}. Must be one of {sorted(DISCRETE_SCORES)}")
+    return DISCRETE_SCORES[score](data, cache_bytes=score_cache_bytes, cache_path=score_cache_path, **score_params)
+
+
+def scorer_local_score(scorer):
+    """The function mapping (child, parents) to (score, upper bound for supersets) of a score object."""
+    return scorer.bdeu_score if isinstance(scorer, BDeu) else scorer.score
+
+
+def local_score_function(data: DiscreteData, score: str = "DiscreteBIC", **score_params):
+    """Create a pygobnilp local score function for the data.
+    data: The discrete data.
+    score: Name of the score, one of DiscreteLL, DiscreteBIC, DiscreteAIC or BDeu.
+    score_params: Extra parameters for the score, e.g. k for DiscreteBIC or alpha for BDeu.
+    returns: Function mapping (child, parents) to (score, upper bound for supersets).
+    """
+    return scorer_local_score(make_scorer(data, score, **score_params))
+
+
+def iter_local_scores(
+    data: DiscreteData,
+    score: str = "DiscreteBIC",
+    palim: int | None = 3,
+    pruning: bool = True,
+    n_jobs: int = 1,
+    score_cache_bytes: int | None = None,
+    score_cache_path: str | None = None,
+    **score_params) -> Iterator[Tuple[str, Dict[FrozenSet[str], float]]]:
+    """Compute local scores one child variable at a time, without building a Gobnilp model.
+    Uses the same pruned search as Gobnilp, so the scores are identical to those of
+    Gobnilp.learn(..., end="local scores").
+    data: The discrete data.
+    score: Name of the score, one of DiscreteLL, DiscreteBIC, DiscreteAIC or BDeu.
+    palim: Maximum size of parent sets, None for no limit.
+    pruning: Whether to leave out parent sets that cannot be optimal.
+    n_jobs: Number of worker processes the children are spread over, -1 for one per CPU.
+        The scores do not depend on n_jobs.
+    score_cache_bytes: Size limit in bytes of the cache of entropies (or BDeu score components);
+        least recently used entries are evicted beyond it. None for no limit.
+    score_cache_path: SQLite database in which that cache is also stored, keyed by a digest of the data,
+        so a later run on the same data (another entropy-based score, palim or n_jobs) starts warm.
+        None to keep it in memory only.
+    score_params: Extra parameters for the score, e.g. k for DiscreteBIC or alpha for BDeu.
+    returns: Iterator over (child, scores for the parent sets of child), children in sorted order.
+    """
+    scorer = make_scorer(data, score, score_cache_bytes, score_cache_path, **score_params)
+    variables = sorted(data.variables())
+    palim = len(variables) - 1 if palim is None else min(palim, len(variables) - 1)
+    n_jobs = (os.cpu_count() or 1) if n_jobs == -1 else n_jobs
+
+    if n_jobs > 1 and len(variables) > 1:
+        yield from _iter_local_scores_parallel(scorer, variables, palim, pruning, n_jobs)
+        return
+    for child in variables:
+        yield child, _child_local_scores(scorer, child, variables, palim, pruning)
+
+
+def iter_multi_local_scores(
+    data: DiscreteData,
+    scores: Sequence[Tuple[str, float]],
+    palim: int | None = 3,
+    pruning: bool = True,
+    score_cache_bytes: int | None = None,
+    score_cache_path: str | None = None) -> Iterator[Tuple[str, List[Dict[FrozenSet[str], float]]]]:
+    """Compute the local scores of several penalised log-likelihood scores in one pass.
+    The scores share one cache of entropies, so every contingency table is counted once, and the
+    pruned search of each child visits the parent sets needed by any of the scores. The scores of
+    each (score, k) pair are identical to those of iter_local_scores(data, score, k=k).
+    data: The discrete data.
+    scores: (score, k) pairs, score one of DiscreteLL, DiscreteBIC or DiscreteAIC and k its
+        penalty multiplier (ignored for DiscreteLL).
+    palim: Maximum size of parent sets, None for no limit.
+    pruning: Whether to leave out parent sets that cannot be optimal for the respective score.
+    score_cache_bytes: Size limit in bytes of the shared cache of entropies, see iter_local_scores.
+    score_cache_path: SQLite database persisting the shared cache, see iter_local_scores.
+    returns: Iterator over (child, scores for the parent sets of child for each pair in scores),
+        children in sorted order.
+    """
+    scorers = []
+    for score, k in scores:
+        if score not in PENALISED_LL_SCORES:
+            raise ValueError(f"Unknown penalised log-likelihood score: {score}. Must be one of {PENALISED_LL_SCORES}")
+        params = {} if score == "DiscreteLL" else {"k": k}
+        if scorers:
+            # a score object passed as data shares its entropies
+            scorers.append(DISCRETE_SCORES[score](scorers[0], **params))
+        else:
+            scorers.append(make_scorer(data, score, score_cache_bytes, score_cache_path, **params))
+    # the scorers share their entropies, so prefetching for one is enough
+    yield from _iter_multi_local_scores(data, scorers, palim, pruning, [_prefetch_function(scorers[0])])
+
+
+def iter_bdeu_sweep(
+    data: DiscreteData,
+    alphas: Sequence[float],
+    palim: int | None = 3,
+    pruning: bool = True,
+    score_cache_bytes: int | None = None,
+    score_cache_path: str | None = None) -> Iterator[Tuple[str, List[Dict[FrozenSet[str], float]]]]:
+    """Compute BDeu local scores for several equivalent sample sizes in one pass.
+    The histograms of the non-zero counts of the contingency tables, which do not depend on alpha,
+    are computed once and the score components of every alpha are evaluated from them, so the data
+    is counted once. Scores equal those of iter_local_scores(data, "BDeu", alpha=alpha) up to rounding.
+    data: The discrete data.
+    alphas: The equivalent sample sizes, e.g. [0.1, 1, 10, 100].
+    palim: Maximum size of parent sets, None for no limit.
+    pruning: Whether to leave out parent sets that cannot be optimal for the respective alpha.
+    score_cache_bytes: Size limit in bytes of the cache of BDeu score components of each alpha.
+    score_cache_path: SQLite database persisting the score components, see iter_local_scores.
+    returns: Iterator over (child, scores for the parent sets of child for each alpha),
+        children in sorted order.
+    """
+    first = BDeu(data, alphas[0], score_cache_bytes, score_cache_path, count_histograms=True)
+    scorers = [first] + [BDeu(first, alpha, score_cache_bytes, score_cache_path) for alpha in alphas[1:]]
+    yield from _iter_multi_local_scores(data, scorers, palim, pruning, [_prefetch_function(scorer) for scorer in scorers])
+
+
+def compute_bdeu_sweep(
+    data: str | Dataset | DiscreteData,
+    alphas: Sequence[float],
+    palim: int | None = 3,
+    pruning: bool = True,
+    score_cache_bytes: int | None = None,
+    score_cache_path: str | None = None) -> Dict[float, LocalScores]:
+    """Compute BDeu local scores in memory for several equivalent sample sizes, see iter_bdeu_sweep.
+    data: Path to a .dat file, an in-memory dataset or the discrete data.
+    alphas: The equivalent sample sizes.
+    returns: Local scores dict (child -> parent set -> score) for each alpha.
+    """
+    data = as_discrete_data(data)
+    alphas = list(alphas)
+    result = {alpha: {} for alpha in alphas}
+    for child, child_scores in iter_bdeu_sweep(data, alphas, palim=palim, pruning=pruning,
+                                               score_cache_bytes=score_cache_bytes,
+                                               score_cache_path=score_cache_path):
+        for alpha, scores_of_child in zip(alphas, child_scores):
+            result[alpha][child] = scores_of_child
+    return result
+
+
+def _iter_multi_local_scores(data: DiscreteData, scorers: list, palim: int | None, pruning: bool, prefetches: list):
+    """Score every child for several score objects with one search, see multi_pruned_local_scores_for_child."""
+    variables = sorted(data.variables())
+    palim = len(variables) - 1 if palim is None else min(palim, len(variables) - 1)
+    local_scores = [scorer_local_score(scorer) for scorer in scorers]
+
+    def prefetch(child: str, parent_sets: List[Tuple[str, ...]]) -> None:
+        for prefetch_one in prefetches:
+            prefetch_one(child, parent_sets)
+
+    for child in variables:
+        others = [v for v in variables if v != child]
+        if pruning:
+            child_scores, _, _ = multi_pruned_local_scores_for_child(local_scores, child, others, palim, prefetch=prefetch)
+        else:
+            child_scores = [{} for _ in scorers]
+            for size in range(palim + 1):
+                parent_sets = list(combinations(others, size))
+                prefetch(child, parent_sets)
+                for local_score, scores_of_child in zip(local_scores, child_scores):
+                    scores_of_child.update((frozenset(parents), local_score(child, parents)[0]) for parents in parent_sets)
+        for scorer in scorers:
+            _score_cache(scorer).flush()
+        yield child, child_scores
+
+
+def compute_multi_local_scores(
+    data: str | Dataset | DiscreteData,
+    scores: Sequence[Tuple[str, float]],
+    palim: int | None = 3,
+    pruning: bool = True,
+    score_cache_bytes: int | None = None,
+    score_cache_path: str | None = None) -> Dict[Tuple[str, float], LocalScores]:
+    """Compute local scores in memory for several penalised log-likelihood scores at once,
+    see iter_multi_local_scores.
+    data: Path to a .dat file, an in-memory dataset or the discrete data.
+    scores: (score, k) pairs, e.g. [("DiscreteBIC", 1), ("DiscreteBIC", 2), ("DiscreteAIC", 1)].
+    returns: Local scores dict (child -> parent set -> score) for each (score, k) pair.
+    """
+    data = as_discrete_data(data)
+    scores = [tuple(pair) for pair in scores]
+    result = {pair: {} for pair in scores}
+    for child, child_scores in iter_multi_local_scores(data, scores, palim=palim, pruning=pruning,
+                                                       score_cache_bytes=score_cache_bytes,
+                                                       score_cache_path=score_cache_path):
+        for pair, scores_of_child in zip(scores, child_scores):
+            result[pair][child] = scores_of_child
+    return result
+
+
+def _child_local_scores(scorer, child: str, variables: List[str], palim: int, pruning: bool) -> Dict[FrozenSet[str], float]:
+    local_score = scorer_local_score(scorer)
+    prefetch = _prefetch_function(scorer)
+    others = [v for v in variables if v != child]
+    if pruning:
+        child_scores, _, _ = pruned_local_scores_for_child(local_score, child, others, palim, prefetch=prefetch)
+    else:
+        child_scores = {}
+        for size in range(palim + 1):
+            parent_sets = list(combinations(others, size))
+            prefetch(child, parent_sets)
+            child_scores.update((frozenset(parents), local_score(child, parents)[0]) for parents in parent_sets)
+    # a persistent cache keeps what a finished child needed, even if the run is interrupted
+    _score_cache(scorer).flush()
+    return child_scores
+
+
+def _prefetch_function(scorer):
+    """The function computing the cache entries needed to score a child with many parent sets
+    (one layer of the pruned search) in one batch, see pruned_local_scores_for_child."""
+    def prefetch(child: str, parent_sets: List[Tuple[str, ...]]) -> None:
+        _fill_score_cache(scorer, [s for parents in parent_sets for s in (parents, (child,) + tuple(parents))])
+    return prefetch
+
+
+def _score_cache(scorer) -> dict:
+    """The cache of a score object: variable set -> entropy (or BDeu score component)."""
+    return scorer._cache if isinstance(scorer, BDeu) else scorer._entropy_cache
+
+
+def _fill_score_cache(scorer, variable_sets: Iterable[Tuple[str, ...]]) -> None:
+    """Compute the entropies (or BDeu score components) of the variable sets into the cache,
+    batching the contingency tables of sets of the same size."""
+    if isinstance(scorer, BDeu):
+        scorer.bdeu_score_components(variable_sets)
+    else:
+        scorer.entropies(variable_sets)
+
+
+# score object of a worker process, set by _init_worker
+_worker_scorer = None
+
+def _init_worker(scorer) -> None:
+    global _worker_scorer
+    _worker_scorer = scorer
+
+
+def _cache_entry(scorer, variables: Tuple[str, ...]):
+    """The cache entry of a variable set, recomputed if it has been evicted."""
+    return scorer._bdeu_score_component_cache(variables) if isinstance(scorer, BDeu) else scorer.entropy(variables)
+
+
+def _worker_fill_cache(variable_sets: List[Tuple[str, ...]]) -> dict:
+    _fill_score_cache(_worker_scorer, variable_sets)
+    return {frozenset(variables): _cache_entry(_worker_scorer, variables) for variables in variable_sets}
+
+
+def _worker_child_scores(child: str, variables: List[str], palim: int, pruning: bool, shared: dict):
+    _score_cache(_worker_scorer).update(shared)
+    return child, _child_local_scores(_worker_scorer, child, variables, palim, pruning)
+
+
+def _iter_local_scores_parallel(scorer, variables: List[str], palim: int, pruning: bool, n_jobs: int):
+    """Score the children in a pool of worker processes.
+    Every worker gets a copy of the score object, and with it of the read-only (unique) data;
+    with the fork start method the arrays are shared copy-on-write instead of copied.
+    The entropies of all variable sets of size at most two are needed by the search of every
+    child, so they are computed first, spread over the workers, merged and handed to every child.
+    """
+    methods = multiprocessing.get_all_start_methods()
+    context = multiprocessing.get_context("fork" if "fork" in methods else None)
+    small_sets = [(v,) for v in variables]
+    if palim >= 1:
+        small_sets += list(combinations(variables, 2))
+    chunks = [small_sets[i::n_jobs] for i in range(n_jobs)]
+
+    with ProcessPoolExecutor(max_workers=n_jobs, mp_context=context,
+                             initializer=_init_worker, initargs=(scorer,)) as pool:
+        shared = {}
+        for entries in pool.map(_worker_fill_cache, chunks):
+            shared.update(entries)
+        _score_cache(scorer).update(shared)
+        yield from pool.map(_worker_child_scores, variables, [variables] * len(variables),
+                            [palim] * len(variables), [pruning] * len(variables),
+                            [shared] * len(variables))
+    _score_cache(scorer).flush()
+
+
+def as_discrete_data(data: str | Dataset | DiscreteData) -> DiscreteData:
+    """Convert a path to a .dat file or an in-memory dataset to pygobnilp's DiscreteData."""
+    if isinstance(data, DiscreteData):
+        return data
+    if isinstance(data, Dataset):
+        return DiscreteData(data.data, varnames=data.variables, arities=data.arities)
+    return DiscreteData(str(data))
+
+
+def compute_local_scores(
+    data: str | Dataset | DiscreteData,
+    score: str = "DiscreteBIC",
+    palim: int | None = 3,
+    pruning: bool = True,
+    n_jobs: int = 1,
+    score_cache_bytes: int | None = None,
+    score_cache_path: str | None = None,
+    **score_params) -> LocalScores:
+    """Compute local scores in memory.
+    data: Path to a .dat file, an in-memory dataset or the discrete data.
+    returns: Local scores dict, child -> parent set -> score.
+    """
+    data = as_discrete_data(data)
+    return dict(iter_local_scores(data, score=score, palim=palim, pruning=pruning, n_jobs=n_jobs,
+                                  score_cache_bytes=score_cache_bytes, score_cache_path=score_cache_path, **score_params))
+
+
+def compute_local_scores_grid(
+    data: str | Dataset | DiscreteData,
+    palims: Iterable[int],
+    edge_penalties: Iterable[float] = (0.0,),
+    score: str = "DiscreteBIC",
+    pruning: bool = True,
+    n_jobs: int = 1,
+    score_cache_bytes: int | None = None,
+    score_cache_path: str | None = None,
+    **score_params) -> Dict[Tuple[int, float], LocalScores]:
+    """Compute local scores for every combination of parent set limit and edge penalty from one scoring run.
+    The table of the largest palim is computed once (pruned, unless some edge penalty is negative) and the
+    table of each combination is derived from it by derive_local_scores, which re-runs the subset-dominance
+    pruning on the reduced scores. The tables are those of separate runs with Gobnilp's edge_penalty.
+    data: Path to a .dat file, an in-memory dataset or the discrete data.
+    palims: Maximum sizes of parent sets.
+    edge_penalties: Amounts subtracted from the local score for each parent.
+    See compute_local_scores for the other arguments.
+    returns: Dict from (palim, edge_penalty) to local scores dict.
+    """
+    palims, edge_penalties = sorted(set(palims)), sorted(set(edge_penalties))
+    # a negative penalty favours larger parent sets, which pruning without penalty may have removed
+    widest = compute_local_scores(data, score=score, palim=palims[-1], pruning=pruning and edge_penalties[0] >= 0,
+                                  n_jobs=n_jobs, score_cache_bytes=score_cache_bytes,
+                                  score_cache_path=score_cache_path, **score_params)
+    return {(palim, edge_penalty): derive_local_scores(widest, palim=palim, edge_penalty=edge_penalty, pruning=pruning)
+            for palim in palims for edge_penalty in edge_penalties}
+
+
+def stream_local_scores(
+    data: DiscreteData,
+    write_path: str,
+    score: str = "DiscreteBIC",
+    palim: int | None = 3,
+    pruning: bool = True,
+    n_jobs: int = 1,
+    score_cache_bytes: int | None = None,
+    score_cache_path: str | None = None,
+    **score_params) -> None:
+    """Compute local scores and write them to a .jaa file as each child is finished."""
+    with open(write_path, "w", encoding="utf-8") as f:
+        print(len(data.variables()), file=f)
+        for child, child_scores in iter_local_scores(data, score=score, palim=palim, pruning=pruning, n_jobs=n_jobs,
+                                                     score_cache_bytes=score_cache_bytes, score_cache_path=score_cache_path,
+                                                     **score_params):
+            _write_child_scores(f, child, child_scores)
+
+
+def save_local_scores(LS: LocalScores, write_path: str) -> None:
+    """Write a local scores dict to a .jaa file."""
+    with open(write_path, "w", encoding="utf-8") as f:
+        print(len(LS), file=f)
+        for child, child_scores in LS.items():
+            _write_child_scores(f, child, child_scores)
 
-    if os.path.exists(write_path):
-        print(f"File already exists: {write_path}. Skipped computing local scores.")
-        return write_path
 
-    os.makedirs(os.path.dirname(write_path), exist_ok=True)
+def _write_child_scores(f, child: str, child_scores: Dict[FrozenSet[str], float]) -> None:
+    """Write the block of a single child in Jaakkola format, best scores first (as Gobnilp does)."""
+    print(f"{child} {len(child_scores)}", file=f)
+    skores = [(score, parents) for parents, score in child_scores.items()]
+    skores.sort(reverse=True)
+    for score, parents in skores:
+        print(f"{score} {len(parents)} {' '.join(sorted(parents))}", file=f)
 
-    # Use Gobnilp to read the .dat file and write local scores
-    g = Gobnilp()
-    g.learn(
-        data_source=dat_path,
-        data_type="discrete",
-        score="DiscreteBIC",
-        end="local scores"  # end after computing local scores
-    )
-    g.write_local_scores(write_path)
 
-    return write_path
+def load_local_scores(source: str | LocalScores) -> LocalScores:
+    """Return local scores given either as a dict or as a path to a .jaa file."""
+    if isinstance(source, dict):
+        return source
+    return read_local_scores(source)
 
 
-def read_local_scores(jaa_path: str) -> dict:
-    """Read local scores wrapper from a .jaa file using pygobnilp.
+def read_local_scores(jaa_path: str) -> LocalScores:
+    """Read local scores from a .jaa file (same format and result as pygobnilp's reader,
+    without importing the Gurobi-based Gobnilp module).
     jaa_path: Path to the .jaa local scores file.
     returns: Local scores dict.
     """
-    return gob_read_local_scores(jaa_path)
+    LS: LocalScores = {}
+    with open(jaa_path, "r", encoding="utf-8") as f:
+        int(f.readline())  # number of variables
+        lines = iter(f)
+        for line in lines:
+            fields = line.split()
+            if not fields:
+                continue
+            child, n_scores = fields[0], int(fields[1])
+            child_scores = {}
+            for _ in range(n_scores):
+                fields = next(lines).split()
+                child_scores[frozenset(fields[2:])] = float(fields[0])
+            LS[child] = child_scores
+    return LS
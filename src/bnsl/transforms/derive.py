@@ -0,0 +1,76 @@
+from typing import Dict, FrozenSet
+import numpy as np
+from numba import njit
+
+@njit
+def _dominance_keep(masks: np.ndarray, sizes: np.ndarray, scores: np.ndarray, palim: int, edge_penalty: float) -> np.ndarray:
+    """Which parent sets have a penalised score above that of all their proper subsets.
+    masks: Parent sets as bitmasks, one row of uint64 words per set, ordered by size.
+    sizes: Number of parents of each set.
+    scores: Local score of each set.
+    palim: Sets with more parents are not kept.
+    edge_penalty: Subtracted from the score once per parent.
+    returns: Boolean array, true for the sets that are kept.
+    """
+    n, words = masks.shape
+    keep = np.zeros(n, dtype=np.bool_)
+    for i in range(n):
+        if sizes[i] > palim:
+            continue
+        best = -np.inf
+        # sets of the same size or larger come later and cannot be proper subsets
+        for j in range(i):
+            if sizes[j] == sizes[i]:
+                break
+            subset = True
+            for w in range(words):
+                if masks[j, w] & ~masks[i, w]:
+                    subset = False
+                    break
+            if subset:
+                best = max(best, scores[j] - edge_penalty * sizes[j])
+        keep[i] = scores[i] - edge_penalty * sizes[i] > best
+    return keep
+
+
+def derive_local_scores(
+    LS: Dict[str, Dict[FrozenSet[str], float]],
+    palim: int | None = None,
+    edge_penalty: float = 0.0,
+    pruning: bool = True,
+) -> Dict[str, Dict[FrozenSet[str], float]]:
+    """
+    Derive the local scores for a smaller parent set limit and/or an edge penalty from a wider table,
+    without scoring again. The score of a parent set is reduced by edge_penalty per parent (as Gobnilp
+    does with edge_penalty) and, with pruning, a parent set is kept only if its reduced score exceeds
+    that of all its proper subsets, which is exactly the table a pruned search with these settings gives.
+    LS must hold every parent set that can be kept: an unpruned table, or (if edge_penalty >= 0, which
+    only lowers the scores of larger sets) a table pruned without edge penalty. Its parent set limit must
+    be at least palim.
+    palim: Maximum size of parent sets, None to keep the limit of LS.
+    edge_penalty: Amount subtracted from the local score for each parent.
+    pruning: Whether to leave out parent sets whose reduced score does not exceed that of a subset.
+    returns: The derived local scores dict.
+    """
+    variables = sorted(LS)
+    varidx = {v: i for i, v in enumerate(variables)}
+    words = (len(variables) + 63) // 64
+    palim = len(variables) if palim is None else palim
+
+    derived = {}
+    for child, scored_parent_sets in LS.items():
+        parent_sets = sorted(scored_parent_sets, key=len)
+        if not pruning:
+            derived[child] = {ps: scored_parent_sets[ps] - edge_penalty * len(ps)
+                              for ps in parent_sets if len(ps) <= palim}
+            continue
+        masks = np.zeros((len(parent_sets), words), dtype=np.uint64)
+        for i, ps in enumerate(parent_sets):
+            for v in ps:
+                masks[i, varidx[v] // 64] |= np.uint64(1) << np.uint64(varidx[v] % 64)
+        sizes = np.array([len(ps) for ps in parent_sets], dtype=np.int64)
+        scores = np.array([scored_parent_sets[ps] for ps in parent_sets], dtype=np.float64)
+        keep = _dominance_keep(masks, sizes, scores, palim, float(edge_penalty))
+        derived[child] = {ps: scored_parent_sets[ps] - edge_penalty * len(ps)
+                          for ps, kept in zip(parent_sets, keep) if kept}
+    return derived
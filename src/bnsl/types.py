@@ -1,9 +1,16 @@
-from typing import Tuple, Dict, FrozenSet
+from typing import Tuple, Dict, FrozenSet, List
 from dataclasses import dataclass
+import numpy as np
 
 Edge = Tuple[str, str]
 
 @dataclass
 class RunResult:
     pm: Dict[str, FrozenSet[str]]
-    total_score: float
\ No newline at end of file
+    total_score: float
+
+@dataclass
+class Dataset:
+    data: np.ndarray  # integer coded samples, one row per sample and one column per variable
+    variables: List[str]
+    arities: List[int]
@@ -3,6 +3,7 @@ from pathlib import Path
 import pytest
 from bnsl.algorithms.silander_myllymaki import run as run_sm
 from bnsl.algorithms.approximation_algorithm import run as run_approx
+from bnsl.cache import ArtifactCache
 from bnsl.sampling import sample_data
 from bnsl.scoring import write_local_scores
 
@@ -13,9 +14,10 @@ network_paths = list((ROOT / "networks" / "small").glob("*.bif"))
 
 @pytest.mark.slow
 @pytest.mark.parametrize("network_path", network_paths)
-def test_approx_1_equals_dp(network_path):
-    dat = sample_data(network_path, n_samples=10000, seed=42)
-    jaa = write_local_scores(dat)
+def test_approx_1_equals_dp(network_path, tmp_path):
+    cache = ArtifactCache(root=str(tmp_path))
+    dat = sample_data(network_path, n_samples=10000, seed=42, cache=cache)
+    jaa = write_local_scores(dat, cache=cache)
     runresult_dp = run_sm(jaa)
     runresult_approx = run_approx(jaa, k=2, l=2) 
 
@@ -0,0 +1,77 @@
+import sys
+from pathlib import Path
+import numpy as np
+import pytest
+from bnsl.bif import load_bif, parse_bif
+from bnsl.cache import ArtifactCache
+
+ROOT = Path(__file__).resolve().parents[2]
+sys.path.insert(0, str(ROOT))
+
+network_paths = [ROOT / "networks" / "small" / "asia.bif", ROOT / "networks" / "medium" / "insurance.bif"]
+
+@pytest.mark.parametrize("network_path", network_paths)
+def test_matches_pgmpy(network_path):
+    """The parsed structure, states and CPTs equal those read by pgmpy's BIFReader."""
+    from pgmpy.readwrite import BIFReader
+
+    model = BIFReader(str(network_path)).get_model()
+    network = parse_bif(network_path.read_text())
+
+    assert network.variables == list(model.nodes())
+    assert set(network.edges()) == set(model.edges())
+    for cpd in model.get_cpds():
+        var = cpd.variable
+        assert network.parents[var] == list(cpd.variables[1:])
+        assert network.states[var] == list(cpd.state_names[var])
+        assert np.allclose(network.cpts[var], np.moveaxis(cpd.values, 0, -1))
+
+def test_table_and_default_entries():
+    """Full tables list the child states slowest, and default fills the rows not given."""
+    network = parse_bif("""
+        network test { }
+        variable a { type discrete [ 2 ] { x, y }; }
+        variable b { type discrete [ 3 ] { p, q, r }; }
+        variable c { type discrete [ 2 ] { u, v }; }
+        probability ( a ) { table 0.2, 0.8; }
+        // b's table: first all P(b=p | a), then P(b=q | a), then P(b=r | a)
+        probability ( b | a ) { table 0.1, 0.2, 0.3, 0.4, 0.6, 0.4; }
+        probability ( c | a, b ) {
+          (y, q) 0.9, 0.1;
+          default 0.5, 0.5;
+        }
+    """)
+
+    assert np.allclose(network.cpts["b"], [[0.1, 0.3, 0.6], [0.2, 0.4, 0.4]])
+    assert np.allclose(network.cpts["c"][1, 1], [0.9, 0.1])
+    assert np.allclose(network.cpts["c"][0, 2], [0.5, 0.5])
+    assert network.parent_map()["c"] == frozenset({"a", "b"})
+
+def test_load_bif_uses_cache(tmp_path):
+    """A network is stored in the cache once, and loading it from there gives the parsed network."""
+    from bnsl import bif
+
+    cache = ArtifactCache(root=str(tmp_path))
+    network_path = network_paths[1]
+    parsed = parse_bif(network_path.read_text())
+
+    bif._loaded.clear()
+    load_bif(str(network_path), cache=cache)
+    bif._loaded.clear()  # force reading the cached entry, not the in-process copy
+    loaded = load_bif(str(network_path), cache=cache)
+
+    assert len(list((tmp_path / "networks").iterdir())) == 1
+    assert loaded.variables == parsed.variables
+    assert loaded.parents == parsed.parents and loaded.states == parsed.states
+    assert all(np.array_equal(loaded.cpts[var], parsed.cpts[var]) for var in parsed.variables)
+
+def test_load_bif_without_cache_writes_nothing(tmp_path, monkeypatch):
+    """Without a cache the parsed network is only kept in memory, nothing is written to disk."""
+    from bnsl import bif
+
+    monkeypatch.chdir(tmp_path)
+    bif._loaded.clear()
+    network = load_bif(str(network_paths[1]))
+
+    assert network.variables == parse_bif(network_paths[1].read_text()).variables
+    assert list(tmp_path.iterdir()) == []
@@ -0,0 +1,92 @@
+import os
+import pytest
+import bnsl.cache
+from bnsl.cache import ArtifactCache, artifact_key, file_digest
+
+def _writer(content: str):
+    def write(path: str):
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(content)
+    return write
+
+def test_key_depends_on_all_fields():
+    """Artifacts that differ in any field, e.g. the seed, must not share a key."""
+    base = dict(network="abc", n_samples=100, seed=42)
+    assert artifact_key(**base) == artifact_key(**dict(base))
+    assert artifact_key(**base) != artifact_key(**{**base, "seed": 43})
+    assert artifact_key(**base) != artifact_key(**{**base, "n_samples": 1000})
+
+def test_get_or_create_reuses_artifact(tmp_path):
+    """A second request for the same artifact must not call the writer again."""
+    cache = ArtifactCache(root=str(tmp_path))
+    calls = []
+
+    def write(path):
+        calls.append(path)
+        _writer("data")(path)
+
+    p1 = cache.get_or_create("datasets", {"seed": 42}, "x.dat", write)
+    p2 = cache.get_or_create("datasets", {"seed": 42}, "x.dat", write)
+    p3 = cache.get_or_create("datasets", {"seed": 43}, "x.dat", write)
+
+    assert p1 == p2 != p3
+    assert len(calls) == 2
+    assert open(p1).read() == "data"
+
+def test_failed_write_leaves_no_entry(tmp_path):
+    """A writer that fails must not leave a partial artifact behind."""
+    cache = ArtifactCache(root=str(tmp_path))
+
+    def write(path):
+        _writer("partial")(path)
+        raise RuntimeError("interrupted")
+
+    with pytest.raises(RuntimeError):
+        cache.get_or_create("datasets", {"seed": 42}, "x.dat", write)
+    assert cache.size() == 0
+    assert os.listdir(tmp_path / "datasets") == []
+
+def test_lru_eviction(tmp_path):
+    """The least recently used artifacts are evicted once the size cap is exceeded."""
+    cache = ArtifactCache(root=str(tmp_path), max_bytes=250)
+    paths = {}
+    for seed in (1, 2):
+        paths[seed] = cache.get_or_create("datasets", {"seed": seed}, "x.dat", _writer("x" * 100))
+        os.utime(os.path.dirname(paths[seed]), (seed, seed))
+
+    # use seed 1 again, so seed 2 becomes the least recently used
+    cache.get_or_create("datasets", {"seed": 1}, "x.dat", _writer("x" * 100))
+    paths[3] = cache.get_or_create("datasets", {"seed": 3}, "x.dat", _writer("x" * 100))
+
+    assert os.path.exists(paths[1])
+    assert not os.path.exists(paths[2])
+    assert os.path.exists(paths[3])
+
+def test_tracked_size_matches_listing(tmp_path, monkeypatch):
+    """The cache is only listed again once the tracked total goes over the cap."""
+    cache = ArtifactCache(root=str(tmp_path), max_bytes=10_000)
+    cache.get_or_create("datasets", {"seed": 0}, "x.dat", _writer("x" * 100))
+    listings = []
+    entries = cache._entries
+    monkeypatch.setattr(cache, "_entries", lambda: listings.append(1) or entries())
+
+    for seed in range(1, 20):
+        cache.get_or_create("datasets", {"seed": seed}, "x.dat", _writer("x" * 100))
+
+    assert listings == []
+    assert cache._total == cache.size()
+
+def test_file_digest_reads_an_unchanged_file_once(tmp_path, monkeypatch):
+    """The digest of a file is remembered until the file changes."""
+    path = tmp_path / "data.dat"
+    path.write_text("a b\n2 2\n0 1\n")
+    digest = file_digest(str(path))
+
+    def no_open(*args, **kwargs):
+        raise AssertionError("file read again")
+    monkeypatch.setattr(bnsl.cache, "open", no_open, raising=False)
+    assert file_digest(str(path)) == digest
+
+    monkeypatch.undo()
+    path.write_text("a b\n2 2\n0 1\n1 1\n")
+    assert file_digest(str(path)) != digest
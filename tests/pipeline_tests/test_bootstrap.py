@@ -0,0 +1,58 @@
+import sys
+from pathlib import Path
+import numpy as np
+from bnsl.metrics import edge_frequencies
+from bnsl.pipeline import bootstrap_edge_frequencies, bootstrap_replicate, run_bootstrap
+from bnsl.sampling import simulate
+from bnsl.scoring import as_discrete_data, compute_local_scores
+from bnsl.types import RunResult
+from pygobnilp.scoring import DiscreteData
+
+ROOT = Path(__file__).resolve().parents[2]
+sys.path.insert(0, str(ROOT))
+
+network_path = ROOT / "networks" / "small" / "asia.bif"
+
+def test_replicate_is_data_with_resampled_counts():
+    """A replicate has the rows of the data with multinomial counts, and scores like data made from its rows."""
+    data = as_discrete_data(simulate(network_path, 1000, 3))
+
+    replicate = bootstrap_replicate(data, 7)
+
+    assert replicate.data_length() == 1000
+    assert replicate._unique_data_counts.sum() == 1000
+    observed = replicate._unique_data_counts > 0
+    uniques, counts = np.unique(replicate.rawdata(), axis=0, return_counts=True)
+    assert np.array_equal(uniques, replicate._unique_data[observed])
+    assert np.array_equal(counts, replicate._unique_data_counts[observed])
+    rows = DiscreteData(replicate.rawdata(), varnames=data.variables(), arities=data.arities())
+    assert replicate.digest() == rows.digest()
+    assert compute_local_scores(replicate, palim=2) == compute_local_scores(rows, palim=2)
+
+def test_replicate_shares_the_unique_rows():
+    """A replicate reuses the unique rows of the data and makes no rows of its own."""
+    data = as_discrete_data(simulate(network_path, 1000, 3))
+
+    replicate = bootstrap_replicate(data, 7)
+
+    assert replicate._unique_data is data._unique_data
+    assert replicate._data is None
+    assert replicate._unique_data_counts.shape == data._unique_data_counts.shape
+
+def test_parallel_bootstrap_equals_serial():
+    """The replicates depend on the seed only, not on the number of worker processes."""
+    dataset = simulate(network_path, 1000, 3)
+
+    serial = run_bootstrap(dataset, "silander_myllymaki", 4, seed=1)
+    parallel = run_bootstrap(dataset, "silander_myllymaki", 4, seed=1, n_jobs=2)
+
+    assert serial == parallel
+    assert bootstrap_edge_frequencies(dataset, "silander_myllymaki", 4, seed=1, n_jobs=2) == edge_frequencies(serial)
+
+def test_edge_frequencies():
+    results = [RunResult({"A": frozenset("B"), "B": frozenset()}, 0.0),
+               RunResult({"A": frozenset(), "B": frozenset("A")}, 0.0),
+               RunResult({"A": frozenset("B"), "B": frozenset()}, 0.0),
+               RunResult({"A": frozenset(), "B": frozenset()}, 0.0)]
+
+    assert edge_frequencies(results) == {("A", "B"): 0.25, ("B", "A"): 0.5}
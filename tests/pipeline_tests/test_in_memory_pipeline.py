@@ -0,0 +1,75 @@
+import sys
+from pathlib import Path
+import pytest
+import yaml
+from bnsl.cli import main as cli
+from bnsl.cache import ArtifactCache
+from bnsl.pipeline import run_pipeline, sample_and_score
+from bnsl.sampling import sample_data
+from bnsl.scoring import write_local_scores, read_local_scores
+from bnsl.algorithms.silander_myllymaki import run
+
+ROOT = Path(__file__).resolve().parents[2]
+sys.path.insert(0, str(ROOT))
+
+network_paths = [ROOT / "networks" / "small" / f"{net}.bif" for net in ("asia", "cancer")]
+
+@pytest.mark.parametrize("network_path", network_paths)
+def test_in_memory_matches_files(network_path, tmp_path):
+    """The in-memory pipeline must learn the same network as the .dat/.jaa file pipeline."""
+    cache = ArtifactCache(root=str(tmp_path / "cache"))
+    dat = sample_data(network_path, n_samples=1000, seed=42, cache=cache)
+    jaa = write_local_scores(dat, cache=cache)
+    expected = run(jaa)
+
+    result = run_pipeline(network_path, n_samples=1000, seed=42, algorithm="silander_myllymaki")
+
+    # the .dat reader relabels values in order of appearance, which changes the local scores in the
+    # last bits only, so score-equivalent networks may be tied differently
+    LS = read_local_scores(jaa)
+    assert sum(LS[child][parents] for child, parents in result.pm.items()) == pytest.approx(expected.total_score)
+    assert result.total_score == pytest.approx(expected.total_score)
+
+def test_write_dir_is_optional_side_effect(tmp_path):
+    """With write_dir the .dat and .jaa files are written, and the .jaa holds the returned scores."""
+    network_path = network_paths[0]
+    LS = sample_and_score(network_path, n_samples=500, seed=1, write_dir=str(tmp_path))
+
+    assert (tmp_path / "seed_1" / "asia_500.dat").exists()
+    assert read_local_scores(str(tmp_path / "seed_1" / "asia_500.jaa")) == LS
+
+def test_run_pipeline_forwards_sampling_and_scoring_options(tmp_path):
+    """run_pipeline passes the data format, sampler, n_jobs and score-cache options on to sample_and_score."""
+    network_path = network_paths[0]
+    expected = run_pipeline(network_path, n_samples=500, seed=1, algorithm="silander_myllymaki")
+
+    result = run_pipeline(network_path, n_samples=500, seed=1, algorithm="silander_myllymaki",
+                          write_dir=str(tmp_path), format="npy", n_jobs=2,
+                          score_cache_path=str(tmp_path / "scores.sqlite"))
+
+    assert (tmp_path / "seed_1" / "asia_500.npy").exists()
+    assert (tmp_path / "scores.sqlite").exists()
+    assert result.total_score == expected.total_score
+    with pytest.raises(ValueError):
+        run_pipeline(network_path, n_samples=500, seed=1, algorithm="silander_myllymaki", sampler="other")
+
+def test_cli_scores_once_for_all_parameter_sets(tmp_path, monkeypatch):
+    """With --in_memory the CLI samples and scores each dataset once, not once per parameter set."""
+    calls = []
+    def counting_sample_and_score(*args, **kwargs):
+        calls.append(args[:3])
+        return sample_and_score(*args, **kwargs)
+    monkeypatch.setattr(cli, "sample_and_score", counting_sample_and_score)
+    config = tmp_path / "config.yml"
+    config.write_text(yaml.safe_dump({
+        "algorithm": "approximation_algorithm",
+        "networks": [str(network_paths[0])],
+        "sample_sizes": [200, 300],
+        "seed": 1,
+        "cache_dir": str(tmp_path / "cache"),
+        "k_l_grid": [{"k": 4, "l": 2}, {"k": 2, "l": 2}, {"k": 6, "l": 3}],
+    }))
+
+    cli.main([str(config), "--in_memory"])
+
+    assert calls == [(str(network_paths[0]), 200, 1), (str(network_paths[0]), 300, 1)]
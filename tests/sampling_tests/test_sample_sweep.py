@@ -0,0 +1,62 @@
+import sys
+from pathlib import Path
+import numpy as np
+import pytest
+from bnsl.cache import ArtifactCache
+from bnsl.pipeline import sweep_local_scores
+from bnsl.sampling import sample_data, sample_sweep
+from bnsl.scoring import compute_local_scores
+from pygobnilp.scoring import DiscreteData, load_discrete_npy, merge_unique_counts
+
+ROOT = Path(__file__).resolve().parents[2]
+sys.path.insert(0, str(ROOT))
+
+NETWORK = str(ROOT / "networks" / "small" / "sachs.bif")
+SIZES = [100, 1000, 3000]
+
+@pytest.mark.parametrize("format", ["dat", "npy"])
+def test_sweep_serves_prefixes_under_sample_data_keys(format, tmp_path):
+    """Sweep datasets are prefixes of the largest one and are found by sample_data as cache hits."""
+    cache = ArtifactCache(root=str(tmp_path))
+    paths = sample_sweep(NETWORK, SIZES, seed=3, cache=cache, format=format)
+
+    largest = DiscreteData(paths[SIZES[-1]])
+    for n in SIZES:
+        assert sample_data(NETWORK, n, seed=3, cache=cache, format=format, sampler="native") == paths[n]
+        data = DiscreteData(paths[n])
+        assert data.data_length() == n
+        if format == "npy":
+            # .dat files are relabelled in order of appearance, so only compare binary data
+            assert np.array_equal(data._data, largest._data[:n])
+            uniques, counts = np.unique(np.asarray(data._data), axis=0, return_counts=True)
+            assert np.array_equal(data._unique_data, uniques)
+            assert np.array_equal(data._unique_data_counts, counts)
+
+def test_sweep_keeps_its_datasets_in_a_small_cache(tmp_path):
+    """A cache too small for the whole sweep evicts other entries, but none of the sweep's datasets."""
+    cache = ArtifactCache(root=str(tmp_path), max_bytes=1000)
+    other = sample_data(NETWORK, 200, seed=4, cache=cache)
+
+    paths = sample_sweep(NETWORK, SIZES, seed=3, cache=cache)
+
+    assert all(Path(paths[n]).exists() for n in SIZES)
+    assert not Path(other).exists()
+
+def test_merge_unique_counts():
+    """Merging the unique rows and counts of blocks equals np.unique of the whole data."""
+    data = np.random.default_rng(0).integers(0, 3, size=(500, 4), dtype=np.uint8)
+    blocks = [np.unique(block, axis=0, return_counts=True) for block in (data[:100], data[100:350], data[350:])]
+
+    merged, counts = merge_unique_counts(*blocks)
+    uniques, expected = np.unique(data, axis=0, return_counts=True)
+
+    assert np.array_equal(merged, uniques)
+    assert np.array_equal(counts, expected)
+
+def test_sweep_local_scores_match_direct_scoring(tmp_path):
+    """Scores from the sweep equal those computed from each dataset separately."""
+    LS_per_size = sweep_local_scores(NETWORK, SIZES, seed=3)
+    paths = sample_sweep(NETWORK, SIZES, seed=3, cache=ArtifactCache(root=str(tmp_path)), format="npy")
+
+    for n in SIZES:
+        assert LS_per_size[n] == compute_local_scores(paths[n])
@@ -0,0 +1,52 @@
+import sys
+import tracemalloc
+from pathlib import Path
+import numpy as np
+import pytest
+from bnsl.sampling import simulate, stream_sample, write_dat
+from pygobnilp.scoring import DiscreteData, load_discrete_npy
+
+ROOT = Path(__file__).resolve().parents[2]
+sys.path.insert(0, str(ROOT))
+
+NETWORK = str(ROOT / "networks" / "medium" / "alarm.bif")
+
+@pytest.mark.parametrize("format", ["dat", "npy"])
+def test_streamed_file_equals_one_shot_sample(format, tmp_path):
+    """Streaming in chunks gives the same file contents as sampling everything at once."""
+    one_shot = simulate(NETWORK, n_samples=2500, seed=5, sampler="native")
+    path = str(tmp_path / f"alarm.{format}")
+    stream_sample(NETWORK, 2500, seed=5, write_path=path, format=format, chunk_size=1000)
+
+    if format == "dat":
+        write_dat(one_shot, str(tmp_path / "one_shot.dat"))
+        assert open(path).read() == open(tmp_path / "one_shot.dat").read()
+    else:
+        data, variables, arities, (uniques, counts) = load_discrete_npy(path)
+        assert np.array_equal(data, one_shot.data)
+        assert variables == one_shot.variables and arities == one_shot.arities
+        expected_uniques, expected_counts = np.unique(one_shot.data, axis=0, return_counts=True)
+        assert np.array_equal(uniques, expected_uniques)
+        assert np.array_equal(counts, expected_counts)
+        assert DiscreteData(path).data_length() == 2500
+
+def _peak_memory(n_samples: int, chunk_size: int, write_path: str) -> int:
+    tracemalloc.start()
+    stream_sample(NETWORK, n_samples, seed=5, write_path=write_path, format="npy",
+                  chunk_size=chunk_size, unique_counts=False)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return peak
+
+def test_streaming_does_not_hold_the_full_sample(tmp_path):
+    """Peak memory while streaming does not grow with the sample size, only with the chunk size."""
+    chunk_size = 5000
+    # one unmeasured run first, so that one-off work (imports, parsing the network, compiling kernels)
+    # is not counted in either measured run
+    stream_sample(NETWORK, chunk_size, seed=5, write_path=str(tmp_path / "warm_up.npy"), format="npy",
+                  chunk_size=chunk_size, unique_counts=False)
+    small = _peak_memory(chunk_size, chunk_size, str(tmp_path / "small.npy"))
+    large = _peak_memory(100 * chunk_size, chunk_size, str(tmp_path / "large.npy"))
+
+    full_size = 100 * chunk_size * 37  # bytes of the uint8 sample
+    assert large - small < full_size / 10
@@ -0,0 +1,78 @@
+import sys
+from pathlib import Path
+import numpy as np
+import pytest
+from bnsl.scoring import _child_local_scores, compute_local_scores
+from pygobnilp.scoring import BDeu, DiscreteBIC, DiscreteData
+
+ROOT = Path(__file__).resolve().parents[2]
+sys.path.insert(0, str(ROOT))
+
+DATA = ROOT / "pygobnilp" / "data"
+
+def _split(path, n_old):
+    full = DiscreteData(str(path))
+    old = DiscreteData(full.rawdata()[:n_old], varnames=full.variables(), arities=full.arities())
+    return full, old, full.rawdata()[n_old:]
+
+def _local_scores(scorer, palim):
+    variables = sorted(scorer.variables())
+    return {child: _child_local_scores(scorer, child, variables, palim, pruning=True) for child in variables}
+
+def test_append_merges_unique_counts():
+    """Appending gives the unique datapoints, counts and digest of the whole data."""
+    full, data, new = _split(DATA / "alarm_100.dat", 60)
+    data.keep_contabs()
+    data.contab_stats([("One", "Six"), ("Two",)])
+
+    data.append(new)
+
+    assert data.data_length() == 100
+    assert np.array_equal(data._unique_data, full._unique_data)
+    assert np.array_equal(data._unique_data_counts, full._unique_data_counts)
+    assert data.digest() == full.digest()
+    assert data.contab_stats([("One", "Six"), ("Two",)]) == full.contab_stats([("One", "Six"), ("Two",)])
+
+def test_append_keeps_no_datapoints():
+    """After appending only the unique datapoints and counts are kept; the datapoints and an AD-tree are made from them."""
+    full, data, new = _split(DATA / "alarm_100.dat", 60)
+
+    data.append(new)
+
+    assert data._data is None
+    assert np.array_equal(np.unique(data.rawdata(), axis=0, return_counts=True)[1],
+                          np.unique(full.rawdata(), axis=0, return_counts=True)[1])
+    variables = full.variables()[:3]
+    contab, size = data.make_contab_adtree(variables)
+    assert np.array_equal(contab[:size], full.contab(variables))
+
+def test_append_rejects_other_data():
+    """Appended datapoints must have the variables of the data and values below their arities."""
+    full, data, new = _split(DATA / "alarm_100.dat", 60)
+
+    with pytest.raises(ValueError):
+        data.append(np.full((1, len(full.variables())), 9))
+    with pytest.raises(ValueError):
+        data.append(DiscreteData(new[:, ::-1], varnames=full.variables()[::-1], arities=full.arities()[::-1]))
+
+@pytest.mark.parametrize("score, params", [
+    (DiscreteBIC, {}),
+    (BDeu, {"alpha": 10.0}),
+    (BDeu, {"alpha": 10.0, "count_histograms": True}),
+])
+def test_scores_after_append_equal_scores_of_whole_data(score, params):
+    """Local scores computed after appending equal those computed from the whole data."""
+    full, data, new = _split(DATA / "alarm_10000.dat", 8000)
+    data.keep_contabs()
+    scorer = score(data, **params)
+    _local_scores(scorer, palim=2)
+    cache = scorer._entropy_cache if score is DiscreteBIC else scorer._cache
+    cached = set(cache)
+
+    scorer.append(new)
+
+    # the statistics of the cached sets are updated from the kept tables, not dropped
+    cache = scorer._entropy_cache if score is DiscreteBIC else scorer._cache
+    assert set(cache) >= cached - {frozenset()}
+    assert _local_scores(scorer, palim=2) == \
+        compute_local_scores(full, score=score.__name__, palim=2, **params)
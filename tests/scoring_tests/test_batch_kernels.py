@@ -0,0 +1,58 @@
+import sys
+from itertools import combinations
+from pathlib import Path
+import numpy as np
+import pytest
+from scipy.stats import entropy
+from pygobnilp.scoring import (
+    DiscreteData, DiscreteBIC, BDeu, batch_entropies, batch_bdeu_components,
+    compute_bdeu_component, make_contab,
+)
+
+ROOT = Path(__file__).resolve().parents[2]
+sys.path.insert(0, str(ROOT))
+
+DATA = ROOT / "pygobnilp" / "data"
+
+@pytest.mark.parametrize("size", [0, 1, 2, 3])
+def test_batch_kernels_match_single_contabs(size):
+    """The batched kernels give the entropy and BDeu component of each set of columns."""
+    data = DiscreteData(str(DATA / "alarm_100.dat"))
+    uniques, counts, arities = data._unique_data, data._unique_data_counts, data._arities
+    sets = list(combinations(range(len(arities)), size))[:200]
+    cols = np.array(sets, dtype=np.uint32).reshape(len(sets), size)
+
+    hs, numinsts = batch_entropies(uniques, counts, cols, arities, data._maxflatcontabsize)
+    scores, non_zero_counts = batch_bdeu_components(uniques, counts, cols, arities, 1.0, data._maxflatcontabsize)
+
+    for i, row in enumerate(cols):
+        contab = make_contab(uniques, counts, row, arities[row], data._maxflatcontabsize)[0]
+        assert numinsts[i] == len(contab)
+        assert hs[i] == pytest.approx(entropy(contab))
+        if size > 0:
+            assert (scores[i], non_zero_counts[i]) == compute_bdeu_component(
+                uniques, counts, row, arities[row], 1.0, data._maxflatcontabsize)
+
+def test_batch_kernels_report_too_big_tables():
+    """Sets of variables whose flat contingency table would be too big are flagged, not counted."""
+    data = DiscreteData(str(DATA / "alarm_100.dat"))
+    cols = np.array([[0, 1], [0, 2]], dtype=np.uint32)
+
+    _, numinsts = batch_entropies(data._unique_data, data._unique_data_counts, cols, data._arities, 1)
+    _, non_zero_counts = batch_bdeu_components(data._unique_data, data._unique_data_counts, cols, data._arities, 1.0, 1)
+
+    assert list(numinsts) == [-1, -1]
+    assert list(non_zero_counts) == [-1, -1]
+
+def test_batched_cache_equals_single_calls():
+    """Filling the caches in batches gives exactly the values of computing them one at a time."""
+    data = DiscreteData(str(DATA / "alarm_100.dat"))
+    variable_sets = [()] + [s for size in (1, 2, 3) for s in combinations(data.variables(), size)][:500]
+
+    batched, single = DiscreteBIC(data), DiscreteBIC(data)
+    batched.entropies(variable_sets)
+    assert all(batched._entropy_cache[frozenset(s)] == single.entropy(s) for s in variable_sets)
+
+    batched, single = BDeu(data), BDeu(data)
+    batched.bdeu_score_components(variable_sets)
+    assert all(batched._cache[frozenset(s)] == single._bdeu_score_component_cache(s) for s in variable_sets)
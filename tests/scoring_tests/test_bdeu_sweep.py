@@ -0,0 +1,60 @@
+import sys
+from pathlib import Path
+import numpy as np
+import pytest
+from bnsl.scoring import compute_bdeu_sweep, compute_local_scores
+from pygobnilp.scoring import BDeu, DiscreteData, count_histogram
+
+ROOT = Path(__file__).resolve().parents[2]
+sys.path.insert(0, str(ROOT))
+
+DATA = ROOT / "pygobnilp" / "data"
+
+ALPHAS = [0.1, 1.0, 10.0, 100.0]
+
+def test_count_histogram():
+    """The histogram holds each distinct non-zero count once, with the number of cells having it."""
+    values, multiplicities = count_histogram(np.array([0, 3, 1, 3, 0, 7, 1, 3], dtype=np.uint32))
+
+    assert values.tolist() == [1, 3, 7] and multiplicities.tolist() == [2, 3, 1]
+
+def test_components_from_histograms():
+    """Score components evaluated from histograms are those counted for each alpha."""
+    data = DiscreteData(str(DATA / "alarm_100.dat"))
+    variable_sets = [(), tuple(data.variables()[:1]), tuple(data.variables()[:3]), tuple(data.variables()[:8])]
+    first = BDeu(data, ALPHAS[0], count_histograms=True)
+
+    for alpha in ALPHAS:
+        swept = first if alpha == ALPHAS[0] else BDeu(first, alpha)
+        assert swept._histograms is first._histograms
+        swept.bdeu_score_components(variable_sets)
+        for s in variable_sets:
+            score, non_zero_count = BDeu(data, alpha).bdeu_score_component(s)
+            assert swept._cache[frozenset(s)] == (pytest.approx(score, rel=1e-12), non_zero_count)
+
+@pytest.mark.parametrize("pruning", [True, False])
+def test_sweep_equals_separate_runs(pruning):
+    """A sweep gives the tables of separate BDeu runs, up to rounding."""
+    data = DiscreteData(str(DATA / "alarm_100.dat"))
+    palim = 2 if pruning else 1
+
+    tables = compute_bdeu_sweep(data, ALPHAS, palim=palim, pruning=pruning)
+
+    for alpha in ALPHAS:
+        expected = compute_local_scores(data, score="BDeu", palim=palim, pruning=pruning, alpha=alpha)
+        assert tables[alpha].keys() == expected.keys()
+        for child in expected:
+            assert tables[alpha][child] == pytest.approx(expected[child], rel=1e-12)
+
+def test_changing_alpha_clears_cache():
+    """Components cached for one alpha are not used for another."""
+    data = DiscreteData(str(DATA / "alarm_100.dat"))
+    child, parents = data.variables()[0], tuple(data.variables()[1:3])
+    scorer = BDeu(data, alpha=1.0)
+    scorer.bdeu_score(child, parents)
+
+    scorer.alpha = 10.0
+    assert len(scorer._cache) == 0
+    assert scorer.bdeu_score(child, parents) == BDeu(data, alpha=10.0).bdeu_score(child, parents)
+    scorer.clear_cache()
+    assert len(scorer._cache) == 0
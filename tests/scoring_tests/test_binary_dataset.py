@@ -0,0 +1,39 @@
+import sys
+from pathlib import Path
+import numpy as np
+from bnsl.scoring import compute_local_scores
+from pygobnilp.scoring import DiscreteData, save_discrete_npy, load_discrete_npy
+
+ROOT = Path(__file__).resolve().parents[2]
+sys.path.insert(0, str(ROOT))
+
+DATA = ROOT / "pygobnilp" / "data"
+
+def _save_as_npy(dat_name: str, npy_path: str) -> DiscreteData:
+    data = DiscreteData(str(DATA / dat_name))
+    save_discrete_npy(npy_path, data._data, data.variables(), data.arities())
+    return data
+
+def test_npy_round_trip_is_memory_mapped(tmp_path):
+    """Data saved in binary format loads back unchanged, memory-mapped and column-major."""
+    npy_path = str(tmp_path / "alarm_100.npy")
+    original = _save_as_npy("alarm_100.dat", npy_path)
+
+    data, variables, arities, (uniques, counts) = load_discrete_npy(npy_path)
+
+    assert isinstance(data, np.memmap)
+    assert data.flags.f_contiguous
+    assert np.array_equal(data, original._data)
+    assert tuple(variables) == original.variables()
+    assert list(arities) == list(original.arities())
+    assert np.array_equal(uniques, original._unique_data)
+    assert np.array_equal(counts, original._unique_data_counts)
+
+def test_npy_scores_equal_dat_scores(tmp_path):
+    """Local scores computed from the binary format equal those computed from the .dat file."""
+    npy_path = str(tmp_path / "discrete.npy")
+    _save_as_npy("discrete.dat", npy_path)
+
+    for score, params in [("DiscreteBIC", {}), ("BDeu", {"alpha": 1.0})]:
+        assert compute_local_scores(npy_path, score=score, **params) == \
+            compute_local_scores(str(DATA / "discrete.dat"), score=score, **params)
@@ -0,0 +1,42 @@
+import sys
+from itertools import combinations
+from pathlib import Path
+import numpy as np
+import pandas as pd
+from pygobnilp.scoring import DiscreteData, bitmap_contab, build_bitmaps, make_contab
+
+ROOT = Path(__file__).resolve().parents[2]
+sys.path.insert(0, str(ROOT))
+
+DATA = ROOT / "pygobnilp" / "data"
+
+def test_bitmap_contab_equals_scan():
+    """Contingency tables counted from the bitmap index are those counted from the unique rows."""
+    data = DiscreteData(str(DATA / "alarm_100.dat"))
+    bitmaps, offsets = build_bitmaps(data._data, data._arities)
+    rng = np.random.default_rng(0)
+
+    assert np.array_equal(bitmap_contab(bitmaps, offsets, data._data_length, np.empty(0, dtype=np.uint32),
+                                        data._arities[:0], 10), [data._data_length])
+    for size in (1, 2, 3, 4):
+        for _ in range(20):
+            cols = np.sort(rng.choice(len(data._arities), size, replace=False)).astype(np.uint32)
+            expected = make_contab(data._unique_data, data._unique_data_counts, cols, data._arities[cols], data._maxflatcontabsize)[0]
+            assert np.array_equal(bitmap_contab(bitmaps, offsets, data._data_length, cols, data._arities[cols], data._maxflatcontabsize), expected)
+
+    cols = np.arange(len(data._arities), dtype=np.uint32)
+    assert len(bitmap_contab(bitmaps, offsets, data._data_length, cols, data._arities, 10)) == 0
+
+def test_bitmap_index_built_when_worthwhile():
+    """The index is built for binary data with many unique rows, and the statistics do not change."""
+    rng = np.random.default_rng(0)
+    df = pd.DataFrame(rng.integers(0, 2, size=(2000, 12)), columns=[f"X{i}" for i in range(12)]).astype("category")
+    data, expected = DiscreteData(df), DiscreteData(df)
+    expected._bitmaps = np.empty((0, 0), dtype=np.uint64), np.empty(0, dtype=np.int64)
+    variable_sets = [("X0",) + c for c in combinations(data.variables()[1:], 3)]
+
+    assert data.contab_stats(variable_sets) == expected.contab_stats(variable_sets)
+    assert len(data.bitmap_index()[0]) == 24
+
+    asia = DiscreteData(str(DATA / "asia_10000.dat"))
+    assert len(asia.bitmap_index()[0]) == 0
@@ -0,0 +1,46 @@
+import sys
+from itertools import combinations
+from pathlib import Path
+import numpy as np
+import pytest
+from bnsl.sampling import simulate
+from bnsl.scoring import as_discrete_data
+from pygobnilp.scoring import DiscreteData, batch_entropies, batch_bdeu_components, make_contab, marginalise_flat_contab
+
+ROOT = Path(__file__).resolve().parents[2]
+sys.path.insert(0, str(ROOT))
+
+DATA = ROOT / "pygobnilp" / "data"
+
+def test_marginalised_contab_equals_counted():
+    """Summing a flat contingency table over some variables gives the table counted from the data."""
+    data = DiscreteData(str(DATA / "alarm_100.dat"))
+    uniques, counts, arities = data._unique_data, data._unique_data_counts, data._arities
+    cols = np.array([1, 4, 7, 12, 20], dtype=np.uint32)
+    contab = make_contab(uniques, counts, cols, arities[cols], data._maxflatcontabsize)[0]
+
+    for size in range(len(cols) + 1):
+        for keep in combinations(range(len(cols)), size):
+            keep = np.array(keep, dtype=np.int64)
+            expected = make_contab(uniques, counts, cols[keep], arities[cols[keep]], data._maxflatcontabsize)[0]
+            assert np.array_equal(marginalise_flat_contab(contab, arities[cols], keep), expected)
+
+@pytest.mark.parametrize("alpha", [None, 1.0])
+def test_joined_stats_equal_counted_stats(alpha):
+    """Statistics of tables marginalised from joins are exactly those of tables counted one by one."""
+    # enough unique datapoints for the tables of the joins to be small in comparison
+    data = as_discrete_data(simulate(str(ROOT / "networks" / "medium" / "alarm.bif"), 20000, seed=0, sampler="native"))
+    variables = data.variables()
+    # parent sets extended by one more parent, as in a layer of the pruned search
+    variable_sets = [(variables[0],) + old + (new,)
+                     for old in combinations(variables[1:8], 2) for new in variables[8:]]
+
+    stats = data.contab_stats(variable_sets, alpha=alpha)
+    assert any(len(vsets) > 1 for _, vsets in data._plan_joins(variable_sets))
+
+    cols = np.array([sorted(data._varidx[v] for v in s) for s in variable_sets], dtype=np.uint32)
+    if alpha is None:
+        values, sizes = batch_entropies(data._unique_data, data._unique_data_counts, cols, data._arities, data._maxflatcontabsize)
+    else:
+        values, sizes = batch_bdeu_components(data._unique_data, data._unique_data_counts, cols, data._arities, alpha, data._maxflatcontabsize)
+    assert stats == {frozenset(s): (v, n) for s, v, n in zip(variable_sets, values.tolist(), sizes.tolist())}
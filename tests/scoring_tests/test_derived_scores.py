@@ -0,0 +1,52 @@
+import sys
+from pathlib import Path
+import pytest
+from bnsl.scoring import compute_local_scores_grid, make_scorer, scorer_local_score
+from bnsl.transforms.derive import derive_local_scores
+from pygobnilp.scoring import DiscreteData, pruned_local_scores_for_child
+
+ROOT = Path(__file__).resolve().parents[2]
+sys.path.insert(0, str(ROOT))
+
+DATA = ROOT / "pygobnilp" / "data"
+
+def _gobnilp_local_scores(data, palim, edge_penalty, score="DiscreteBIC"):
+    # the local score function Gobnilp.learn uses for an edge penalty
+    local_score = scorer_local_score(make_scorer(data, score))
+    def local_score_edge(child, parents):
+        score, ub = local_score(child, parents)
+        if ub is not None:
+            ub -= edge_penalty * (len(parents) + 1)
+        return score - edge_penalty * len(parents), ub
+    variables = sorted(data.variables())
+    return {child: pruned_local_scores_for_child(local_score_edge, child, [v for v in variables if v != child], palim)[0]
+            for child in variables}
+
+@pytest.mark.parametrize("score", ["DiscreteBIC", "BDeu"])
+def test_grid_equals_separate_runs(score):
+    """Tables derived from the widest table are those of separate pruned runs."""
+    data = DiscreteData(str(DATA / "alarm_100.dat"))
+    palims, edge_penalties = [1, 2, 3], [0.0, 0.5, 2.0]
+
+    grid = compute_local_scores_grid(data, palims, edge_penalties, score=score)
+
+    for palim in palims:
+        for edge_penalty in edge_penalties:
+            assert grid[palim, edge_penalty] == _gobnilp_local_scores(data, palim, edge_penalty, score)
+
+def test_negative_edge_penalty_derived_from_unpruned_table():
+    """A negative penalty can make sets pruned without penalty optimal, so the widest table is not pruned."""
+    data = DiscreteData(str(DATA / "alarm_100.dat"))
+
+    grid = compute_local_scores_grid(data, [2], [-5.0, 0.0])
+
+    assert grid[2, -5.0] == _gobnilp_local_scores(data, 2, -5.0)
+    assert grid[2, 0.0] == _gobnilp_local_scores(data, 2, 0.0)
+
+def test_unpruned_derivation_filters_and_penalises():
+    """Without pruning a derived table holds every parent set up to palim, with reduced scores."""
+    LS = {"A": {frozenset(): -3.0, frozenset("B"): -1.0, frozenset("BC"): -2.0},
+          "B": {frozenset(): -1.0}, "C": {frozenset(): -1.0}}
+
+    assert derive_local_scores(LS, palim=1, edge_penalty=1.0, pruning=False)["A"] == {frozenset(): -3.0, frozenset("B"): -2.0}
+    assert derive_local_scores(LS, edge_penalty=1.5)["A"] == {frozenset(): -3.0, frozenset("B"): -2.5}
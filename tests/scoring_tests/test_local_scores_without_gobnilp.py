@@ -0,0 +1,44 @@
+import subprocess
+import sys
+from pathlib import Path
+import pytest
+from bnsl.scoring import compute_local_scores, stream_local_scores, read_local_scores
+from pygobnilp.scoring import DiscreteData
+
+ROOT = Path(__file__).resolve().parents[2]
+sys.path.insert(0, str(ROOT))
+
+DATA = ROOT / "pygobnilp" / "data"
+
+@pytest.mark.parametrize("dat_name", ["discrete.dat", "alarm_100.dat"])
+@pytest.mark.parametrize("score, params", [("DiscreteBIC", {}), ("BDeu", {"alpha": 1.0})])
+def test_local_scores_match_gobnilp(dat_name, score, params):
+    """Local scores computed without a Gobnilp model must equal those computed by Gobnilp."""
+    gobnilp = pytest.importorskip("pygobnilp.gobnilp")
+    dat_path = str(DATA / dat_name)
+
+    g = gobnilp.Gobnilp()
+    g.learn(data_source=dat_path, data_type="discrete", score=score, palim=3, end="local scores", **params)
+
+    LS = compute_local_scores(dat_path, score=score, palim=3, **params)
+
+    assert LS == g.family_scores
+
+def test_stream_local_scores_round_trip(tmp_path):
+    """Streaming the scores to a .jaa file and reading them back gives the in-memory scores."""
+    dat_path = str(DATA / "discrete.dat")
+    jaa_path = str(tmp_path / "discrete.jaa")
+
+    stream_local_scores(DiscreteData(dat_path), jaa_path)
+
+    assert read_local_scores(jaa_path) == compute_local_scores(dat_path)
+
+def test_scoring_does_not_import_gurobi():
+    """Computing local scores must not import gurobipy."""
+    code = (
+        "import sys\n"
+        "from bnsl.scoring import compute_local_scores\n"
+        f"compute_local_scores({str(DATA / 'discrete.dat')!r}, palim=1)\n"
+        "assert 'gurobipy' not in sys.modules\n"
+    )
+    subprocess.run([sys.executable, "-c", code], check=True)
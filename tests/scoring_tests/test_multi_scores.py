@@ -0,0 +1,44 @@
+import sys
+from pathlib import Path
+import pytest
+from bnsl.scoring import compute_local_scores, compute_multi_local_scores
+from pygobnilp.scoring import DiscreteData, DiscreteAIC, DiscreteBIC, DiscreteLL
+
+ROOT = Path(__file__).resolve().parents[2]
+sys.path.insert(0, str(ROOT))
+
+DATA = ROOT / "pygobnilp" / "data"
+
+SCORES = [("DiscreteBIC", 1), ("DiscreteBIC", 4), ("DiscreteAIC", 1), ("DiscreteLL", None)]
+
+@pytest.mark.parametrize("pruning", [True, False])
+def test_multi_scores_equal_separate_runs(pruning):
+    """One pass over several (score, k) pairs gives the tables of separate runs."""
+    data = DiscreteData(str(DATA / "alarm_100.dat"))
+    palim = 2 if pruning else 1
+
+    tables = compute_multi_local_scores(data, SCORES, palim=palim, pruning=pruning)
+
+    for score, k in SCORES:
+        params = {} if k is None else {"k": k}
+        assert tables[score, k] == compute_local_scores(data, score=score, palim=palim, pruning=pruning, **params)
+
+def test_scores_share_entropies():
+    """A penalised score built from another one shares its entropies and log-likelihood bounds."""
+    data = DiscreteData(str(DATA / "alarm_100.dat"))
+    bic = DiscreteBIC(data)
+    aic, ll = DiscreteAIC(bic, k=2), DiscreteLL(bic)
+
+    assert aic._entropy_cache is bic._entropy_cache and ll._maxllh is bic._maxllh
+    assert aic._child_penalties != bic._child_penalties
+
+def test_aic_penalty_does_not_overflow():
+    """The AIC penalty is computed with Python integers, not with the uint8 arities."""
+    data = DiscreteData(str(DATA / "alarm_10000.dat"))
+    aic = DiscreteAIC(data)
+    # the variables of highest arity, so that the penalty exceeds 255
+    child, *parents = sorted(data.variables(), key=aic.arity, reverse=True)[:5]
+    parents = tuple(parents)
+
+    ll, numinsts = aic.ll_score(child, parents)
+    assert aic.score(child, parents)[0] == ll - numinsts * (int(aic.arity(child)) - 1)
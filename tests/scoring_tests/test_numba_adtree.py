@@ -0,0 +1,42 @@
+import sys
+from pathlib import Path
+import numpy as np
+import pytest
+from bnsl.scoring import compute_local_scores
+from pygobnilp.nbadtree import ADTree
+from pygobnilp.scoring import DiscreteData, DiscreteBIC, make_contab
+
+ROOT = Path(__file__).resolve().parents[2]
+sys.path.insert(0, str(ROOT))
+
+DATA = ROOT / "pygobnilp" / "data"
+
+@pytest.mark.parametrize("leaf_list_threshold", [1, 8, 1000])
+def test_adtree_contab_equals_scan(leaf_list_threshold):
+    """Count queries answered by the AD-tree give the contingency tables counted from the unique rows."""
+    data = DiscreteData(str(DATA / "alarm_100.dat"))
+    tree = ADTree(data._unique_data, data._unique_data_counts, data._arities, leaf_list_threshold)
+    rng = np.random.default_rng(0)
+    out = np.empty(data._maxflatcontabsize, dtype=np.int32)
+
+    for size in (1, 2, 3, 4):
+        for _ in range(20):
+            cols = np.sort(rng.choice(len(data._arities), size, replace=False)).astype(np.uint32)
+            n = tree.contab(cols, out, data._maxflatcontabsize)
+            expected = make_contab(data._unique_data, data._unique_data_counts, cols, data._arities[cols], data._maxflatcontabsize)[0]
+            assert np.array_equal(out[:n], expected)
+
+    assert tree.contab(np.arange(len(data._arities)), out, 10) == -1
+    assert tree.nodes > 0 and tree.nbytes > 0 and tree.build_time >= 0
+
+def test_adtree_scores_equal_scan_scores():
+    """Local scores computed with entropies from the AD-tree equal those counted from the unique rows."""
+    data = DiscreteData(str(DATA / "alarm_100.dat"))
+    expected = compute_local_scores(data, palim=2)
+
+    data.build_adtree(leaf_list_threshold=8)
+    scorer = DiscreteBIC(data)
+
+    assert scorer._nbadtree is data._nbadtree
+    assert compute_local_scores(data, palim=2) == expected
+    assert scorer.entropy(data.variables()) == DiscreteBIC(DiscreteData(str(DATA / "alarm_100.dat"))).entropy(data.variables())
@@ -0,0 +1,29 @@
+import sys
+from pathlib import Path
+import pytest
+from bnsl.scoring import compute_local_scores, stream_local_scores
+from pygobnilp.scoring import DiscreteData
+
+ROOT = Path(__file__).resolve().parents[2]
+sys.path.insert(0, str(ROOT))
+
+DATA = ROOT / "pygobnilp" / "data"
+
+@pytest.mark.parametrize("score, params", [("DiscreteBIC", {}), ("BDeu", {"alpha": 1.0})])
+def test_parallel_equals_serial(score, params):
+    """Scoring with a pool of workers gives the same dict, in the same order, as scoring serially."""
+    dat_path = str(DATA / "alarm_100.dat")
+    serial = compute_local_scores(dat_path, score=score, palim=2, **params)
+    parallel = compute_local_scores(dat_path, score=score, palim=2, n_jobs=2, **params)
+
+    assert parallel == serial
+    assert list(parallel) == list(serial)
+    assert all(list(parallel[child]) == list(serial[child]) for child in serial)
+
+def test_parallel_stream_equals_serial(tmp_path):
+    """The .jaa file written with a pool of workers is identical to the serial one."""
+    data = DiscreteData(str(DATA / "discrete.dat"))
+    stream_local_scores(data, str(tmp_path / "serial.jaa"))
+    stream_local_scores(data, str(tmp_path / "parallel.jaa"), n_jobs=3)
+
+    assert (tmp_path / "serial.jaa").read_text() == (tmp_path / "parallel.jaa").read_text()
@@ -0,0 +1,57 @@
+import sys
+from pathlib import Path
+import pytest
+from bnsl.scoring import compute_local_scores
+import pickle
+from pygobnilp.scorecache import make_score_cache
+from pygobnilp.scoring import DiscreteData, DiscreteBIC, BDeu
+
+ROOT = Path(__file__).resolve().parents[2]
+sys.path.insert(0, str(ROOT))
+
+DATA = ROOT / "pygobnilp" / "data"
+
+def test_lru_eviction_keeps_budget():
+    """Beyond its byte budget the cache evicts the least recently used entries."""
+    cache = make_score_cache()
+    cache[frozenset("a")] = (1.0, 2)
+    entry_bytes = cache.nbytes
+
+    cache = make_score_cache(max_bytes=3 * entry_bytes)
+    for v in "abc":
+        cache[frozenset(v)] = (1.0, 2)
+    cache[frozenset("a")]
+    cache[frozenset("d")] = (1.0, 2)
+
+    # down to 90% of the budget, least recently used first
+    assert set(cache) == {frozenset("a"), frozenset("d")}
+    assert cache.nbytes <= cache.max_bytes
+
+    copy = pickle.loads(pickle.dumps(cache))
+    assert copy == cache and list(copy) == list(cache) and copy.nbytes == cache.nbytes
+
+@pytest.mark.parametrize("score", ["DiscreteBIC", "BDeu"])
+def test_bounded_cache_gives_same_scores(score):
+    """A cache much smaller than the search needs changes nothing but the amount of recomputation."""
+    data = DiscreteData(str(DATA / "alarm_100.dat"))
+    expected = compute_local_scores(data, score=score, palim=2)
+
+    assert compute_local_scores(data, score=score, palim=2, score_cache_bytes=50_000) == expected
+
+def test_persistent_cache_starts_warm(tmp_path):
+    """Entropies stored by one score are read back by another score of the same data, and not by other data."""
+    path = str(tmp_path / "scores.sqlite")
+    data = DiscreteData(str(DATA / "alarm_100.dat"))
+    expected = compute_local_scores(data, score="DiscreteAIC", palim=2)
+
+    compute_local_scores(data, score="DiscreteBIC", palim=2, score_cache_path=path)
+    assert compute_local_scores(data, score="DiscreteAIC", palim=2, score_cache_path=path) == expected
+
+    warm = DiscreteBIC(data, cache_path=path)
+    variables = data.variables()[:3]
+    assert frozenset(variables) in warm._entropy_cache
+    assert warm.entropy(variables) == DiscreteBIC(data).entropy(variables)
+
+    other = DiscreteData(str(DATA / "alarm_10000.dat"))
+    assert frozenset(variables) not in DiscreteBIC(other, cache_path=path)._entropy_cache
+    assert frozenset(variables) not in BDeu(data, cache_path=path)._cache
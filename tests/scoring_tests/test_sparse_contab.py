@@ -0,0 +1,47 @@
+import sys
+from pathlib import Path
+import numpy as np
+from pygobnilp.scoring import DiscreteData, DiscreteBIC, BDeu, make_contab, sparse_contab
+
+ROOT = Path(__file__).resolve().parents[2]
+sys.path.insert(0, str(ROOT))
+
+DATA = ROOT / "pygobnilp" / "data"
+
+def test_sparse_contab_is_flat_contab_without_zeros():
+    """The sparse contingency table holds the non-zero counts of the flat one, in the same order."""
+    data = DiscreteData(str(DATA / "alarm_100.dat"))
+    cols = np.array([0, 3, 5, 9, 30], dtype=np.uint32)
+    arities = data._arities[cols]
+
+    flat = make_contab(data._unique_data, data._unique_data_counts, cols, arities, data._maxflatcontabsize)[0]
+    sparse = sparse_contab(data._unique_data, data._unique_data_counts, cols, arities)
+
+    assert np.array_equal(sparse, flat[flat > 0])
+
+def test_sparse_contab_beyond_uint64_keys():
+    """Tables whose number of cells does not fit in 64 bits are counted like numpy.unique does."""
+    rng = np.random.default_rng(0)
+    values = rng.integers(0, 2, size=(5000, 80)).astype(np.uint8)
+    values[:, 40:] = values[:, :40]  # few distinct rows
+    arities = np.full(80, 5, dtype=np.uint8)
+    uniques, counts = np.unique(values, axis=0, return_counts=True)
+    cols = np.arange(80, dtype=np.uint32)
+
+    sparse = sparse_contab(uniques, counts.astype(np.uint32), cols, arities)
+
+    assert np.array_equal(sparse, np.unique(values, axis=0, return_counts=True)[1])
+
+def test_oversized_tables_score_like_flat_tables():
+    """Entropies and BDeu components of tables too big to be flat are those of the flat tables."""
+    data = DiscreteData(str(DATA / "alarm_100.dat"))
+    variables = data.variables()[:6]
+
+    flat, sparse = DiscreteBIC(data), DiscreteBIC(data)
+    sparse._maxflatcontabsize = 10
+    assert sparse.entropy(variables) == (flat.entropy(variables)[0], None)
+
+    flat, sparse = BDeu(data), BDeu(data)
+    sparse._maxflatcontabsize = 10
+    assert sparse.bdeu_score_component(variables) == flat.bdeu_score_component(variables)
+    assert sparse.bdeu_score(variables[0], variables[1:]) == flat.bdeu_score(variables[0], variables[1:])
@@ -0,0 +1,40 @@
+import sys
+from pathlib import Path
+import numpy as np
+import pytest
+from pygobnilp.scoring import DiscreteData, merge_unique_counts, pack_rows, row_key_layout, unique_rows
+
+ROOT = Path(__file__).resolve().parents[2]
+sys.path.insert(0, str(ROOT))
+
+DATA = ROOT / "pygobnilp" / "data"
+
+@pytest.mark.parametrize("n_columns, arity", [(5, 3), (40, 4), (70, 3), (20, 200)])
+def test_unique_rows_equal_numpy(n_columns, arity):
+    """Rows deduplicated by their packed keys, in one or more words, are those of numpy.unique."""
+    rng = np.random.default_rng(0)
+    data = rng.integers(0, arity, (5000, n_columns)).astype(np.uint8)
+    data[:1000] = data[1000:2000]
+    expected = np.unique(data, axis=0, return_counts=True)
+
+    for arities in ([arity] * n_columns, None, [2] * n_columns):
+        uniques, counts = unique_rows(np.asfortranarray(data), arities)
+        assert np.array_equal(uniques, expected[0]) and np.array_equal(counts, expected[1])
+
+def test_keys_of_a_layout_compare_like_rows():
+    """A layout packs rows into as few words as fit and keys sort like their rows."""
+    layout = row_key_layout([2] * 64 + [3])
+    assert layout[3] == 2 and layout[0][-1] == 1
+
+    data = np.array([[1] * 64 + [0], [0] * 64 + [2], [1] * 64 + [1]], dtype=np.uint8)
+    keys = pack_rows(data, layout)
+    assert list(np.lexsort(keys.T[::-1])) == [1, 0, 2]
+    assert pack_rows(data, row_key_layout([2] * 65)) is None
+
+def test_discrete_data_stores_keys_of_unique_rows():
+    data = DiscreteData(str(DATA / "alarm_100.dat"))
+    blocks = [np.unique(data.rawdata()[i::3], axis=0, return_counts=True) for i in range(3)]
+
+    assert np.array_equal(data._unique_keys, pack_rows(data._unique_data, data._key_layout))
+    merged = merge_unique_counts(*blocks)
+    assert np.array_equal(merged[0], data._unique_data) and np.array_equal(merged[1], data._unique_data_counts)